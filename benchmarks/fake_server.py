@@ -0,0 +1,295 @@
+"""Local stand-in for the Obsidian Local REST API, used by the benchmarks.
+
+Implements the endpoints of ``openapi.yaml`` that ``mcp_obsidian.obsidian``
+calls, over plain HTTP, on a synthetic in-memory vault. Every request is
+delayed by a configurable latency to mimic the plugin.
+
+Run standalone with::
+
+    python benchmarks/fake_server.py --notes 10000 --latency-ms 5 --port 27125
+"""
+import argparse
+import fnmatch
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "project meeting idea research note task review plan design draft summary "
+    "vault obsidian markdown link graph daily weekly goal habit book reading "
+    "python server cache index search latency budget release roadmap decision"
+).split()
+PERIODS = ["daily", "weekly", "monthly", "quarterly", "yearly"]
+
+
+class SyntheticVault():
+    """Deterministic vault of ``size`` notes spread over nested folders."""
+
+    def __init__(self, size: int, seed: int = 0):
+        rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.notes: dict[str, dict] = {}
+        now = time.time() * 1000
+
+        folders = [f"Area {a}/Topic {t}" for a in range(max(1, size // 500)) for t in range(5)]
+        paths = [f"{rng.choice(folders)}/Note {i}.md" for i in range(size)]
+        for i, path in enumerate(paths):
+            tags = rng.sample(WORDS, 2)
+            status = rng.choice(['draft', 'done'])
+            links = [paths[rng.randrange(size)][:-3].rsplit('/', 1)[-1] for _ in range(3)]
+            body = "\n\n".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+                for _ in range(rng.randint(2, 8))
+            )
+            content = (
+                f"---\nstatus: {status}\n---\n"
+                f"# Note {i}\n\n#{tags[0]} #{tags[1]}\n\n## Summary\n\n{body}\n\n"
+                f"## Links\n\n" + "\n".join(f"- [[{link}]]" for link in links) + "\n"
+            )
+            self.put(path, content, now - rng.randrange(90 * 86400 * 1000), tags, {"status": status})
+
+    def put(self, path: str, content: str, mtime: float | None = None, tags=None, frontmatter=None) -> None:
+        with self.lock:
+            previous = self.notes.get(path, {})
+            self.notes[path] = {
+                "path": path,
+                "content": content,
+                "tags": tags if tags is not None else previous.get("tags", []),
+                "frontmatter": frontmatter if frontmatter is not None else previous.get("frontmatter", {}),
+                "stat": {
+                    "ctime": previous.get("stat", {}).get("ctime", mtime or time.time() * 1000),
+                    "mtime": mtime or time.time() * 1000,
+                    "size": len(content.encode("utf-8")),
+                },
+            }
+
+    def list_dir(self, dirpath: str) -> list[str] | None:
+        prefix = dirpath.strip("/")
+        prefix = prefix + "/" if prefix else ""
+        entries = set()
+        for path in self.notes:
+            if path.startswith(prefix):
+                name, sep, _ = path[len(prefix):].partition("/")
+                entries.add(name + sep)
+        return sorted(entries) if entries else None
+
+
+def evaluate(logic, data):
+    """Small JsonLogic evaluator covering the operators the client sends."""
+    if isinstance(logic, list):
+        return [evaluate(item, data) for item in logic]
+    if not isinstance(logic, dict) or len(logic) != 1:
+        return logic
+
+    op, args = next(iter(logic.items()))
+    if not isinstance(args, list):
+        args = [args]
+    if op == "var":
+        value = data
+        for part in str(args[0]).split(".") if args[0] != "" else []:
+            value = value.get(part) if isinstance(value, dict) else None
+        return value if value is not None or len(args) < 2 else args[1]
+    if op == "if":
+        for i in range(0, len(args) - 1, 2):
+            if evaluate(args[i], data):
+                return evaluate(args[i + 1], data)
+        return evaluate(args[-1], data) if len(args) % 2 else None
+
+    values = [evaluate(arg, data) for arg in args]
+    if op == "and":
+        return all(values)
+    if op == "or":
+        return any(values)
+    if op == "!":
+        return not values[0]
+    if op in ("==", "==="):
+        return values[0] == values[1]
+    if op in ("!=", "!=="):
+        return values[0] != values[1]
+    if op in (">", ">=", "<", "<="):
+        try:
+            return {">": values[0] > values[1], ">=": values[0] >= values[1],
+                    "<": values[0] < values[1], "<=": values[0] <= values[1]}[op]
+        except TypeError:
+            return False
+    if op == "in":
+        return values[1] is not None and values[0] in values[1]
+    if op == "glob":
+        return isinstance(values[1], str) and fnmatch.fnmatchcase(values[1], values[0])
+    if op == "regexp":
+        return isinstance(values[1], str) and re.search(values[0], values[1]) is not None
+    raise ValueError(f"Unsupported operator {op}")
+
+
+def _is_truthy(value) -> bool:
+    return value not in (False, None, 0, [], {})
+
+
+def make_handler(vault: SyntheticVault, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; avoid the Nagle/delayed-ACK stall
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, body, content_type: str = "application/json"):
+            if not isinstance(body, (str, bytes)):
+                body = json.dumps(body)
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, code: int, message: str):
+            self._send(code, {"errorCode": code * 100, "message": message})
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _route(self):
+            time.sleep(latency)
+            url = urllib.parse.urlparse(self.path)
+            return urllib.parse.unquote(url.path), urllib.parse.parse_qs(url.query)
+
+        def _send_note(self, note: dict):
+            if "note+json" in (self.headers.get("Accept") or ""):
+                return self._send(200, note)
+            return self._send(200, note["content"], "text/markdown")
+
+        def do_GET(self):
+            path, query = self._route()
+            if path.startswith("/vault/"):
+                relative = path[len("/vault/"):]
+                if relative == "" or relative.endswith("/"):
+                    files = vault.list_dir(relative)
+                    if files is None:
+                        return self._error(404, "Directory does not exist")
+                    return self._send(200, {"files": files})
+                note = vault.notes.get(relative)
+                if note is None:
+                    return self._error(404, "File does not exist")
+                return self._send_note(note)
+
+            match = re.fullmatch(r"/periodic/(\w+)/(recent)?", path)
+            if match and match.group(1) in PERIODS:
+                if match.group(2):
+                    limit = int(query.get("limit", ["5"])[0])
+                    include_content = query.get("includeContent", ["false"])[0].lower() == "true"
+                    recent = sorted(vault.notes.values(), key=lambda n: -n["stat"]["mtime"])[:limit]
+                    return self._send(200, [
+                        {"path": n["path"], **({"content": n["content"]} if include_content else {})}
+                        for n in recent
+                    ])
+                daily = f"Periodic/{match.group(1)}/{time.strftime('%Y-%m-%d')}.md"
+                if daily not in vault.notes:
+                    vault.put(daily, f"# {time.strftime('%Y-%m-%d')}\n")
+                return self._send_note(vault.notes[daily])
+            self._error(404, "Not found")
+
+        def do_POST(self):
+            path, query = self._route()
+            body = self._body()
+            if path == "/search/simple/":
+                text = query.get("query", [""])[0].lower()
+                context_length = int(query.get("contextLength", ["100"])[0])
+                results = []
+                for note in list(vault.notes.values()):
+                    content = note["content"]
+                    lowered = content.lower()
+                    matches = []
+                    start = lowered.find(text)
+                    while text and start >= 0:
+                        end = start + len(text)
+                        matches.append({
+                            "match": {"start": start, "end": end},
+                            "context": content[max(0, start - context_length):end + context_length],
+                        })
+                        start = lowered.find(text, end)
+                    if matches:
+                        results.append({"filename": note["path"], "score": -len(matches), "matches": matches})
+                return self._send(200, results)
+
+            if path == "/search/":
+                content_type = self.headers.get("Content-Type") or ""
+                notes = list(vault.notes.values())
+                if "dataview.dql" in content_type:
+                    dql = body.decode("utf-8")
+                    limit = re.search(r"LIMIT (\d+)", dql)
+                    days = re.search(r"dur\((\d+) days\)", dql)
+                    since = time.time() * 1000 - int(days.group(1)) * 86400 * 1000 if days else 0
+                    recent = sorted((n for n in notes if n["stat"]["mtime"] >= since), key=lambda n: -n["stat"]["mtime"])
+                    recent = recent[:int(limit.group(1))] if limit else recent
+                    return self._send(200, [
+                        {"filename": n["path"], "result": {"file.mtime": n["stat"]["mtime"]}} for n in recent
+                    ])
+                try:
+                    logic = json.loads(body)
+                    results = [{"filename": n["path"], "result": evaluate(logic, n)} for n in notes]
+                except (ValueError, TypeError) as e:
+                    return self._error(400, str(e))
+                return self._send(200, [r for r in results if _is_truthy(r["result"])])
+
+            if path.startswith("/vault/"):
+                relative = path[len("/vault/"):]
+                previous = vault.notes.get(relative, {}).get("content", "")
+                vault.put(relative, previous + body.decode("utf-8"))
+                return self._send(204, b"")
+            self._error(404, "Not found")
+
+        def do_PATCH(self):
+            path, _ = self._route()
+            body = self._body().decode("utf-8")
+            relative = path[len("/vault/"):]
+            note = vault.notes.get(relative)
+            if note is None:
+                return self._error(404, "File does not exist")
+            target = urllib.parse.unquote(self.headers.get("Target", ""))
+            heading = target.rsplit("::", 1)[-1]
+            content = note["content"]
+            position = content.find(f" {heading}\n")
+            if self.headers.get("Target-Type") != "heading" or position < 0:
+                return self._error(400, "Target not found")
+            insert_at = content.find("\n#", position + 1)
+            insert_at = len(content) if insert_at < 0 else insert_at + 1
+            vault.put(relative, content[:insert_at] + body + "\n" + content[insert_at:])
+            self._send(200, "OK", "text/plain")
+
+    return Handler
+
+
+def start_server(notes: int, latency_ms: float, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the fake API in a background thread and return the server."""
+    vault = SyntheticVault(notes)
+    server = ThreadingHTTPServer((host, port), make_handler(vault, latency_ms / 1000))
+    server.daemon_threads = True
+    server.vault = vault
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27125)
+    args = parser.parse_args()
+
+    server = start_server(args.notes, args.latency_ms, args.host, args.port)
+    print(f"Serving {args.notes} synthetic notes on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
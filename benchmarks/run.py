@@ -0,0 +1,235 @@
+"""Benchmark every MCP tool of mcp-obsidian against a fake Local REST API.
+
+For each vault size a fake API (``fake_server.py``) is started in its own
+process and the server is imported fresh in a worker process, so settings
+such as ``OBSIDIAN_CACHE_MAX_BYTES`` or ``OBSIDIAN_INDEX`` can be passed
+through the environment and compared. Every tool handler is driven through
+``server.call_tool`` and its p50/p99 latency, throughput and peak memory
+are reported.
+
+Usage::
+
+    python benchmarks/run.py --notes 1000 10000 --latency-ms 2 --json results.json
+    python benchmarks/run.py --notes 1000 --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+WORDS = ["project", "meeting", "idea", "research", "task", "review", "design", "python", "cache", "roadmap"]
+
+
+def _random_path(rng: random.Random, paths: list[str]) -> str:
+    return rng.choice(paths)
+
+
+# Tool name -> function building the arguments of one call
+SCENARIOS = {
+    "obsidian_list_files_in_vault": lambda rng, paths: {},
+    "obsidian_list_files_in_dir": lambda rng, paths: {"dirpath": _random_path(rng, paths).rsplit('/', 1)[0]},
+    "obsidian_list_files_tree": lambda rng, paths: {"max_depth": 2},
+    "obsidian_get_file_contents": lambda rng, paths: {"filepath": _random_path(rng, paths)},
+    "obsidian_get_note_metadata": lambda rng, paths: {"filepath": _random_path(rng, paths)},
+    "obsidian_batch_get_file_contents": lambda rng, paths: {"filepaths": rng.sample(paths, min(20, len(paths)))},
+    "obsidian_simple_search": lambda rng, paths: {"query": rng.choice(WORDS)},
+    "obsidian_complex_search": lambda rng, paths: {"query": {"in": [rng.choice(WORDS), {"var": "tags"}]}},
+    "obsidian_append_content": lambda rng, paths: {"filepath": "Bench/append.md", "content": "- benchmark line\n"},
+    "obsidian_patch_content": lambda rng, paths: {
+        "filepath": _random_path(rng, paths),
+        "operation": "append",
+        "target_type": "heading",
+        "target": "Summary",
+        "content": "- patched by benchmark",
+    },
+    "obsidian_batch_write": lambda rng, paths: {
+        "operations": [
+            {"type": "append", "filepath": f"Bench/batch-{i % 5}.md", "content": "- batch line\n"}
+            for i in range(10)
+        ]
+    },
+    "obsidian_get_periodic_note": lambda rng, paths: {"period": "daily"},
+    "obsidian_get_recent_periodic_notes": lambda rng, paths: {"period": "daily", "limit": 5},
+    "obsidian_get_recent_changes": lambda rng, paths: {"limit": 10},
+    "obsidian_get_changes": lambda rng, paths: {"fields": ["cursor", "reset"]},
+    "obsidian_get_server_metrics": lambda rng, paths: {},
+    "obsidian_get_backlinks": lambda rng, paths: {"filepath": _random_path(rng, paths)},
+    "obsidian_get_neighborhood": lambda rng, paths: {"filepath": _random_path(rng, paths), "depth": 2},
+}
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _bench_tool(server, name: str, make_args, paths, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    calls = [make_args(rng, paths) for _ in range(requests)]
+
+    # Warm up connections and caches the same way a long-lived session would
+    for args in calls[:3]:
+        await server.call_tool(name, args)
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(args):
+        async with semaphore:
+            started = time.perf_counter()
+            await server.call_tool(name, args)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(args) for args in calls))
+    elapsed = time.perf_counter() - started
+
+    # Measure memory in a separate pass since tracing slows every allocation down
+    tracemalloc.start()
+    for args in calls[:min(10, len(calls))]:
+        await server.call_tool(name, args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "tool": name,
+        "requests": requests,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "peak_mem_kib": round(peak / 1024, 1),
+    }
+
+
+async def _run_worker(args) -> list[dict]:
+    sys.path.insert(0, os.path.join(HERE, "..", "src"))
+    from mcp_obsidian import server
+
+    tools = server.load_tools()
+    if tools.vault_index is not None:
+        # The server builds the indexes in the background; wait for them so that tools use them
+        await tools.api.build_index()
+        if tools.search_index is not None or tools.link_graph is not None:
+            await tools.api.build_content_indexes()
+    listing = await tools.api.search_json({"glob": ["*.md", {"var": "path"}]})
+    paths = sorted(result["filename"] for result in listing)
+
+    results = []
+    for name in server.tool_handlers:
+        if args.tools and name not in args.tools:
+            continue
+        if name not in SCENARIOS:
+            print(f"No benchmark scenario for {name}, skipping", file=sys.stderr)
+            continue
+        result = await _bench_tool(server, name, SCENARIOS[name], paths, args.requests, args.concurrency, args.seed)
+        result["notes"] = args.notes[0]
+        results.append(result)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _bench_vault(args, notes: int) -> list[dict]:
+    port = _free_port()
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_server.py"), "--notes", str(notes),
+         "--latency-ms", str(args.latency_ms), "--port", str(port)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # The fake server prints one line once the synthetic vault is ready
+        fake.stdout.readline()
+        env = os.environ | {
+            "OBSIDIAN_API_KEY": "benchmark",
+            "OBSIDIAN_PROTOCOL": "http",
+            "OBSIDIAN_HOST": "127.0.0.1",
+            "OBSIDIAN_PORT": str(port),
+        }
+        worker_args = [
+            "--worker", "--notes", str(notes), "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency), "--seed", str(args.seed),
+        ]
+        if args.tools:
+            worker_args += ["--tools", *args.tools]
+        worker = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *worker_args],
+            env=env, stdout=subprocess.PIPE, text=True, check=True,
+        )
+        return json.loads(worker.stdout)
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+def _print_table(results: list[dict]) -> None:
+    header = f"{'notes':>7}  {'tool':<36} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'peak KiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['notes']:>7}  {r['tool']:<36} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['throughput_rps']:>8.1f} {r['peak_mem_kib']:>10.1f}")
+
+
+def _compare(results: list[dict], baseline_path: str, threshold: float) -> bool:
+    """Print latency regressions against a baseline and return whether any were found."""
+    with open(baseline_path) as f:
+        baseline = {(r["notes"], r["tool"]): r for r in json.load(f)}
+
+    regressed = False
+    for r in results:
+        base = baseline.get((r["notes"], r["tool"]))
+        if base is None:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if base[key] > 0 and r[key] > base[key] * threshold:
+                regressed = True
+                print(f"REGRESSION {r['tool']} ({r['notes']} notes): {key} {base[key]:.2f} -> {r[key]:.2f}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mcp-obsidian tools against a fake Local REST API.")
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000], help="Synthetic vault sizes, e.g. 1000 10000 100000")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Latency added by the fake API to every request")
+    parser.add_argument("--requests", type=int, default=100, help="Calls per tool")
+    parser.add_argument("--concurrency", type=int, default=8, help="Calls in flight at the same time")
+    parser.add_argument("--tools", nargs="*", help="Only benchmark these tools")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown factor against the baseline")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_run_worker(args))))
+        return
+
+    results = []
+    for notes in args.notes:
+        results.extend(_bench_vault(args, notes))
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare and _compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Benchmark the cold start of the mcp-obsidian server.
+
+MCP clients start a new server process for every session, so this measures
+what a user waits for before the first tool call:
+
+- ``import``: importing ``mcp_obsidian.server`` in a fresh interpreter
+- ``initialize``: spawning the server until it answers the ``initialize`` request
+- ``tools/list``: spawning the server until it answers the first ``tools/list``
+
+The server talks to a fake Local REST API (``fake_server.py``) so that the
+background connection pre-warm has something to connect to.
+
+Usage::
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --importtime 15
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import mcp_obsidian.server; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _env(port: int) -> dict:
+    return os.environ | {
+        "PYTHONPATH": os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])),
+        "OBSIDIAN_API_KEY": "benchmark",
+        "OBSIDIAN_PROTOCOL": "http",
+        "OBSIDIAN_HOST": "127.0.0.1",
+        "OBSIDIAN_PORT": str(port),
+    }
+
+
+def _time_import(env: dict) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, check=True,
+    )
+    return float(result.stdout)
+
+
+def _send(process: subprocess.Popen, message: dict) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _receive(process: subprocess.Popen, request_id: int) -> dict:
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited before answering")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def _time_handshake(env: dict) -> tuple[float, float]:
+    """Return the seconds until ``initialize`` and the first ``tools/list`` are answered."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import mcp_obsidian; mcp_obsidian.main()"],
+        env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        _send(process, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "startup-benchmark", "version": "0"},
+            },
+        })
+        _receive(process, 1)
+        initialized = time.perf_counter() - started
+
+        _send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = _receive(process, 2)
+        listed = time.perf_counter() - started
+        if not tools.get("result", {}).get("tools"):
+            raise RuntimeError(f"Unexpected tools/list response: {tools}")
+        return initialized, listed
+    finally:
+        process.kill()
+        process.wait()
+
+
+def _print_importtime(env: dict, top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mcp_obsidian.server"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        # Skips the header line
+        if cumulative_us.isdigit():
+            rows.append((int(cumulative_us), int(self_us), module))
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the mcp-obsidian server.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--importtime", type=int, metavar="N", help="Also print the N slowest imports")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    port = _free_port()
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_server.py"), "--notes", "100", "--port", str(port)],
+        stdout=subprocess.PIPE,
+        # Killing the server resets its pre-warmed connection, which the fake reports
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        # The fake server prints one line once the synthetic vault is ready
+        fake.stdout.readline()
+        env = _env(port)
+
+        imports = [_time_import(env) for _ in range(args.runs)]
+        handshakes = [_time_handshake(env) for _ in range(args.runs)]
+
+        results = {
+            "import_ms": round(statistics.median(imports) * 1000, 1),
+            "initialize_ms": round(statistics.median(h[0] for h in handshakes) * 1000, 1),
+            "tools_list_ms": round(statistics.median(h[1] for h in handshakes) * 1000, 1),
+        }
+        for name, value in results.items():
+            print(f"{name:<14} {value:>8.1f}  (median of {args.runs})")
+
+        if args.importtime:
+            print()
+            _print_importtime(env, args.importtime)
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .store import PersistentStore
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_REVALIDATE_SECONDS = 2.0
+DEFAULT_QUERY_CACHE_SECONDS = 5.0
+DEFAULT_QUERY_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+class CachedNote():
+    def __init__(self, content: str, mtime: float, size: int, validated_at: float):
+        self.content = content
+        self.mtime = mtime
+        self.size = size
+        self.validated_at = validated_at
+
+
+class NoteCache():
+    """In-memory LRU cache of note contents bounded by a byte budget.
+
+    Entries carry the ``stat.mtime`` and ``stat.size`` returned by the REST API
+    for ``Accept: application/vnd.olrapi.note+json``. While changes to notes
+    are tracked, by a watcher or by stat comparisons calling :meth:`revalidate`,
+    entries stay fresh until they are invalidated. Otherwise an entry older
+    than ``revalidate_after`` seconds is not served again until it was
+    refetched or revalidated. With a ``store`` every change is mirrored to
+    disk, so that :meth:`load` can warm the cache after a restart.
+    """
+
+    def __init__(
+            self,
+            max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+            revalidate_after: float = DEFAULT_CACHE_REVALIDATE_SECONDS,
+            store: 'PersistentStore | None' = None,
+        ):
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedNote] = OrderedDict()
+        self._periodic_paths: dict[str, tuple[str, str]] = {}
+        self._size = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def paths(self) -> list[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def load(self) -> None:
+        """Fill the cache with the contents saved by a previous run.
+
+        They are not trusted until revalidated against a fresh stat.
+        """
+        if self.store is None:
+            return
+        notes = self.store.load_notes()
+        with self._lock:
+            for path, content, mtime, size in notes:
+                if path in self._entries or self._size + size > self.max_bytes:
+                    continue
+                self._entries[path] = CachedNote(content, mtime, size, validated_at=-math.inf)
+                self._size += size
+
+    def get(self, path: str) -> CachedNote | None:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+            return entry
+
+    def record_hit(self) -> None:
+        self.hits += 1
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    def is_fresh(self, entry: CachedNote, tracked: bool = False) -> bool:
+        """Whether an entry can be served without fetching the note again.
+
+        Args:
+            entry: Entry returned by :meth:`get`
+            tracked: Whether changes to the note would have invalidated or
+                revalidated the entry; it is then fresh unless it was loaded
+                from the store and never revalidated
+        """
+        if tracked:
+            return entry.validated_at > -math.inf
+        return time.monotonic() - entry.validated_at < self.revalidate_after
+
+    def revalidate(self, path: str, stat: dict | None) -> bool:
+        """Check an entry against a fresh stat, dropping it if it changed.
+
+        Returns:
+            True if the cached entry is still valid
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return False
+            if isinstance(stat, dict) and stat.get('mtime') == entry.mtime and stat.get('size') == entry.size:
+                entry.validated_at = time.monotonic()
+                return True
+            self._remove(path)
+            return False
+
+    def write_token(self) -> int:
+        """Snapshot to pass to put() so fetches racing a write are not cached."""
+        return self._writes
+
+    def put(self, path: str, content: str, stat: dict, token: int | None = None) -> None:
+        size = stat.get('size', len(content.encode('utf-8')))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if token is not None and token != self._writes:
+                return
+            self._remove(path)
+            self._entries[path] = CachedNote(content, stat.get('mtime', 0), size, time.monotonic())
+            self._size += size
+            if self.store is not None:
+                self.store.save_note(path, content, stat.get('mtime', 0), size)
+            while self._size > self.max_bytes:
+                evicted_path, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                if self.store is not None:
+                    self.store.delete_note(evicted_path)
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._writes += 1
+            self._remove(path)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Drop every entry below a directory."""
+        with self._lock:
+            self._writes += 1
+            for path in [path for path in self._entries if path.startswith(prefix)]:
+                self._remove(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+            self._periodic_paths.clear()
+            self._size = 0
+            if self.store is not None:
+                self.store.clear_notes()
+
+    def get_periodic_path(self, period: str) -> str | None:
+        """Return the note path last resolved for a period, if resolved today."""
+        resolved = self._periodic_paths.get(period)
+        if resolved is None or resolved[1] != time.strftime('%Y-%m-%d'):
+            return None
+        return resolved[0]
+
+    def set_periodic_path(self, period: str, path: str) -> None:
+        self._periodic_paths[period] = (path, time.strftime('%Y-%m-%d'))
+
+    def _remove(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= entry.size
+            if self.store is not None:
+                self.store.delete_note(path)
+
+
+class CachedQuery():
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class QueryCache():
+    """In-memory LRU cache of search results bounded by a byte budget.
+
+    Results are keyed by the normalized query and its parameters and served
+    for ``ttl`` seconds. Search results can depend on any note, so every
+    write clears the whole cache. Entry sizes are the sizes of the JSON
+    responses the results were decoded from.
+    """
+
+    def __init__(
+            self,
+            ttl: float = DEFAULT_QUERY_CACHE_SECONDS,
+            max_bytes: int = DEFAULT_QUERY_CACHE_MAX_BYTES,
+        ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, CachedQuery] = OrderedDict()
+        self._size = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> CachedQuery | None:
+        """Return an unexpired entry, counting the lookup as a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def write_token(self) -> int:
+        """Snapshot to pass to put() so results racing a write are not cached."""
+        return self._writes
+
+    def put(self, key: tuple, value: Any, size: int, token: int | None = None) -> None:
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if token is not None and token != self._writes:
+                return
+            self._remove(key)
+            self._entries[key] = CachedQuery(value, size, time.monotonic() + self.ttl)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+def query_key(kind: str, query: Any, *params: Any) -> tuple:
+    """Cache key of a search, independent of insignificant differences in the query.
+
+    Simple searches ignore repeated whitespace and JsonLogic queries the
+    order of object keys.
+    """
+    if isinstance(query, str):
+        query = " ".join(query.split()) if kind == 'simple' else query.strip()
+    else:
+        query = json.dumps(query, sort_keys=True, separators=(',', ':'))
+    return (kind, query, *params)
+
+
+# JsonLogic query returning ``stat`` for every note, to revalidate everything at once
+ALL_STATS_QUERY = {"var": "stat"}
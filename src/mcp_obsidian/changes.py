@@ -0,0 +1,84 @@
+import secrets
+import threading
+from collections import deque
+
+DEFAULT_CHANGE_LOG_SIZE = 10000
+# Budget for note contents returned with changes unless the client sets one
+DEFAULT_CHANGES_MAX_BYTES = 256 * 1024
+
+
+class ChangeFeed():
+    """Journal of the notes created, modified and deleted between polls.
+
+    Every poll passes the current ``stat`` of all notes to :meth:`update`,
+    which compares their mtime and size with the previous poll and appends
+    the differences to a log under a new sequence number. A client that
+    saw everything up to a sequence number gets the changes after it from
+    :meth:`changes_since`, merged per note. The log keeps ``max_entries``
+    changes; clients further behind, or holding a sequence number of
+    another server run (see ``id``), must resynchronize.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CHANGE_LOG_SIZE):
+        self.max_entries = max_entries
+        # Identifies this server run, sequence numbers restart with it
+        self.id = secrets.token_hex(8)
+        self.seq = 0
+        self._snapshot: dict[str, tuple] | None = None
+        self._log: deque[tuple[int, str, str]] = deque()
+        # Changes up to this sequence number were dropped from the log
+        self._truncated = 0
+        self._lock = threading.Lock()
+
+    def paths(self) -> list[str]:
+        with self._lock:
+            return sorted(self._snapshot or ())
+
+    def update(self, stats: dict[str, dict]) -> int:
+        """Record the changes since the previous poll and return the current sequence number."""
+        current = {
+            path: (stat.get('mtime'), stat.get('size'))
+            for path, stat in stats.items() if isinstance(stat, dict)
+        }
+
+        with self._lock:
+            if self._snapshot is not None:
+                changes = []
+                for path, version in current.items():
+                    previous = self._snapshot.get(path)
+                    if previous is None:
+                        changes.append((path, 'created'))
+                    elif previous != version:
+                        changes.append((path, 'modified'))
+                changes.extend((path, 'deleted') for path in self._snapshot if path not in current)
+
+                if changes:
+                    self.seq += 1
+                    self._log.extend((self.seq, path, change) for path, change in changes)
+                    while len(self._log) > self.max_entries:
+                        self._truncated = self._log.popleft()[0]
+            self._snapshot = current
+            return self.seq
+
+    def changes_since(self, seq: int) -> dict[str, str] | None:
+        """Changes after ``seq`` by path, or None if they are no longer all known."""
+        with self._lock:
+            if seq < self._truncated or seq > self.seq:
+                return None
+
+            merged: dict[str, str] = {}
+            for entry_seq, path, change in self._log:
+                if entry_seq <= seq:
+                    continue
+                previous = merged.get(path)
+                if previous is None:
+                    merged[path] = change
+                elif change == 'deleted':
+                    # A note created and deleted since then never existed for the client
+                    if previous == 'created':
+                        del merged[path]
+                    else:
+                        merged[path] = 'deleted'
+                elif previous == 'deleted':
+                    merged[path] = 'modified'
+            return merged
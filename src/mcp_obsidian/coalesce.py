@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from .metrics import registry
+
+logger = logging.getLogger("mcp-obsidian")
+
+DEFAULT_COALESCE_MAX_BYTES = 64 * 1024
+# Failed writes of the same appends before they are given up
+DEFAULT_APPEND_MAX_ATTEMPTS = 5
+
+
+def _is_client_error(error: Exception) -> bool:
+    """Whether the REST API rejected a write, which makes retrying it pointless."""
+    status_code = getattr(error, 'status_code', None)
+    return status_code is not None and 400 <= status_code < 500
+
+
+class AppendBuffer():
+    """Merges appends to the same note into one upstream write.
+
+    Appends are acknowledged right away and held back for at most
+    ``window`` seconds, or until ``max_bytes`` are pending for the note;
+    all appends to that note received meanwhile are then written with a
+    single request. Callers must flush a note before reading it.
+
+    A failed write is retried with exponential backoff. Appends that could
+    not be written after ``max_attempts`` tries, or that the REST API
+    rejected with a 4xx status, are dropped and logged, since their callers
+    were told they succeeded already.
+    """
+
+    def __init__(
+            self,
+            write: Callable[[str, str], Awaitable[None]],
+            window: float,
+            max_bytes: int = DEFAULT_COALESCE_MAX_BYTES,
+            max_attempts: int = DEFAULT_APPEND_MAX_ATTEMPTS,
+        ):
+        self.write = write
+        self.window = window
+        self.max_bytes = max_bytes
+        self.max_attempts = max_attempts
+        # Number of appends received, of upstream writes made for them and of appends given up
+        self.appends = 0
+        self.writes = 0
+        self.dropped = 0
+        self._pending: dict[str, list[str]] = {}
+        self._sizes: dict[str, int] = {}
+        self._attempts: dict[str, int] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def pending_paths(self) -> list[str]:
+        return list(self._pending)
+
+    async def append(self, path: str, content: str) -> None:
+        path = path.strip('/')
+        self.appends += 1
+        self._pending.setdefault(path, []).append(content)
+        self._sizes[path] = self._sizes.get(path, 0) + len(content.encode('utf-8'))
+
+        if self._sizes[path] >= self.max_bytes:
+            await self.flush(path)
+        elif path not in self._timers:
+            self._timers[path] = asyncio.get_running_loop().call_later(self.window, self._flush_later, path)
+
+    def _flush_later(self, path: str) -> None:
+        self._timers.pop(path, None)
+        task = asyncio.create_task(self._flush_logged(path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_logged(self, path: str) -> None:
+        try:
+            await self.flush(path)
+        except Exception:
+            # Logged, and retried or dropped, by flush()
+            pass
+
+    async def flush(self, path: str) -> None:
+        """Write the pending appends of one note.
+
+        Raises:
+            Exception: If the write failed; the appends stay pending and are
+                retried later unless they were dropped
+        """
+        path = path.strip('/')
+        timer = self._timers.pop(path, None)
+        if timer is not None:
+            timer.cancel()
+
+        # A flush already in progress for this note must finish first to keep appends in order
+        async with self._locks.setdefault(path, asyncio.Lock()):
+            chunks = self._pending.pop(path, None)
+            if not chunks:
+                return
+            size = self._sizes.pop(path)
+            try:
+                await self.write(path, "".join(chunks))
+            except Exception as e:
+                attempts = self._attempts.pop(path, 0) + 1
+                if attempts >= self.max_attempts or _is_client_error(e):
+                    self.dropped += len(chunks)
+                    registry.record_dropped_appends(len(chunks))
+                    logger.error(
+                        f"Dropped {len(chunks)} buffered appends ({size} bytes) to {path} "
+                        f"after {attempts} failed writes: {str(e)}"
+                    )
+                    raise
+                # Put the content back in front of appends received meanwhile
+                self._attempts[path] = attempts
+                self._pending[path] = chunks + self._pending.get(path, [])
+                self._sizes[path] = size + self._sizes.get(path, 0)
+                delay = self.window * 2 ** attempts
+                logger.warning(f"Could not write buffered appends to {path}, retrying in {delay}s: {str(e)}")
+                if path not in self._timers:
+                    self._timers[path] = asyncio.get_running_loop().call_later(delay, self._flush_later, path)
+                raise
+            self._attempts.pop(path, None)
+            self.writes += 1
+
+    async def flush_all(self, prefix: str = "") -> None:
+        """Write the pending appends of every note below ``prefix``.
+
+        Failed writes are not raised: callers reading other notes do not
+        depend on them, and :meth:`flush` logged them and retries or dropped
+        their appends.
+        """
+        prefix = prefix.strip('/')
+        for path in self.pending_paths():
+            if prefix and not path.startswith(prefix + '/'):
+                continue
+            try:
+                await self.flush(path)
+            except Exception:
+                continue
+
+
+class AsyncSingleFlight():
+    """Shares one in-flight call between tasks making the same request.
+
+    The first caller for a key runs the call; callers arriving while it runs
+    wait for it and receive the same result or exception. The call runs in
+    its own task, so a caller that is cancelled does not cancel it for the
+    other callers.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._flights: dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._flights[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda task: self._finished(key, task))
+            self.misses += 1
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Retrieved here in case every caller was cancelled meanwhile
+            task.exception()
+
+    def forget(self) -> None:
+        """Make later callers start new calls, e.g. after a write made results in flight stale."""
+        self._flights.clear()
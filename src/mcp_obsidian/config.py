@@ -0,0 +1,97 @@
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+from .cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_CACHE_REVALIDATE_SECONDS,
+    DEFAULT_QUERY_CACHE_MAX_BYTES,
+    DEFAULT_QUERY_CACHE_SECONDS,
+)
+from .coalesce import DEFAULT_COALESCE_MAX_BYTES
+from .index import DEFAULT_INDEX_REFRESH_SECONDS
+from .prefetch import DEFAULT_PREFETCH_CONCURRENCY, DEFAULT_PREFETCH_MAX_BYTES
+from .resilience import (
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_RESET_SECONDS,
+    DEFAULT_RETRIES,
+    DEFAULT_RETRY_BACKOFF_SECONDS,
+    DEFAULT_SEARCH_TIMEOUT_SECONDS,
+    DEFAULT_TIMEOUT_SECONDS,
+)
+from .watcher import DEFAULT_WATCH_POLL_SECONDS
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, "true" if default else "").lower() in ("1", "true", "yes")
+
+
+class Config():
+    """Server settings, read from the environment (and a ``.env`` file) once."""
+
+    def __init__(self):
+        self.api_key = os.getenv("OBSIDIAN_API_KEY", "")
+        if self.api_key == "":
+            raise ValueError(f"OBSIDIAN_API_KEY environment variable required. Working directory: {os.getcwd()}")
+
+        self.protocol = os.getenv("OBSIDIAN_PROTOCOL", "https")
+        self.host = os.getenv("OBSIDIAN_HOST", "127.0.0.1")
+        self.port = int(os.getenv("OBSIDIAN_PORT", "27124"))
+        self.pool_size = int(os.getenv("OBSIDIAN_POOL_SIZE", "10"))
+
+        self.timeout = float(os.getenv("OBSIDIAN_TIMEOUT_SECONDS", str(DEFAULT_TIMEOUT_SECONDS)))
+        self.search_timeout = float(os.getenv("OBSIDIAN_SEARCH_TIMEOUT_SECONDS", str(DEFAULT_SEARCH_TIMEOUT_SECONDS)))
+        self.adaptive_timeouts = _env_flag("OBSIDIAN_ADAPTIVE_TIMEOUTS", default=True)
+        self.retries = int(os.getenv("OBSIDIAN_RETRIES", str(DEFAULT_RETRIES)))
+        self.retry_backoff = float(os.getenv("OBSIDIAN_RETRY_BACKOFF_SECONDS", str(DEFAULT_RETRY_BACKOFF_SECONDS)))
+        self.hedge_reads = _env_flag("OBSIDIAN_HEDGE_READS")
+        self.breaker_failures = int(os.getenv("OBSIDIAN_BREAKER_FAILURES", str(DEFAULT_BREAKER_FAILURES)))
+        self.breaker_reset_seconds = float(
+            os.getenv("OBSIDIAN_BREAKER_RESET_SECONDS", str(DEFAULT_BREAKER_RESET_SECONDS))
+        )
+
+        self.cache_max_bytes = int(os.getenv("OBSIDIAN_CACHE_MAX_BYTES", str(DEFAULT_CACHE_MAX_BYTES)))
+        self.cache_revalidate_seconds = float(
+            os.getenv("OBSIDIAN_CACHE_REVALIDATE_SECONDS", str(DEFAULT_CACHE_REVALIDATE_SECONDS))
+        )
+        # Directory of the persistent cache, which is disabled when unset
+        self.cache_dir = os.path.expanduser(os.getenv("OBSIDIAN_CACHE_DIR", ""))
+        self.query_cache_seconds = float(os.getenv("OBSIDIAN_QUERY_CACHE_SECONDS", str(DEFAULT_QUERY_CACHE_SECONDS)))
+        self.query_cache_max_bytes = int(
+            os.getenv("OBSIDIAN_QUERY_CACHE_MAX_BYTES", str(DEFAULT_QUERY_CACHE_MAX_BYTES))
+        )
+
+        self.search_index = _env_flag("OBSIDIAN_SEARCH_INDEX")
+        self.link_graph = _env_flag("OBSIDIAN_LINK_GRAPH")
+        self.local_jsonlogic = _env_flag("OBSIDIAN_LOCAL_JSONLOGIC")
+        # Prefetching linked notes is disabled unless a number of notes is set
+        self.prefetch_links = int(os.getenv("OBSIDIAN_PREFETCH_LINKS", "0"))
+        self.prefetch_concurrency = int(os.getenv("OBSIDIAN_PREFETCH_CONCURRENCY", str(DEFAULT_PREFETCH_CONCURRENCY)))
+        self.prefetch_max_bytes = int(os.getenv("OBSIDIAN_PREFETCH_MAX_BYTES", str(DEFAULT_PREFETCH_MAX_BYTES)))
+        # These rely on the vault index, to find notes changed outside the server, for their metadata
+        # or to resolve links; its refreshes also keep the contents loaded by the persistent cache valid
+        self.index = (
+            _env_flag("OBSIDIAN_INDEX") or self.search_index or self.link_graph or self.local_jsonlogic
+            or self.prefetch_links > 0 or bool(self.cache_dir)
+        )
+        self.index_refresh_seconds = float(os.getenv("OBSIDIAN_INDEX_REFRESH_SECONDS", str(DEFAULT_INDEX_REFRESH_SECONDS)))
+
+        self.vault_path = os.getenv("OBSIDIAN_VAULT_PATH", "")
+        self.watch = bool(self.vault_path) and _env_flag("OBSIDIAN_WATCH")
+        self.watch_poll_seconds = float(os.getenv("OBSIDIAN_WATCH_POLL_SECONDS", str(DEFAULT_WATCH_POLL_SECONDS)))
+
+        # Appends are only coalesced when a window is set
+        self.coalesce_seconds = float(os.getenv("OBSIDIAN_APPEND_COALESCE_SECONDS", "0"))
+        self.coalesce_max_bytes = int(os.getenv("OBSIDIAN_APPEND_COALESCE_MAX_BYTES", str(DEFAULT_COALESCE_MAX_BYTES)))
+
+        self.compact_json = _env_flag("OBSIDIAN_COMPACT_JSON")
+
+        self.metrics_file = os.getenv("OBSIDIAN_METRICS_FILE", "")
+        self.metrics_port = int(os.getenv("OBSIDIAN_METRICS_PORT", "0"))
+
+
+@lru_cache(maxsize=None)
+def load_config() -> Config:
+    load_dotenv()
+    return Config()
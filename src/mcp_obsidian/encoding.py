@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional (the fast-json extra), only makes encoding faster
+    orjson = None
+
+
+def project(value: Any, fields: list[str]) -> Any:
+    """Keep only the given fields of every object in ``value``.
+
+    Fields are dotted paths such as ``"matches.context"``; lists are
+    projected element by element and other values are returned unchanged.
+    """
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    nested: dict[str, list[str]] = {}
+    for field in fields:
+        key, _, rest = field.partition('.')
+        nested.setdefault(key, [])
+        if rest:
+            nested[key].append(rest)
+
+    projected = {}
+    for key, subfields in nested.items():
+        if key in value:
+            projected[key] = project(value[key], subfields) if subfields else value[key]
+    return projected
+
+
+def encode(value: Any, compact: bool = False, fields: list[str] | None = None) -> str:
+    """Serialize a tool result as JSON.
+
+    Args:
+        value: Result to serialize
+        compact: Emit minified JSON instead of indenting it
+        fields: Only keep these (dotted) fields of result objects
+
+    Returns:
+        The JSON text, encoded with orjson when it is installed
+    """
+    if fields:
+        value = project(value, fields)
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=0 if compact else orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the json module handles
+            pass
+
+    if compact:
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+
+def encode_cursor(state: dict[str, Any]) -> str:
+    """Pack pagination state into an opaque, URL-safe cursor string."""
+    data = json.dumps(state, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict[str, Any] | None:
+    """Unpack a cursor created by :func:`encode_cursor`, or return None if it is not one."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        state = json.loads(data)
+    except (ValueError, TypeError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def scope_of(*parts: Any) -> str:
+    """Short digest identifying a query, so a cursor is only used with the query it was made for."""
+    data = json.dumps(parts, separators=(',', ':'), sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:16]
@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import os
+from typing import Any
+
+from .fulltext import find_matches, tokenize
+from .obsidian import AsyncObsidian, ObsidianError
+
+
+class FilesystemObsidian(AsyncObsidian):
+    """AsyncObsidian that serves reads straight from the vault directory on disk.
+
+    Listings, file contents, batch reads and simple search never touch the
+    REST API, so they also work while Obsidian is closed. Writes, periodic
+    notes, complex search and metadata still go through the REST API.
+    """
+
+    def __init__(self, vault_path: str, api_key: str, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.vault_path = os.path.realpath(os.path.expanduser(vault_path))
+        if not os.path.isdir(self.vault_path):
+            raise ValueError(f"Vault path {self.vault_path} is not a directory")
+
+    def _resolve(self, path: str) -> str:
+        """Map a vault-relative path to an absolute path inside the vault."""
+        resolved = os.path.realpath(os.path.join(self.vault_path, path.strip('/')))
+        if resolved != self.vault_path and not resolved.startswith(self.vault_path + os.sep):
+            raise Exception(f"Path outside of vault: {path}")
+        return resolved
+
+    def _list_dir_sync(self, dirpath: str) -> list[str]:
+        try:
+            entries = list(os.scandir(self._resolve(dirpath)))
+        except (FileNotFoundError, NotADirectoryError):
+            raise ObsidianError("Error 40400: Not Found", 404)
+
+        files = []
+        for entry in entries:
+            # Obsidian hides dot-folders such as .obsidian and .trash
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                # Like the REST API, empty directories are not returned
+                if self._has_entries(entry.path):
+                    files.append(entry.name + '/')
+            else:
+                files.append(entry.name)
+
+        if not files and dirpath.strip('/'):
+            raise ObsidianError("Error 40400: Not Found", 404)
+        return sorted(files)
+
+    def _has_entries(self, path: str) -> bool:
+        """Whether a directory holds anything but hidden entries.
+
+        Only the directory itself is scanned, so listing the vault root does
+        not walk the whole vault. Unlike the REST API, a directory holding
+        nothing but empty directories is therefore listed.
+        """
+        try:
+            with os.scandir(path) as entries:
+                return any(not entry.name.startswith('.') for entry in entries)
+        except OSError:
+            return False
+
+    def _read_text_sync(self, filepath: str) -> str:
+        path = self._resolve(filepath)
+        try:
+            with open(path, 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+        except (FileNotFoundError, IsADirectoryError):
+            raise ObsidianError(f"Error 40400: File not found: {filepath}", 404)
+
+    def _read_range_sync(self, filepath: str, start: int, end: int | None, unit: str) -> str:
+        """Read part of a file without loading the rest of it."""
+        path = self._resolve(filepath)
+        try:
+            if unit == 'bytes':
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    data = f.read() if end is None else f.read(max(0, end - start))
+                return data.decode('utf-8', errors='ignore')
+
+            with open(path, encoding='utf-8', errors='replace', newline='') as f:
+                return "".join(itertools.islice(f, start - 1, end))
+        except (FileNotFoundError, IsADirectoryError):
+            raise ObsidianError(f"Error 40400: File not found: {filepath}", 404)
+
+    def _markdown_paths_sync(self) -> list[str]:
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(self.vault_path):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if filename.endswith('.md'):
+                    paths.append(os.path.relpath(os.path.join(dirpath, filename), self.vault_path).replace(os.sep, '/'))
+        return sorted(paths)
+
+    def _search_sync(self, query: str, context_length: int) -> list[dict[str, Any]]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        results = []
+        for path in self._markdown_paths_sync():
+            try:
+                content = self._read_text_sync(path)
+            except Exception:
+                # Deleted while scanning
+                continue
+            lowered = content.lower()
+            if not all(term in lowered for term in terms):
+                continue
+            matches = find_matches(content, terms, context_length)
+            found = set(content[m['match']['start']:m['match']['end']].lower() for m in matches)
+            if found >= terms:
+                results.append({'filename': path, 'score': len(matches), 'matches': matches})
+
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results
+
+    async def _list_remote(self, dirpath: str) -> list[str]:
+        return await asyncio.to_thread(self._list_dir_sync, dirpath)
+
+    async def get_file_contents(self, filepath: str) -> Any:
+        await self.flush_appends(filepath)
+        return await asyncio.to_thread(self._read_text_sync, filepath)
+
+    async def _get_file_text(self, filepath: str) -> str:
+        return await asyncio.to_thread(self._read_text_sync, filepath)
+
+    def prefetch_links(self, filepath: str, content: str) -> None:
+        # Notes are read from disk, there is no cache to warm
+        return
+
+    async def get_file_range(self, filepath: str, start: int, end: int | None = None, unit: str = 'lines') -> str:
+        await self.flush_appends(filepath)
+        return await asyncio.to_thread(self._read_range_sync, filepath, start, end, unit)
+
+    async def search(self, query: str, context_length: int = 100) -> Any:
+        if self.search_index is not None and self.search_index.ready:
+            return await super().search(query, context_length)
+        await self.flush_appends()
+        return await asyncio.to_thread(self._search_sync, query, context_length)
@@ -0,0 +1,179 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any
+
+DEFAULT_SEARCH_TOP_K = 100
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [token.lower() for token in _TOKEN_RE.findall(text)]
+
+
+class SearchIndex():
+    """Inverted index over note contents with BM25 ranking.
+
+    Notes are added, replaced and removed one at a time, so the index can be
+    kept up to date incrementally. Results have the same shape as the
+    ``/search/simple/`` endpoint of the REST API.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._postings: dict[str, dict[str, int]] = {}
+        self._doc_terms: dict[str, Counter] = {}
+        self._doc_lengths: dict[str, int] = {}
+        self._contents: dict[str, str] = {}
+        self._total_length = 0
+        self._stale: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._contents
+
+    def paths(self) -> list[str]:
+        return list(self._contents)
+
+    def stale_paths(self) -> list[str]:
+        return sorted(self._stale)
+
+    def mark_stale(self, path: str) -> None:
+        """Flag a note whose contents must be refetched before the next search."""
+        self._stale.add(path.strip('/'))
+
+    def update(self, path: str, content: str) -> None:
+        path = path.strip('/')
+        terms = Counter(tokenize(content))
+
+        with self._lock:
+            self._remove(path)
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[path] = count
+            self._doc_terms[path] = terms
+            self._doc_lengths[path] = sum(terms.values())
+            self._contents[path] = content
+            self._total_length += self._doc_lengths[path]
+            self._stale.discard(path)
+
+    def remove(self, path: str) -> None:
+        path = path.strip('/')
+        with self._lock:
+            self._remove(path)
+            self._stale.discard(path)
+
+    def remove_prefix(self, prefix: str) -> None:
+        """Remove every note below a directory."""
+        with self._lock:
+            for path in [path for path in self._contents if path.startswith(prefix)]:
+                self._remove(path)
+            self._stale = set(path for path in self._stale if not path.startswith(prefix))
+
+    def _remove(self, path: str) -> None:
+        terms = self._doc_terms.pop(path, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[path]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(path)
+        del self._contents[path]
+
+    def search(self, query: str, context_length: int = 100, limit: int = DEFAULT_SEARCH_TOP_K) -> list[dict[str, Any]]:
+        """Return the top ``limit`` notes containing every term of ``query``.
+
+        Args:
+            query: Text to search for
+            context_length: Characters of context around each match
+            limit: Maximum number of notes to return
+
+        Returns:
+            List of ``{"filename", "score", "matches"}`` ordered by BM25 score
+        """
+        return self.search_page(query, context_length, 0, limit)[0]
+
+    def search_page(
+            self,
+            query: str,
+            context_length: int = 100,
+            offset: int = 0,
+            limit: int | None = None,
+        ) -> tuple[list[dict[str, Any]], int]:
+        """Return one page of the notes containing every term of ``query``.
+
+        Matches are only extracted for the notes of the page.
+
+        Args:
+            query: Text to search for
+            context_length: Characters of context around each match
+            offset: Number of best-scoring notes to skip
+            limit: Maximum number of notes to return (default: all)
+
+        Returns:
+            The page, in the shape of :meth:`search`, and the number of notes matching
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._contents:
+            return [], 0
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            candidates = set(min(postings, key=len))
+            for term_postings in postings:
+                candidates.intersection_update(term_postings)
+
+            doc_count = len(self._contents)
+            avg_length = self._total_length / doc_count
+            idf = [
+                math.log(1 + (doc_count - len(p) + 0.5) / (len(p) + 0.5))
+                for p in postings
+            ]
+
+            scored = []
+            for path in candidates:
+                length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[path] / avg_length)
+                score = 0.0
+                for term_idf, term_postings in zip(idf, postings):
+                    tf = term_postings[path]
+                    score += term_idf * tf * (self.k1 + 1) / (tf + length_norm)
+                scored.append((score, path))
+
+            if limit is None:
+                top = sorted(scored, reverse=True)[offset:]
+            else:
+                top = heapq.nlargest(offset + limit, scored)[offset:]
+            contents = {path: self._contents[path] for _, path in top}
+
+        term_set = set(terms)
+        page = [
+            {
+                'filename': path,
+                'score': round(score, 4),
+                'matches': find_matches(contents[path], term_set, context_length),
+            }
+            for score, path in top
+        ]
+        return page, len(scored)
+
+
+def find_matches(content: str, terms: set[str], context_length: int) -> list[dict[str, Any]]:
+    matches = []
+    for token in _TOKEN_RE.finditer(content):
+        if token.group().lower() not in terms:
+            continue
+        start, end = token.span()
+        matches.append({
+            'match': {'start': start, 'end': end},
+            'context': content[max(0, start - context_length):end + context_length],
+        })
+    return matches
@@ -0,0 +1,335 @@
+import bisect
+import threading
+import time
+from typing import Any
+
+from .jsonlogic import NoteData, UnsupportedQuery, apply, compile_glob, is_logic, is_result
+from .links import link_names
+
+DEFAULT_INDEX_REFRESH_SECONDS = 30.0
+STAT_FIELDS = ('ctime', 'mtime', 'size')
+# Comparison operators with their operands swapped
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+
+class NoteMetadata():
+    def __init__(
+            self,
+            path: str,
+            stat: dict | None = None,
+            tags: list[str] | None = None,
+            frontmatter: dict | None = None,
+        ):
+        self.path = path
+        self.stat = stat
+        self.tags = tags or []
+        self.frontmatter = frontmatter or {}
+        # Set when the note was written through the server and must be refetched
+        self.stale = stat is None
+
+    @classmethod
+    def from_note_json(cls, note: dict) -> 'NoteMetadata':
+        return cls(note['path'].strip('/'), note.get('stat'), note.get('tags'), note.get('frontmatter'))
+
+    @property
+    def mtime(self) -> float | None:
+        return self.stat.get('mtime') if self.stat else None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'path': self.path,
+            'stat': self.stat,
+            'tags': self.tags,
+            'frontmatter': self.frontmatter,
+        }
+
+
+def _var_name(logic: Any) -> str | None:
+    """Name of a ``{"var": name}`` without a default, or None for any other expression."""
+    if not is_logic(logic) or 'var' not in logic:
+        return None
+    name = logic['var']
+    if isinstance(name, list):
+        name = name[0] if len(name) == 1 else None
+    return name if isinstance(name, str) else None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class MetadataSnapshot():
+    """Columnar copy of note metadata for evaluating JsonLogic queries locally.
+
+    Notes are sorted by path and every field is kept in its own list. The
+    predicates queries use most are answered from indexes: tag membership
+    (``{"in": [tag, {"var": "tags"}]}``), globs on the path with a literal
+    prefix, and comparisons of ``stat`` values with numbers. When such
+    predicates make up the query or its top-level ``and``, only the notes
+    they select are evaluated.
+    """
+
+    def __init__(self, notes: list[NoteMetadata], version: int = 0):
+        self.version = version
+        notes = sorted(notes, key=lambda note: note.path)
+        self.paths = [note.path for note in notes]
+        self.tags = [note.tags for note in notes]
+        self.frontmatter = [note.frontmatter for note in notes]
+        self.stats = {field: [(note.stat or {}).get(field) for note in notes] for field in STAT_FIELDS}
+
+        self._tag_rows: dict[str, list[int]] = {}
+        for row, tags in enumerate(self.tags):
+            for tag in set(tags):
+                if isinstance(tag, str):
+                    self._tag_rows.setdefault(tag, []).append(row)
+
+        # Rows sorted by each stat field, with the sorted values to bisect
+        self._stat_order: dict[str, tuple[list[float], list[int]]] = {}
+        for field, column in self.stats.items():
+            if all(_is_number(value) for value in column):
+                rows = sorted(range(len(column)), key=column.__getitem__)
+                self._stat_order[field] = ([column[row] for row in rows], rows)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def note(self, row: int) -> NoteData:
+        return NoteData(
+            path=self.paths[row],
+            tags=self.tags[row],
+            frontmatter=self.frontmatter[row],
+            stat={field: column[row] for field, column in self.stats.items() if column[row] is not None},
+        )
+
+    def search(self, query: Any) -> list[dict[str, Any]]:
+        """Evaluate a JsonLogic query in the shape of the ``/search/`` response.
+
+        Raises:
+            UnsupportedQuery: If the query needs the REST API to be answered
+        """
+        rows = self.candidates(query)
+        results = []
+        for row in range(len(self.paths)) if rows is None else sorted(rows):
+            value = apply(query, self.note(row))
+            if is_result(value):
+                results.append({'filename': self.paths[row], 'result': value})
+        return results
+
+    def candidates(self, query: Any) -> set[int] | None:
+        """Rows that can match the query, or None if every row must be evaluated."""
+        conjuncts = [query]
+        if is_logic(query) and isinstance(query.get('and'), list):
+            conjuncts = query['and']
+
+        rows = None
+        for conjunct in conjuncts:
+            selected = self._indexed_rows(conjunct)
+            if selected is not None:
+                rows = set(selected) if rows is None else rows.intersection(selected)
+        return rows
+
+    def _indexed_rows(self, logic: Any) -> Any:
+        if not is_logic(logic):
+            return None
+        op, args = next(iter(logic.items()))
+        if not isinstance(args, list):
+            return None
+
+        if op == 'in' and len(args) == 2 and isinstance(args[0], str) and _var_name(args[1]) == 'tags':
+            return self._tag_rows.get(args[0], [])
+
+        if op == 'glob' and len(args) == 2 and isinstance(args[0], str) and _var_name(args[1]) == 'path':
+            try:
+                compile_glob(args[0])
+            except UnsupportedQuery:
+                # Left to the evaluator, which rejects it
+                return None
+            prefix = args[0].split('*', 1)[0]
+            if not prefix:
+                return None
+            return range(
+                bisect.bisect_left(self.paths, prefix),
+                bisect.bisect_left(self.paths, prefix + '\U0010ffff')
+            )
+
+        if op in _FLIPPED:
+            return self._stat_rows(op, args)
+        return None
+
+    def _stat_rows(self, op: str, args: list) -> list[int] | None:
+        if len(args) == 3 and op in ('<', '<='):
+            # Between: {"<": [low, {"var": "stat.mtime"}, high]}
+            low = self._stat_rows(op, args[:2])
+            high = self._stat_rows(op, args[1:])
+            if low is None or high is None:
+                return None
+            return list(set(low).intersection(high))
+        if len(args) != 2:
+            return None
+
+        name, value = _var_name(args[0]), args[1]
+        if name is None:
+            name, value, op = _var_name(args[1]), args[0], _FLIPPED[op]
+        if name is None or not name.startswith('stat.') or not _is_number(value):
+            return None
+        order = self._stat_order.get(name[len('stat.'):])
+        if order is None:
+            return None
+
+        values, rows = order
+        if op == '>':
+            return rows[bisect.bisect_right(values, value):]
+        if op == '>=':
+            return rows[bisect.bisect_left(values, value):]
+        if op == '<':
+            return rows[:bisect.bisect_left(values, value)]
+        return rows[:bisect.bisect_right(values, value)]
+
+
+class VaultIndex():
+    """In-process index of every file in the vault and the metadata of its notes.
+
+    Holds the path of every file plus, for markdown notes, the ``stat``,
+    ``tags`` and ``frontmatter`` from the note+json representation, so that
+    listings and metadata lookups are answered without a round trip.
+    """
+
+    def __init__(self, refresh_interval: float = DEFAULT_INDEX_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.ready = False
+        self.last_refresh: float | None = None
+        self._notes: dict[str, NoteMetadata] = {}
+        # Paths by the lowercase names links can use for them, to resolve links without a scan
+        self._by_name: dict[str, set[str]] = {}
+        # Bumped on every change, to know when the metadata snapshot is outdated
+        self.version = 0
+        self._snapshot: MetadataSnapshot | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._notes
+
+    def needs_refresh(self) -> bool:
+        return self.ready and (
+            self.last_refresh is None or time.time() - self.last_refresh >= self.refresh_interval
+        )
+
+    def get(self, path: str) -> NoteMetadata | None:
+        return self._notes.get(path.strip('/'))
+
+    def paths(self) -> list[str]:
+        return sorted(self._notes)
+
+    def notes(self) -> list[NoteMetadata]:
+        return list(self._notes.values())
+
+    def named(self, name: str) -> list[str]:
+        """Paths of the files a link can refer to by ``name``, e.g. ``note`` or ``note.md``."""
+        return list(self._by_name.get(name.lower(), ()))
+
+    def _add_name(self, path: str) -> None:
+        for name in link_names(path):
+            self._by_name.setdefault(name, set()).add(path)
+
+    def _remove_name(self, path: str) -> None:
+        for name in link_names(path):
+            paths = self._by_name.get(name)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._by_name[name]
+
+    def add_path(self, path: str) -> None:
+        """Record a file whose metadata is not known yet."""
+        path = path.strip('/')
+        with self._lock:
+            if path not in self._notes:
+                self._notes[path] = NoteMetadata(path)
+                self._add_name(path)
+                self.version += 1
+
+    def update(self, note: dict) -> None:
+        """Store the metadata of a note+json response."""
+        self.set(NoteMetadata.from_note_json(note))
+
+    def set(self, note: NoteMetadata) -> None:
+        with self._lock:
+            if note.path not in self._notes:
+                self._add_name(note.path)
+            self._notes[note.path] = note
+            self.version += 1
+
+    def mark_stale(self, path: str) -> None:
+        path = path.strip('/')
+        with self._lock:
+            note = self._notes.get(path)
+            if note is None:
+                self._notes[path] = NoteMetadata(path)
+                self._add_name(path)
+            else:
+                note.stale = True
+            self.version += 1
+
+    def remove(self, path: str) -> None:
+        path = path.strip('/')
+        with self._lock:
+            if self._notes.pop(path, None) is not None:
+                self._remove_name(path)
+            self.version += 1
+
+    def remove_prefix(self, prefix: str) -> None:
+        """Remove every file below a directory."""
+        with self._lock:
+            for path in [path for path in self._notes if path.startswith(prefix)]:
+                del self._notes[path]
+                self._remove_name(path)
+            self.version += 1
+
+    def replace(self, notes: dict[str, NoteMetadata]) -> None:
+        with self._lock:
+            self._notes = notes
+            self._by_name = {}
+            for path in notes:
+                self._add_name(path)
+            self.version += 1
+            self.ready = True
+            self.last_refresh = time.time()
+
+    def stale_notes(self) -> list[str]:
+        """Markdown notes whose metadata must be fetched again."""
+        return [note.path for note in self.notes() if note.stale and note.path.endswith('.md')]
+
+    def snapshot(self) -> MetadataSnapshot:
+        """Columnar snapshot of the metadata of every up-to-date markdown note."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self.version:
+            with self._lock:
+                version = self.version
+                notes = [note for note in self._notes.values() if note.path.endswith('.md') and not note.stale]
+            snapshot = self._snapshot = MetadataSnapshot(notes, version)
+        return snapshot
+
+    def list_dir(self, dirpath: str = "") -> list[str] | None:
+        """List a directory in the same shape as the ``/vault/`` endpoint.
+
+        Returns:
+            Names of files and ``subdirectory/`` entries, or None if the index
+            knows no files below ``dirpath``
+        """
+        prefix = dirpath.strip('/')
+        if prefix:
+            prefix += '/'
+
+        entries = set()
+        for path in self._notes:
+            if not path.startswith(prefix):
+                continue
+            name, sep, _ = path[len(prefix):].partition('/')
+            entries.add(name + sep)
+
+        if not entries:
+            return None
+        return sorted(entries)
@@ -0,0 +1,390 @@
+import functools
+import math
+import operator
+import re
+from typing import Any, Callable
+
+# Characters JavaScript strips around numbers in strings
+_JS_WHITESPACE = "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+# JavaScript's StrDecimalLiteral, a prefix of which parseFloat() reads
+_JS_DECIMAL_RE = re.compile(r"[+-]?(?:Infinity|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)")
+_JS_INTEGER_RE = re.compile(r"0[xX][0-9a-fA-F]+|0[oO][0-7]+|0[bB][01]+")
+# Glob characters whose meaning depends on how the REST API translates globs to regular expressions
+_GLOB_AMBIGUOUS = set('?[]{}\\')
+
+
+class UnsupportedQuery(Exception):
+    """Raised for queries that cannot be evaluated locally exactly like the REST API would."""
+
+
+class NoteData(dict):
+    """A note as seen by JsonLogic queries, without its content."""
+
+
+def is_logic(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1
+
+
+def truthy(value: Any) -> bool:
+    """JsonLogic truthiness: JavaScript's, except that empty arrays are falsy."""
+    if isinstance(value, list):
+        return len(value) > 0
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    if isinstance(value, dict):
+        return True
+    return bool(value)
+
+
+def is_result(value: Any) -> bool:
+    """Whether the REST API returns a note for this query result.
+
+    ``false``, ``null``, ``0``, ``[]`` and ``{}`` are left out.
+    """
+    if value is None or value is False or value == [] or value == {}:
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value != 0
+    return True
+
+
+def _to_number(value: Any) -> float:
+    """JavaScript's ``Number(value)``."""
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = value.strip(_JS_WHITESPACE)
+        if not value:
+            return 0.0
+        if _JS_DECIMAL_RE.fullmatch(value):
+            return float(value)
+        if _JS_INTEGER_RE.fullmatch(value):
+            return float(int(value, 0))
+        return math.nan
+    raise UnsupportedQuery(f"cannot convert {type(value).__name__} to a number")
+
+
+def _parse_float(value: Any) -> float:
+    """JavaScript's ``parseFloat(value)``, which reads the longest number at the start of a string."""
+    if _is_number(value):
+        return value
+    match = _JS_DECIMAL_RE.match(_to_string(value).lstrip(_JS_WHITESPACE))
+    return float(match.group()) if match else math.nan
+
+
+def _to_string(value: Any) -> str:
+    """JavaScript's ``String(value)``."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if _is_number(value):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        if abs(value) >= 1e21 or (not float(value).is_integer() and 'e' in repr(float(value))):
+            # JavaScript and Python switch to exponent notation at different magnitudes
+            raise UnsupportedQuery(f"cannot convert {value!r} to a string like JavaScript")
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ",".join("" if item is None else _to_string(item) for item in value)
+    raise UnsupportedQuery(f"cannot convert {type(value).__name__} to a string")
+
+
+def _has_astral(text: str) -> bool:
+    """Whether JavaScript sees some characters of ``text`` as two UTF-16 code units."""
+    return bool(text) and max(text) > '\uffff'
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def strict_equals(a: Any, b: Any) -> bool:
+    """JavaScript ``===``; arrays and objects are only equal to themselves."""
+    if _is_number(a) and _is_number(b):
+        return a == b
+    if isinstance(a, (list, dict)) or isinstance(b, (list, dict)):
+        return a is b
+    return type(a) is type(b) and a == b
+
+
+def loose_equals(a: Any, b: Any) -> bool:
+    """JavaScript ``==`` for the JSON types."""
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, (list, dict)) and isinstance(b, (list, dict)):
+        return a is b
+    if isinstance(a, (list, dict)) or isinstance(b, (list, dict)):
+        raise UnsupportedQuery("comparing an array or object with a primitive")
+    if type(a) is type(b) or (_is_number(a) and _is_number(b)):
+        return a == b
+    # Mixed strings, numbers and booleans are compared as numbers
+    return _to_number(a) == _to_number(b)
+
+
+def _compare(a: Any, b: Any, op: Callable[[Any, Any], bool]) -> bool:
+    if isinstance(a, str) and isinstance(b, str):
+        if _has_astral(a) or _has_astral(b):
+            # JavaScript compares UTF-16 code units
+            return op(a.encode('utf-16-be'), b.encode('utf-16-be'))
+        return op(a, b)
+    a, b = _to_number(a), _to_number(b)
+    if math.isnan(a) or math.isnan(b):
+        return False
+    return op(a, b)
+
+
+def _var(values: list, data: Any) -> Any:
+    path = values[0] if values else None
+    default = values[1] if len(values) > 1 else None
+    if path is None or path == "":
+        if isinstance(data, NoteData):
+            raise UnsupportedQuery("the whole note includes its content, which is not indexed")
+        return data
+
+    parts = _to_string(path).split('.')
+    if parts[0] == 'content' and isinstance(data, NoteData):
+        raise UnsupportedQuery("note content is not indexed")
+
+    current = data
+    for part in parts:
+        # A null found on the way is not found, but a null value is returned as is
+        if current is None:
+            return default
+        if isinstance(current, str) and _has_astral(current):
+            raise UnsupportedQuery("indexing strings with characters outside the BMP")
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, (list, str)) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        elif isinstance(current, (list, str)) and part == 'length':
+            current = len(current)
+        else:
+            return default
+    return current
+
+
+def _missing(values: list, data: Any) -> list:
+    keys = values[0] if values and isinstance(values[0], list) else values
+    return [key for key in keys if _var([key], data) in (None, "")]
+
+
+def _missing_some(values: list, data: Any) -> list:
+    need, keys = values[0], values[1]
+    missing = _missing(keys, data)
+    return [] if len(keys) - len(missing) >= _to_number(need) else missing
+
+
+def _to_integer(value: Any) -> int:
+    number = _to_number(value)
+    if math.isnan(number):
+        return 0
+    if math.isinf(number):
+        raise UnsupportedQuery("infinite string position")
+    return int(number)
+
+
+def _substr(values: list) -> str:
+    """``String(source).substr(start, length)``, a negative length dropping characters from the end."""
+    text = _to_string(values[0] if values else None)
+    if _has_astral(text):
+        raise UnsupportedQuery("substrings of strings with characters outside the BMP")
+    start = _to_integer(values[1]) if len(values) > 1 else 0
+    if start < 0:
+        start = max(0, len(text) + start)
+    if len(values) > 2:
+        length = _to_integer(values[2])
+        end = len(text) + length if length < 0 else start + length
+        return text[start:max(start, end)]
+    return text[start:]
+
+
+@functools.lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> re.Pattern:
+    """Regular expression of a glob pattern, which the REST API anchors and where ``*`` matches any characters.
+
+    Raises:
+        UnsupportedQuery: For patterns using ``?``, brackets, braces or
+            backslashes, whose meaning depends on the glob translation
+    """
+    if _GLOB_AMBIGUOUS.intersection(pattern):
+        raise UnsupportedQuery(f"glob pattern {pattern!r} uses characters other than '*'")
+    # JavaScript's '.' does not match line terminators
+    return re.compile("[^\n\r\u2028\u2029]*".join(re.escape(part) for part in pattern.split('*')))
+
+
+def _glob(values: list) -> bool:
+    pattern = values[0] if values else None
+    value = values[1] if len(values) > 1 else None
+    if not isinstance(pattern, str) or not isinstance(value, str):
+        return False
+    return compile_glob(pattern).fullmatch(value) is not None
+
+
+def _arithmetic(op: str, values: list) -> float:
+    if op == '*' and not values:
+        raise UnsupportedQuery("* of no values")
+    if op in ('+', '*'):
+        # Both convert every value with parseFloat()
+        numbers = [_parse_float(value) for value in values]
+        return sum(numbers) if op == '+' else math.prod(numbers)
+    if not values or (op != '-' and len(values) < 2):
+        raise UnsupportedQuery(f"{op} needs two values")
+    numbers = [_to_number(value) for value in values]
+    if op == '-':
+        return -numbers[0] if len(numbers) == 1 else numbers[0] - numbers[1]
+    if numbers[1] == 0:
+        raise UnsupportedQuery("division by zero")
+    if op == '/':
+        return numbers[0] / numbers[1]
+    return math.fmod(numbers[0], numbers[1])
+
+
+def _number_result(value: float) -> float | int:
+    if math.isnan(value) or math.isinf(value):
+        raise UnsupportedQuery("result is not a finite number")
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def apply(logic: Any, data: Any) -> Any:
+    """Evaluate a JsonLogic expression against ``data``.
+
+    Implements the operators of jsonlogic.com, with the JavaScript
+    semantics of json-logic-js that the Local REST API runs, plus its
+    ``glob`` operator.
+
+    Raises:
+        UnsupportedQuery: For operators or values that would need the REST
+            API to answer, e.g. the note content, ``regexp`` whose patterns
+            are JavaScript regular expressions, or values whose JavaScript
+            conversions are not reproduced exactly
+    """
+    if isinstance(logic, list):
+        return [apply(item, data) for item in logic]
+    if not is_logic(logic):
+        return logic
+
+    op, values = next(iter(logic.items()))
+    if not isinstance(values, list):
+        values = [values]
+
+    # Operators that evaluate their arguments lazily
+    if op in ('if', '?:'):
+        i = 0
+        while i < len(values) - 1:
+            if truthy(apply(values[i], data)):
+                return apply(values[i + 1], data)
+            i += 2
+        return apply(values[i], data) if i == len(values) - 1 else None
+    if op == 'and':
+        current = None
+        for value in values:
+            current = apply(value, data)
+            if not truthy(current):
+                return current
+        return current
+    if op == 'or':
+        current = None
+        for value in values:
+            current = apply(value, data)
+            if truthy(current):
+                return current
+        return current
+    if op in ('map', 'filter', 'all', 'none', 'some', 'reduce'):
+        items = original_items = apply(values[0], data) if values else None
+        if not isinstance(items, list):
+            items = []
+        body = values[1] if len(values) > 1 else None
+        if op == 'map':
+            return [apply(body, item) for item in items]
+        if op == 'filter':
+            return [item for item in items if truthy(apply(body, item))]
+        if op == 'all':
+            if items is not original_items:
+                # json-logic-js reads the length of anything that is not an array, or fails on null
+                raise UnsupportedQuery("all over a value that is not an array")
+            return bool(items) and all(truthy(apply(body, item)) for item in items)
+        if op == 'none':
+            return not any(truthy(apply(body, item)) for item in items)
+        if op == 'some':
+            return any(truthy(apply(body, item)) for item in items)
+        accumulator = apply(values[2], data) if len(values) > 2 else None
+        for item in items:
+            accumulator = apply(body, {'current': item, 'accumulator': accumulator})
+        return accumulator
+
+    args = [apply(value, data) for value in values]
+    # Missing arguments are undefined in JavaScript
+    first = args[0] if args else None
+    second = args[1] if len(args) > 1 else None
+
+    if op == 'var':
+        return _var(args, data)
+    if op == 'missing':
+        return _missing(args, data)
+    if op == 'missing_some':
+        return _missing_some(args, data)
+    if op == '==':
+        return loose_equals(first, second)
+    if op == '!=':
+        return not loose_equals(first, second)
+    if op == '===':
+        return strict_equals(first, second)
+    if op == '!==':
+        return not strict_equals(first, second)
+    if op == '!':
+        return not truthy(first)
+    if op == '!!':
+        return truthy(first)
+    if op in ('<', '<='):
+        compare = operator.lt if op == '<' else operator.le
+        if len(args) == 3:
+            return _compare(first, second, compare) and _compare(second, args[2], compare)
+        return _compare(first, second, compare)
+    if op in ('>', '>='):
+        return _compare(first, second, operator.gt if op == '>' else operator.ge)
+    if op in ('max', 'min'):
+        if not args:
+            raise UnsupportedQuery(f"{op} of no values")
+        numbers = [_to_number(arg) for arg in args]
+        if any(math.isnan(number) for number in numbers):
+            raise UnsupportedQuery(f"{op} of a value that is not a number")
+        return _number_result(max(numbers) if op == 'max' else min(numbers))
+    if op == '*' and len(args) == 1:
+        # Reduced without an initial value, so a single value is returned as is
+        return first
+    if op in ('+', '-', '*', '/', '%'):
+        return _number_result(_arithmetic(op, args))
+    if op == 'in':
+        # json-logic-js returns false for falsy haystacks such as ''
+        if isinstance(second, str) and second:
+            return _to_string(first) in second
+        if isinstance(second, list):
+            return any(strict_equals(first, item) for item in second)
+        return False
+    if op == 'cat':
+        # Joined like Array.prototype.join, where null is empty
+        return "".join("" if arg is None else _to_string(arg) for arg in args)
+    if op == 'substr':
+        return _substr(args)
+    if op == 'merge':
+        merged = []
+        for arg in args:
+            merged.extend(arg if isinstance(arg, list) else [arg])
+        return merged
+    if op == 'log':
+        return first
+    if op == 'glob':
+        return _glob(args)
+    if op == 'regexp':
+        raise UnsupportedQuery("regexp patterns are JavaScript regular expressions")
+
+    raise UnsupportedQuery(f"unsupported operator {op!r}")
@@ -0,0 +1,271 @@
+import posixpath
+import re
+import threading
+from collections import deque
+from collections.abc import Iterable
+from typing import Any
+
+DEFAULT_NEIGHBORHOOD_MAX_NOTES = 100
+
+# [[target]], [[target#heading]], [[target|alias]] and the embedded ![[target]]
+_WIKILINK_RE = re.compile(r"!?\[\[([^\[\]|#^\n]*)(?:[#^][^\[\]|\n]*)?(?:\|[^\[\]\n]*)?\]\]")
+# Links inside code are not links in Obsidian either
+_CODE_RE = re.compile(r"```.*?(?:```|$)|`[^`\n]*`", re.DOTALL)
+
+
+def parse_links(content: str) -> list[str]:
+    """Targets of the wikilinks and embeds of a note, without headings, blocks or aliases."""
+    content = _CODE_RE.sub("", content)
+    targets = []
+    for match in _WIKILINK_RE.finditer(content):
+        target = match.group(1).strip()
+        # [[#Heading]] links to the note itself
+        if target:
+            targets.append(target)
+    return list(dict.fromkeys(targets))
+
+
+def link_names(path: str) -> list[str]:
+    """Names a link can use to refer to a file: its file name, and for notes also without ``.md``."""
+    name = posixpath.basename(path).lower()
+    return [name, name[:-len('.md')]] if name.endswith('.md') else [name]
+
+
+def resolve_link(source: str, target: str, paths: Iterable[str]) -> str | None:
+    """Find the file a link from ``source`` refers to among ``paths``.
+
+    Links are resolved the way Obsidian does: by file name anywhere in the
+    vault, or by path when the link contains a folder, preferring a file in
+    the folder of the linking note and then the shortest path.
+    """
+    key = target.strip('/').lower()
+    name = posixpath.basename(key)
+    candidates = [path for path in paths if name in link_names(path)]
+    if '/' in key:
+        candidates = [
+            path for path in candidates
+            if any(
+                candidate == key or candidate.endswith('/' + key)
+                for candidate in (path.lower(), path.lower()[:-len('.md')])
+            )
+        ]
+    if not candidates:
+        return None
+
+    folder = posixpath.dirname(source)
+    return min(candidates, key=lambda path: (posixpath.dirname(path) != folder, path.count('/'), path))
+
+
+class LinkGraph():
+    """Graph of the wikilinks and embeds between the notes of the vault.
+
+    Links are resolved like :func:`resolve_link` does. Notes are added,
+    replaced and removed one at a time; links whose resolution may change
+    with them are resolved again, so the graph stays correct incrementally.
+    Links to files that do not exist are kept as unresolved.
+    """
+
+    def __init__(self):
+        self.ready = False
+        # Files links can resolve to, by lowercase name
+        self._files: set[str] = set()
+        self._by_name: dict[str, set[str]] = {}
+        # Notes whose contents were parsed, with their link targets as written
+        self._targets: dict[str, list[str]] = {}
+        # Notes linking to a target with a given name, resolved or not
+        self._linkers: dict[str, set[str]] = {}
+        self._forward: dict[str, set[str]] = {}
+        self._backward: dict[str, set[str]] = {}
+        self._unresolved: dict[str, list[str]] = {}
+        self._stale: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def __contains__(self, path: str) -> bool:
+        return path.strip('/') in self._files
+
+    def paths(self) -> list[str]:
+        return list(self._files)
+
+    def stale_paths(self) -> list[str]:
+        return sorted(self._stale)
+
+    def mark_stale(self, path: str) -> None:
+        """Flag a note whose contents must be refetched before the next traversal."""
+        self._stale.add(path.strip('/'))
+
+    def add_file(self, path: str) -> None:
+        """Make a file without parsed contents, e.g. an attachment, a valid link target."""
+        path = path.strip('/')
+        with self._lock:
+            if path not in self._files:
+                self._add_file(path)
+
+    def update(self, path: str, content: str) -> None:
+        path = path.strip('/')
+        targets = parse_links(content)
+
+        with self._lock:
+            self._remove_links(path)
+            if path not in self._files:
+                self._add_file(path)
+            self._targets[path] = targets
+            for target in targets:
+                self._linkers.setdefault(posixpath.basename(target).lower(), set()).add(path)
+            self._resolve(path)
+            self._stale.discard(path)
+
+    def remove(self, path: str) -> None:
+        path = path.strip('/')
+        with self._lock:
+            self._remove(path)
+            self._stale.discard(path)
+
+    def remove_prefix(self, prefix: str) -> None:
+        """Remove every file below a directory."""
+        with self._lock:
+            for path in [path for path in self._files if path.startswith(prefix)]:
+                self._remove(path)
+            self._stale = set(path for path in self._stale if not path.startswith(prefix))
+
+    def _add_file(self, path: str) -> None:
+        self._files.add(path)
+        for name in link_names(path):
+            self._by_name.setdefault(name, set()).add(path)
+        self._resolve_linkers(path)
+
+    def _remove(self, path: str) -> None:
+        if path not in self._files:
+            return
+        self._remove_links(path)
+        self._targets.pop(path, None)
+        self._files.discard(path)
+        for name in link_names(path):
+            paths = self._by_name[name]
+            paths.discard(path)
+            if not paths:
+                del self._by_name[name]
+        self._resolve_linkers(path)
+
+    def _remove_links(self, path: str) -> None:
+        for target in self._targets.get(path, []):
+            name = posixpath.basename(target).lower()
+            linkers = self._linkers.get(name)
+            if linkers is not None:
+                linkers.discard(path)
+                if not linkers:
+                    del self._linkers[name]
+        for linked in self._forward.pop(path, set()):
+            self._backward[linked].discard(path)
+            if not self._backward[linked]:
+                del self._backward[linked]
+        self._unresolved.pop(path, None)
+
+    def _resolve_linkers(self, path: str) -> None:
+        """Resolve again the links of notes that may refer to a file added or removed."""
+        linkers = set()
+        for name in link_names(path):
+            linkers.update(self._linkers.get(name, ()))
+        for linker in linkers:
+            self._resolve(linker)
+
+    def _resolve(self, path: str) -> None:
+        for linked in self._forward.pop(path, set()):
+            self._backward[linked].discard(path)
+            if not self._backward[linked]:
+                del self._backward[linked]
+
+        forward, unresolved = set(), []
+        for target in self._targets.get(path, []):
+            linked = self._resolve_target(path, target)
+            if linked is None:
+                unresolved.append(target)
+            elif linked != path:
+                forward.add(linked)
+
+        if forward:
+            self._forward[path] = forward
+        for linked in forward:
+            self._backward.setdefault(linked, set()).add(path)
+        if unresolved:
+            self._unresolved[path] = unresolved
+        else:
+            self._unresolved.pop(path, None)
+
+    def _resolve_target(self, source: str, target: str) -> str | None:
+        return resolve_link(source, target, self._by_name.get(posixpath.basename(target.strip('/').lower()), ()))
+
+    def resolve(self, source: str, target: str) -> str | None:
+        """The file a link from ``source`` refers to, if it exists."""
+        with self._lock:
+            return self._resolve_target(source.strip('/'), target)
+
+    def links(self, path: str) -> dict[str, Any]:
+        """Outgoing links, backlinks and unresolved links of a note."""
+        path = path.strip('/')
+        with self._lock:
+            return {
+                'path': path,
+                'links': sorted(self._forward.get(path, ())),
+                'backlinks': sorted(self._backward.get(path, ())),
+                'unresolved': list(self._unresolved.get(path, ())),
+            }
+
+    def neighborhood(
+            self,
+            path: str,
+            depth: int = 1,
+            direction: str = 'both',
+            max_notes: int = DEFAULT_NEIGHBORHOOD_MAX_NOTES,
+        ) -> dict[str, Any]:
+        """Notes within ``depth`` links of a note, found breadth-first.
+
+        Args:
+            path: Note to start from
+            depth: Maximum number of links followed
+            direction: 'out' follows links, 'in' follows backlinks, 'both' follows either
+            max_notes: Maximum number of notes returned, the start note included
+
+        Returns:
+            ``{"path", "notes", "edges", "truncated"}`` where ``notes`` lists
+            ``{"path", "distance"}`` by distance and ``edges`` the links
+            ``[from, to]`` between returned notes
+        """
+        path = path.strip('/')
+        with self._lock:
+            distances = {path: 0}
+            queue = deque([path])
+            truncated = False
+            while queue and not truncated:
+                current = queue.popleft()
+                if distances[current] >= depth:
+                    continue
+                neighbors = set()
+                if direction in ('out', 'both'):
+                    neighbors.update(self._forward.get(current, ()))
+                if direction in ('in', 'both'):
+                    neighbors.update(self._backward.get(current, ()))
+                for neighbor in sorted(neighbors):
+                    if neighbor in distances:
+                        continue
+                    if len(distances) >= max_notes:
+                        truncated = True
+                        break
+                    distances[neighbor] = distances[current] + 1
+                    queue.append(neighbor)
+
+            edges = [
+                [source, linked]
+                for source in distances
+                for linked in sorted(self._forward.get(source, ()))
+                if linked in distances
+            ]
+
+        return {
+            'path': path,
+            'notes': [{'path': note, 'distance': distance} for note, distance in distances.items()],
+            'edges': edges,
+            'truncated': truncated,
+        }
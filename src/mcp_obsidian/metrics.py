@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger("mcp-obsidian")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_METRICS_FILE_INTERVAL = 15.0
+
+
+class Histogram():
+    """Cumulative latency histogram with fixed buckets, as used by Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile by interpolating inside the matching bucket."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+    def summary(self) -> dict[str, Any]:
+        p50 = self.quantile(0.5)
+        p99 = self.quantile(0.99)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else None,
+            'p50_ms': round(p50 * 1000, 3) if p50 is not None else None,
+            'p99_ms': round(p99 * 1000, 3) if p99 is not None else None,
+        }
+
+
+def route_of(path: str) -> str:
+    """Collapse a REST API path to its route so vault paths do not become labels."""
+    if path.startswith('/vault/'):
+        return '/vault/{dir}/' if path.endswith('/') else '/vault/{file}'
+    if path.startswith('/periodic/'):
+        return '/periodic/{period}/recent' if path.rstrip('/').endswith('/recent') else '/periodic/{period}/'
+    return path
+
+
+class Metrics():
+    """Process-wide registry of tool and upstream HTTP metrics."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._tool_latency: dict[str, Histogram] = {}
+        self._tool_errors: dict[str, int] = {}
+        self._http_latency: dict[tuple[str, str], Histogram] = {}
+        self._http_status: dict[tuple[str, str, str], int] = {}
+        self._http_request_bytes: dict[tuple[str, str], int] = {}
+        self._http_response_bytes: dict[tuple[str, str], int] = {}
+        self._http_retries: dict[tuple[str, str], int] = {}
+        self._http_hedges: dict[tuple[str, str], int] = {}
+        self._dropped_appends = 0
+        self._caches: dict[str, Any] = {}
+
+    def register_cache(self, name: str, cache: Any) -> None:
+        """Report hit rate of an object with ``hits`` and ``misses`` counters."""
+        self._caches[name] = cache
+
+    def record_tool(self, tool: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self._tool_latency.setdefault(tool, Histogram()).observe(seconds)
+            if error:
+                self._tool_errors[tool] = self._tool_errors.get(tool, 0) + 1
+
+    def record_http(
+            self,
+            method: str,
+            path: str,
+            status: int | str,
+            seconds: float,
+            request_bytes: int = 0,
+            response_bytes: int = 0,
+        ) -> None:
+        key = (method, route_of(path))
+        with self._lock:
+            self._http_latency.setdefault(key, Histogram()).observe(seconds)
+            status_key = key + (str(status),)
+            self._http_status[status_key] = self._http_status.get(status_key, 0) + 1
+            self._http_request_bytes[key] = self._http_request_bytes.get(key, 0) + request_bytes
+            self._http_response_bytes[key] = self._http_response_bytes.get(key, 0) + response_bytes
+
+    def record_retry(self, method: str, path: str) -> None:
+        key = (method, route_of(path))
+        with self._lock:
+            self._http_retries[key] = self._http_retries.get(key, 0) + 1
+
+    def record_hedge(self, method: str, path: str) -> None:
+        key = (method, route_of(path))
+        with self._lock:
+            self._http_hedges[key] = self._http_hedges.get(key, 0) + 1
+
+    def record_dropped_appends(self, count: int) -> None:
+        """Count buffered appends given up after their writes kept failing."""
+        with self._lock:
+            self._dropped_appends += count
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            tools = {
+                tool: histogram.summary() | {'errors': self._tool_errors.get(tool, 0)}
+                for tool, histogram in sorted(self._tool_latency.items())
+            }
+            http = {}
+            for (method, route), histogram in sorted(self._http_latency.items()):
+                http[f"{method} {route}"] = histogram.summary() | {
+                    'status': {
+                        status: count for (m, r, status), count in self._http_status.items()
+                        if (m, r) == (method, route)
+                    },
+                    'request_bytes': self._http_request_bytes.get((method, route), 0),
+                    'response_bytes': self._http_response_bytes.get((method, route), 0),
+                    'retries': self._http_retries.get((method, route), 0),
+                    'hedges': self._http_hedges.get((method, route), 0),
+                }
+
+        caches = {}
+        for name, cache in self._caches.items():
+            lookups = cache.hits + cache.misses
+            caches[name] = {
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'hit_rate': round(cache.hits / lookups, 4) if lookups else None,
+            }
+
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'tools': tools,
+            'upstream_http': http,
+            'caches': caches,
+            'dropped_appends': self._dropped_appends,
+        }
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram_lines(name: str, labels: str, histogram: Histogram):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        with self._lock:
+            lines.append('# HELP mcp_obsidian_tool_duration_seconds Latency of MCP tool calls.')
+            lines.append('# TYPE mcp_obsidian_tool_duration_seconds histogram')
+            for tool, histogram in sorted(self._tool_latency.items()):
+                histogram_lines('mcp_obsidian_tool_duration_seconds', f'tool="{tool}"', histogram)
+
+            lines.append('# HELP mcp_obsidian_tool_errors_total MCP tool calls that raised an error.')
+            lines.append('# TYPE mcp_obsidian_tool_errors_total counter')
+            for tool, count in sorted(self._tool_errors.items()):
+                lines.append(f'mcp_obsidian_tool_errors_total{{tool="{tool}"}} {count}')
+
+            lines.append('# HELP mcp_obsidian_http_duration_seconds Latency of requests to the Local REST API.')
+            lines.append('# TYPE mcp_obsidian_http_duration_seconds histogram')
+            for (method, route), histogram in sorted(self._http_latency.items()):
+                histogram_lines('mcp_obsidian_http_duration_seconds', f'method="{method}",route="{route}"', histogram)
+
+            lines.append('# HELP mcp_obsidian_http_requests_total Requests to the Local REST API by status code.')
+            lines.append('# TYPE mcp_obsidian_http_requests_total counter')
+            for (method, route, status), count in sorted(self._http_status.items()):
+                lines.append(f'mcp_obsidian_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            for name, values, help_text in (
+                ('mcp_obsidian_http_request_bytes_total', self._http_request_bytes, 'Bytes sent to the Local REST API.'),
+                ('mcp_obsidian_http_response_bytes_total', self._http_response_bytes, 'Bytes received from the Local REST API.'),
+                ('mcp_obsidian_http_retries_total', self._http_retries, 'Retried requests to the Local REST API.'),
+                ('mcp_obsidian_http_hedges_total', self._http_hedges, 'Duplicate requests sent for slow reads.'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (method, route), value in sorted(values.items()):
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {value}')
+
+            lines.append('# HELP mcp_obsidian_dropped_appends_total Buffered appends given up after failed writes.')
+            lines.append('# TYPE mcp_obsidian_dropped_appends_total counter')
+            lines.append(f'mcp_obsidian_dropped_appends_total {self._dropped_appends}')
+
+        lines.append('# HELP mcp_obsidian_cache_lookups_total Cache lookups by result.')
+        lines.append('# TYPE mcp_obsidian_cache_lookups_total counter')
+        for name, cache in sorted(self._caches.items()):
+            lines.append(f'mcp_obsidian_cache_lookups_total{{cache="{name}",result="hit"}} {cache.hits}')
+            lines.append(f'mcp_obsidian_cache_lookups_total{{cache="{name}",result="miss"}} {cache.misses}')
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, path: str) -> None:
+        """Atomically write the metrics, e.g. for the node_exporter textfile collector."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    async def write_prometheus_file_periodically(self, path: str, interval: float = DEFAULT_METRICS_FILE_INTERVAL) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.write_prometheus_file, path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {path}: {str(e)}")
+            await asyncio.sleep(interval)
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serve the metrics over HTTP at ``/metrics``."""
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                request_line = await reader.readline()
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                if request_line.split(b' ')[1:2] == [b'/metrics']:
+                    status, body = '200 OK', self.render_prometheus().encode('utf-8')
+                else:
+                    status, body = '404 Not Found', b'Not Found\n'
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('ascii') + body
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        async with server:
+            await server.serve_forever()
+
+
+registry = Metrics()
+
+
+class MetricsTransport(httpx.AsyncBaseTransport):
+    """httpx transport wrapper that records every request to the Local REST API."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        path = request.url.path
+        request_bytes = int(request.headers.get('Content-Length', 0))
+        try:
+            response = await self.transport.handle_async_request(request)
+            # Read the body here so the latency covers the whole response
+            response_bytes = len(await response.aread())
+        except Exception:
+            registry.record_http(request.method, path, 'error', time.perf_counter() - started, request_bytes)
+            raise
+        registry.record_http(
+            request.method, path, response.status_code, time.perf_counter() - started, request_bytes, response_bytes
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
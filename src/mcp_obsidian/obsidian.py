@@ -1,6 +1,108 @@
-import requests
+import asyncio
+import fnmatch
+import httpx
+import logging
+import posixpath
+import time
 import urllib.parse
-from typing import Any
+from typing import TYPE_CHECKING, Any
+from .cache import ALL_STATS_QUERY, NoteCache, QueryCache, query_key
+from .changes import ChangeFeed
+from .coalesce import AppendBuffer, AsyncSingleFlight, DEFAULT_COALESCE_MAX_BYTES
+from .fulltext import SearchIndex
+from .index import NoteMetadata, VaultIndex
+from .jsonlogic import UnsupportedQuery
+from .links import DEFAULT_NEIGHBORHOOD_MAX_NOTES, LinkGraph, resolve_link
+from .metrics import MetricsTransport
+from .prefetch import DEFAULT_PREFETCH_CONCURRENCY, DEFAULT_PREFETCH_MAX_BYTES, Prefetcher
+from .resilience import RequestPolicy, ResilientTransport
+from .sections import find_section, frontmatter_field, slice_bytes, slice_lines
+from .store import DEFAULT_STORE_FLUSH_SECONDS, PersistentStore
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("mcp-obsidian")
+
+DEFAULT_BATCH_CONCURRENCY = 8
+NOTE_JSON_CONTENT_TYPE = 'application/vnd.olrapi.note+json'
+# Index refreshes between two crawls of the directory listings, which find added and deleted attachments
+INDEX_LISTING_REFRESHES = 10
+
+
+class ObsidianError(Exception):
+    """Error answered by the Local REST API, or raised while calling it.
+
+    ``status_code`` is the HTTP status of the response, or None if no
+    response was received.
+    """
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _log_task_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task failed: {task.exception()}")
+
+
+def _batch_budget_exhausted(sizes: dict[int, int], index: int, max_bytes: int | None) -> bool:
+    """Whether files before ``index`` already used up the byte budget.
+
+    Only earlier files count, so skipping a fetch never changes the output.
+    """
+    if max_bytes is None:
+        return False
+    return sum(size for i, size in sizes.items() if i < index) >= max_bytes
+
+
+def _format_batch_contents(filepaths: list[str], results: list, max_bytes: int | None = None) -> str:
+    """Concatenate batch results in request order, applying the byte budget.
+
+    Each result is the file content, the exception raised while reading it,
+    or None if the file was skipped because the budget was exhausted.
+    """
+    result = []
+    remaining = max_bytes
+
+    for filepath, content in zip(filepaths, results):
+        if isinstance(content, Exception):
+            # Add error message but continue processing other files
+            result.append(f"# {filepath}\n\nError reading file: {str(content)}\n\n---\n\n")
+            continue
+
+        if remaining is not None:
+            if content is None or remaining <= 0:
+                result.append(f"# {filepath}\n\nSkipped: byte budget of {max_bytes} bytes exhausted\n\n---\n\n")
+                continue
+
+            data = content.encode('utf-8')
+            if len(data) > remaining:
+                content = data[:remaining].decode('utf-8', errors='ignore') + "\n\n[Truncated: byte budget exhausted]"
+                remaining = 0
+            else:
+                remaining -= len(data)
+
+        result.append(f"# {filepath}\n\n{content}\n\n---\n\n")
+
+    return "".join(result)
+
+
+def _group_writes_by_file(operations: list[dict]) -> list[list[int]]:
+    """Group the indexes of write operations by file, keeping their order."""
+    groups: dict[str, list[int]] = {}
+    for i, operation in enumerate(operations):
+        groups.setdefault(operation['filepath'].strip('/'), []).append(i)
+    return list(groups.values())
+
+
+def _write_result(operation: dict, status: str, error: Exception | None = None) -> dict:
+    result = {'filepath': operation['filepath'], 'type': operation['type'], 'status': status}
+    if error is not None:
+        result['error'] = str(error)
+    return result
+
 
 class Obsidian():
     def __init__(
@@ -10,6 +112,7 @@ class Obsidian():
             host: str = "127.0.0.1",
             port: int = 27124,
             verify_ssl: bool = False,
+            pool_size: int = 10,
         ):
         self.api_key = api_key
         self.protocol = protocol
@@ -17,6 +120,27 @@ class Obsidian():
         self.port = port
         self.verify_ssl = verify_ssl
         self.timeout = (3, 6)
+        self.pool_size = pool_size
+        self.session = self._create_session()
+
+    def _create_session(self) -> "requests.Session":
+        """Create a session that keeps connections to the REST API alive.
+
+        Reusing one session avoids a new TCP+TLS handshake on every call.
+        """
+        # Imported here so the MCP server, which only uses AsyncObsidian, starts faster
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.verify = self.verify_ssl
+        return session
+
+    def close(self) -> None:
+        self.session.close()
 
     def get_base_url(self) -> str:
         return f'{self.protocol}://{self.host}:{self.port}'
@@ -28,6 +152,8 @@ class Obsidian():
         return headers
 
     def _safe_call(self, f) -> Any:
+        import requests
+
         try:
             return f()
         except requests.HTTPError as e:
@@ -36,13 +162,13 @@ class Obsidian():
             message = error_data.get('message', '<unknown>')
             raise Exception(f"Error {code}: {message}")
         except requests.exceptions.RequestException as e:
-            raise Exception(f"Request failed: {str(e)}")
+            raise Exception(f"Request failed: {str(e) or type(e).__name__}")
 
     def list_files_in_vault(self) -> Any:
         url = f"{self.get_base_url()}/vault/"
         
         def call_fn():
-            response = requests.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             
             return response.json()['files']
@@ -54,7 +180,7 @@ class Obsidian():
         url = f"{self.get_base_url()}/vault/{dirpath}/"
         
         def call_fn():
-            response = requests.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             
             return response.json()['files']
@@ -65,7 +191,7 @@ class Obsidian():
         url = f"{self.get_base_url()}/vault/{filepath}"
     
         def call_fn():
-            response = requests.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             
             return response.text
@@ -101,7 +227,7 @@ class Obsidian():
         }
         
         def call_fn():
-            response = requests.post(url, headers=self._get_headers(), params=params, verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.post(url, headers=self._get_headers(), params=params, verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
 
@@ -111,7 +237,7 @@ class Obsidian():
         url = f"{self.get_base_url()}/vault/{filepath}"
         
         def call_fn():
-            response = requests.post(
+            response = self.session.post(
                 url, 
                 headers=self._get_headers() | {'Content-Type': 'text/markdown'}, 
                 data=content,
@@ -134,7 +260,7 @@ class Obsidian():
         }
         
         def call_fn():
-            response = requests.patch(url, headers=headers, data=content, verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.patch(url, headers=headers, data=content, verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             return None
 
@@ -148,7 +274,7 @@ class Obsidian():
         }
         
         def call_fn():
-            response = requests.post(url, headers=headers, json=query, verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.post(url, headers=headers, json=query, verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
 
@@ -166,7 +292,7 @@ class Obsidian():
         url = f"{self.get_base_url()}/periodic/{period}/"
         
         def call_fn():
-            response = requests.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
+            response = self.session.get(url, headers=self._get_headers(), verify=self.verify_ssl, timeout=self.timeout)
             response.raise_for_status()
             
             return response.text
@@ -191,7 +317,7 @@ class Obsidian():
         }
         
         def call_fn():
-            response = requests.get(
+            response = self.session.get(
                 url, 
                 headers=self._get_headers(), 
                 params=params,
@@ -232,7 +358,7 @@ class Obsidian():
         }
         
         def call_fn():
-            response = requests.post(
+            response = self.session.post(
                 url,
                 headers=headers,
                 data=dql_query.encode('utf-8'),
@@ -243,3 +369,1116 @@ class Obsidian():
             return response.json()
 
         return self._safe_call(call_fn)
+
+
+class AsyncObsidian():
+    """Asyncio counterpart of :class:`Obsidian` backed by a pooled ``httpx.AsyncClient``.
+
+    Exposes the same methods as :class:`Obsidian` as coroutines so that tool
+    calls never block the MCP event loop.
+    """
+
+    def __init__(
+            self, 
+            api_key: str,
+            protocol: str = 'https',
+            host: str = "127.0.0.1",
+            port: int = 27124,
+            verify_ssl: bool = False,
+            pool_size: int = 10,
+            cache: NoteCache | None = None,
+            query_cache: QueryCache | None = None,
+            index: VaultIndex | None = None,
+            search_index: SearchIndex | None = None,
+            coalesce_seconds: float = 0,
+            coalesce_max_bytes: int = DEFAULT_COALESCE_MAX_BYTES,
+            request_policy: RequestPolicy | None = None,
+            local_jsonlogic: bool = False,
+            link_graph: LinkGraph | None = None,
+            store: PersistentStore | None = None,
+            prefetch_links: int = 0,
+            prefetch_concurrency: int = DEFAULT_PREFETCH_CONCURRENCY,
+            prefetch_max_bytes: int = DEFAULT_PREFETCH_MAX_BYTES,
+        ):
+        self.api_key = api_key
+        self.protocol = protocol
+        self.host = host
+        self.port = port
+        self.verify_ssl = verify_ssl
+        # Timeouts are set per request by the policy, these are the defaults
+        self.request_policy = request_policy or RequestPolicy()
+        self.timeout = httpx.Timeout(self.request_policy.timeout, connect=self.request_policy.connect_timeout)
+        self.pool_size = pool_size
+        self.cache = cache
+        self.query_cache = query_cache
+        # Identical reads made concurrently share one request
+        self.single_flight = AsyncSingleFlight()
+        self.index = index
+        self.search_index = search_index
+        self.link_graph = link_graph
+        # Answer JsonLogic searches from the vault index when they do not need note contents
+        self.local_jsonlogic = local_jsonlogic
+        # Notes changed between calls of get_changes
+        self.change_feed = ChangeFeed()
+        # Notes linked from a note that was read are fetched into the cache ahead of time
+        self.prefetcher = None
+        if prefetch_links > 0 and cache is not None:
+            self.prefetcher = Prefetcher(
+                self._prefetch_note,
+                self._resolve_link,
+                prefetch_links,
+                prefetch_concurrency,
+                prefetch_max_bytes
+            )
+        # Keeps cached contents and the vault index across restarts
+        self.store = store
+        self._persisted_index_version: int | None = None
+        # Appends are written immediately unless coalescing is enabled
+        self.append_buffer = (
+            AppendBuffer(self._append_now, coalesce_seconds, coalesce_max_bytes) if coalesce_seconds > 0 else None
+        )
+        # Set while a VaultWatcher reports changes, which makes polling for them unnecessary
+        self.watching = False
+        self._background_tasks: set[asyncio.Task] = set()
+        self._index_lock = asyncio.Lock()
+        self._index_refresh: asyncio.Task | None = None
+        self._index_refreshes = 0
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+
+    def get_base_url(self) -> str:
+        return f'{self.protocol}://{self.host}:{self.port}'
+    
+    def _get_headers(self) -> dict:
+        headers = {
+            'Authorization': f'Bearer {self.api_key}'
+        }
+        return headers
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it for the running event loop.
+
+        Connections are bound to the loop they were opened on, so a new client
+        is created if the client is used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = self._create_client()
+            self._client_loop = loop
+        return self._client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        transport = httpx.AsyncHTTPTransport(
+            verify=self.verify_ssl,
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            )
+        )
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            transport=ResilientTransport(MetricsTransport(transport), self.request_policy)
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    async def flush_appends(self, filepath: str | None = None, dirpath: str = "") -> None:
+        """Write appends held back by the append buffer before a read depending on them.
+
+        Args:
+            filepath: Note to flush; a failed write raises, since the read needs it
+            dirpath: Otherwise flush every note below this directory, logging failed writes
+        """
+        if self.append_buffer is None:
+            return
+        if filepath is None:
+            await self.append_buffer.flush_all(dirpath)
+        else:
+            await self.append_buffer.flush(filepath)
+
+    async def prewarm(self) -> None:
+        """Open a pooled connection to the REST API ahead of the first tool call.
+
+        Failures are only logged, the first tool call reports them instead.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Setting up TLS takes a while, keep the event loop free for the handshake meanwhile
+            client = await asyncio.to_thread(self._create_client)
+            if self._client is None or self._client_loop is not loop:
+                self._client = client
+                self._client_loop = loop
+            else:
+                await client.aclose()
+
+        try:
+            response = await self._get_client().get(f"{self.get_base_url()}/", headers=self._get_headers())
+            logger.info(f"Connected to the Local REST API at {self.get_base_url()} ({response.status_code})")
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not reach the Local REST API at {self.get_base_url()}: {str(e)}")
+
+    async def _safe_call(self, f, key: tuple | None = None) -> Any:
+        """Run a request, turning HTTP errors into exceptions with the API's error message.
+
+        Args:
+            f: Coroutine function making the request
+            key: Identifies a read; concurrent calls with the same key share one request
+        """
+        if key is not None:
+            return await self.single_flight.run(key, lambda: self._safe_call(f))
+
+        try:
+            return await f()
+        except httpx.HTTPStatusError as e:
+            error_data = e.response.json() if e.response.content else {}
+            code = error_data.get('errorCode', -1) 
+            message = error_data.get('message', '<unknown>')
+            raise ObsidianError(f"Error {code}: {message}", e.response.status_code)
+        except httpx.HTTPError as e:
+            raise ObsidianError(f"Request failed: {str(e) or type(e).__name__}")
+
+    async def _cached_query(self, key: tuple, call_fn) -> Any:
+        """Run a search through the query cache.
+
+        ``call_fn`` returns the checked response, whose size is charged
+        against the cache budget.
+        """
+        if self.query_cache is None:
+            return (await self._safe_call(call_fn, key)).json()
+
+        entry = self.query_cache.get(key)
+        if entry is not None:
+            return entry.value
+
+        token = self.query_cache.write_token()
+        response = await self._safe_call(call_fn, key)
+        result = response.json()
+        self.query_cache.put(key, result, len(response.content), token)
+        return result
+
+    async def _get_note_json(self, url: str) -> dict:
+        """Get a note as JSON, including its content and filesystem stat."""
+        async def call_fn():
+            response = await self._get_client().get(
+                url,
+                headers=self._get_headers() | {'Accept': NOTE_JSON_CONTENT_TYPE}
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return await self._safe_call(call_fn, ('GET', url, NOTE_JSON_CONTENT_TYPE))
+
+    async def _get_all_stats(self) -> dict[str, dict]:
+        results = await self._search_json(ALL_STATS_QUERY)
+        return {result['filename']: result['result'] for result in results}
+
+    def _changes_tracked(self) -> bool:
+        """Whether changes to notes reach the note cache without polling single notes.
+
+        The watcher reports changes as they happen, and every index refresh
+        revalidates the cache against the stat of all notes.
+        """
+        return self.watching or (self.index is not None and self.index.ready)
+
+    async def _get_cached_note(self, path: str) -> str | None:
+        """Return cached content for a note, or None if it must be fetched.
+
+        While changes are tracked, entries are served until they are
+        invalidated. Otherwise entries older than the revalidation window
+        are fetched again: the REST API can only report the stat of a single
+        note by searching the whole vault, so one GET of the note is the
+        cheapest check.
+        """
+        entry = self.cache.get(path)
+        if entry is None or not self.cache.is_fresh(entry, self._changes_tracked()):
+            self.cache.record_miss()
+            return None
+        self.cache.record_hit()
+        # Served entries are only as fresh as the last refresh
+        self._index_ready()
+        return entry.content
+
+    async def warm_start(self) -> None:
+        """Load the contents saved by a previous run and revalidate them all with one stat query.
+
+        Notes whose mtime or size changed meanwhile are dropped; the others
+        stay valid until an index refresh or the watcher finds them changed.
+        If the query fails, they are served once an index refresh revalidated
+        them, and fetched again when read until then.
+        """
+        if self.store is None or self.cache is None:
+            return
+        await asyncio.to_thread(self.cache.load)
+        paths = self.cache.paths()
+        if not paths:
+            return
+
+        try:
+            stats = await self._get_all_stats()
+        except Exception as e:
+            logger.warning(f"Could not revalidate cached notes: {str(e)}")
+            return
+        valid = sum(self.cache.revalidate(path, stats.get(path)) for path in paths)
+        logger.info(f"Loaded {valid} of {len(paths)} cached notes from {self.store.path}")
+
+    async def persist(self) -> None:
+        """Write cached contents and the vault index changed since the last call to the store."""
+        if self.store is None:
+            return
+        if self.index is not None and self.index.ready and self.index.version != self._persisted_index_version:
+            self._persisted_index_version = self.index.version
+            self.store.save_index(self.index.notes())
+        await asyncio.to_thread(self.store.flush)
+
+    async def persist_periodically(self, interval: float = DEFAULT_STORE_FLUSH_SECONDS) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.persist()
+            except Exception as e:
+                logger.warning(f"Could not save the cache: {str(e)}")
+
+    async def list_files_in_vault(self) -> Any:
+        await self.flush_appends()
+        if self._index_ready():
+            files = self.index.list_dir("")
+            if files is not None:
+                return files
+
+        return await self._list_remote("")
+
+    async def list_files_in_dir(self, dirpath: str) -> Any:
+        await self.flush_appends(dirpath=dirpath)
+        if self._index_ready():
+            files = self.index.list_dir(dirpath)
+            if files is not None:
+                return files
+
+        return await self._list_remote(dirpath)
+
+    async def list_files_tree(
+            self,
+            dirpath: str = "",
+            max_depth: int | None = None,
+            glob: str | None = None,
+            max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        ) -> list:
+        """List a directory recursively, crawling subdirectories concurrently.
+
+        Args:
+            dirpath: Directory to start from (default: vault root)
+            max_depth: Number of directory levels to expand (default: unlimited)
+            glob: Only keep files whose vault-relative path matches this pattern
+            max_concurrency: Maximum number of directory listings in flight
+
+        Returns:
+            Tree as a list where files are names and each directory is a
+            ``{"name/": [children]}`` object. Directories beyond ``max_depth``
+            are returned as plain ``name/`` entries.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        root = dirpath.strip('/')
+
+        async def crawl(path: str, depth: int) -> list:
+            async with semaphore:
+                try:
+                    entries = await (self.list_files_in_dir(path) if path else self.list_files_in_vault())
+                except ObsidianError as e:
+                    # Only a subdirectory deleted since its parent was listed is skipped
+                    if path == root or e.status_code != 404:
+                        raise
+                    logger.debug(f"Directory {path} disappeared while listing {root or '/'}")
+                    return []
+
+            files = []
+            subdirs = []
+            for entry in entries:
+                entry_path = f"{path}/{entry}" if path else entry
+                if not entry.endswith('/'):
+                    if glob is None or fnmatch.fnmatchcase(entry_path, glob):
+                        files.append(entry)
+                elif max_depth is not None and depth >= max_depth:
+                    # Not expanded, so matches below it are unknown
+                    files.append(entry)
+                else:
+                    subdirs.append(entry)
+
+            children = await asyncio.gather(*(
+                crawl((f"{path}/{subdir}" if path else subdir).rstrip('/'), depth + 1)
+                for subdir in subdirs
+            ))
+            tree = [{subdir: subtree} for subdir, subtree in zip(subdirs, children) if subtree or glob is None]
+            return tree + files
+
+        return await crawl(root, 1)
+
+    async def _list_remote(self, dirpath: str) -> list[str]:
+        url = f"{self.get_base_url()}/vault/{dirpath}/" if dirpath else f"{self.get_base_url()}/vault/"
+        
+        async def call_fn():
+            response = await self._get_client().get(url, headers=self._get_headers())
+            response.raise_for_status()
+            
+            return response.json()['files']
+
+        return await self._safe_call(call_fn, ('GET', url))
+
+    async def get_note_metadata(self, filepath: str) -> dict:
+        """Get the path, stat, tags and frontmatter of a note.
+
+        Answered from the vault index when it is enabled and up to date.
+        """
+        await self.flush_appends(filepath)
+        if self._index_ready():
+            note = self.index.get(filepath)
+            if note is not None and not note.stale:
+                return note.to_dict()
+
+        note = await self._get_note_json(f"{self.get_base_url()}/vault/{filepath}")
+        if self.index is not None:
+            self.index.update(note)
+        return NoteMetadata.from_note_json(note).to_dict()
+
+    def _index_ready(self) -> bool:
+        """Whether the index can answer, starting a refresh in the background if one is due.
+
+        The index answers from its current state until the refresh finished.
+        """
+        if self.index is None or not self.index.ready:
+            return False
+        refresh = self._index_refresh
+        if self.index.needs_refresh() and (
+            refresh is None or refresh.done() or refresh.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._index_refresh = self._run_in_background(self.refresh_index())
+        return True
+
+    async def _list_all_files(self, max_concurrency: int) -> list[str]:
+        """Crawl the vault listing recursively and return every file path."""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        files: list[str] = []
+
+        async def crawl(dirpath: str):
+            async with semaphore:
+                entries = await self._list_remote(dirpath)
+
+            subdirs = []
+            for entry in entries:
+                path = f"{dirpath}/{entry}" if dirpath else entry
+                if entry.endswith('/'):
+                    subdirs.append(path.rstrip('/'))
+                else:
+                    files.append(path)
+            await asyncio.gather(*(crawl(subdir) for subdir in subdirs))
+
+        await crawl("")
+        return files
+
+    async def _fetch_metadata(self, paths: list[str], max_concurrency: int) -> list[NoteMetadata]:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(path: str) -> NoteMetadata | None:
+            async with semaphore:
+                try:
+                    note = await self._get_note_json(f"{self.get_base_url()}/vault/{path}")
+                except Exception as e:
+                    logger.warning(f"Could not index {path}: {str(e)}")
+                    return None
+            return NoteMetadata.from_note_json(note)
+
+        results = await asyncio.gather(*(fetch(path) for path in paths))
+        return [note for note in results if note is not None]
+
+    async def build_index(self, max_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> None:
+        """Seed the vault index from the directory listings and note+json.
+
+        Every file is listed; markdown notes also get their stat, tags and
+        frontmatter fetched. Notes saved in the store by a previous run are
+        reused if their mtime and size did not change.
+        """
+        async with self._index_lock:
+            started = time.time()
+            paths = await self._list_all_files(max_concurrency)
+            notes = {path: NoteMetadata(path) for path in paths}
+
+            markdown_paths = [path for path in paths if path.endswith('.md')]
+            saved = await asyncio.to_thread(self.store.load_index) if self.store is not None else {}
+            if saved:
+                markdown_paths = await self._reuse_saved_metadata(markdown_paths, saved, notes)
+            for note in await self._fetch_metadata(markdown_paths, max_concurrency):
+                notes[note.path] = note
+
+            self.index.replace(notes)
+            logger.info(
+                f"Indexed {len(notes)} files in {time.time() - started:.1f}s, "
+                f"fetched metadata of {len(markdown_paths)} notes"
+            )
+
+    async def _reuse_saved_metadata(
+            self,
+            paths: list[str],
+            saved: dict[str, NoteMetadata],
+            notes: dict[str, NoteMetadata],
+        ) -> list[str]:
+        """Put saved metadata still matching the current stat into ``notes``.
+
+        Returns:
+            The notes whose metadata must be fetched
+        """
+        try:
+            stats = await self._get_all_stats()
+        except Exception as e:
+            logger.warning(f"Could not revalidate the saved vault index: {str(e)}")
+            return paths
+
+        changed = []
+        for path in paths:
+            note, stat = saved.get(path), stats.get(path)
+            if (
+                note is not None and note.stat is not None and isinstance(stat, dict)
+                and stat.get('mtime') == note.stat.get('mtime') and stat.get('size') == note.stat.get('size')
+            ):
+                notes[path] = note
+            else:
+                changed.append(path)
+        return changed
+
+    async def refresh_index(self, max_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> None:
+        """Reconcile the index with the vault, pulling metadata only for notes that changed.
+
+        The mtime and size of every note, fetched with one JsonLogic query,
+        show which notes were created, modified or deleted since the last
+        refresh. Other files are only seen in directory listings, so they
+        are reconciled by a listing crawl every ``INDEX_LISTING_REFRESHES``
+        refreshes. Tool calls start it in the background once it is due.
+        """
+        if self._index_lock.locked():
+            # A build or refresh is already running
+            return
+
+        async with self._index_lock:
+            started = time.time()
+            # Entries added while the vault is queried are not known to be missing from it
+            known = {note.path: note for note in self.index.notes()}
+            self._index_refreshes += 1
+            list_files = not self.watching and self._index_refreshes % INDEX_LISTING_REFRESHES == 0
+            try:
+                # The watcher already marked changed notes as stale
+                stats = None if self.watching else await self._get_all_stats()
+                files = await self._list_all_files(max_concurrency) if list_files else None
+            except Exception as e:
+                logger.warning(f"Could not refresh vault index: {str(e)}")
+                self.index.last_refresh = started
+                return
+
+            changed = set(note.path for note in known.values() if note.stale and note.path.endswith('.md'))
+            removed = set()
+            if stats is not None:
+                for path, stat in stats.items():
+                    note = known.get(path)
+                    if (
+                        note is None or note.stat is None or not isinstance(stat, dict)
+                        or stat.get('mtime') != note.stat.get('mtime') or stat.get('size') != note.stat.get('size')
+                    ):
+                        changed.add(path)
+                removed.update(path for path in known if path.endswith('.md') and path not in stats)
+            if files is not None:
+                listed = set(files)
+                removed.update(path for path in known if not path.endswith('.md') and path not in listed)
+                for path in listed - known.keys():
+                    if not path.endswith('.md'):
+                        self.index.add_path(path)
+                        if self.link_graph is not None:
+                            self.link_graph.add_file(path)
+
+            for path in removed:
+                if self.index.get(path) is known[path]:
+                    self.handle_vault_change(path, removed=True)
+                    changed.discard(path)
+
+            if stats is not None and self.cache is not None:
+                # Unchanged notes stay cached until a later refresh finds them changed
+                for path in self.cache.paths():
+                    self.cache.revalidate(path, stats.get(path))
+
+            for content_index in self._content_indexes():
+                for path in changed:
+                    content_index.mark_stale(path)
+
+            for note in await self._fetch_metadata(sorted(changed), max_concurrency):
+                self.index.set(note)
+            self.index.last_refresh = started
+
+    def _content_indexes(self) -> list[SearchIndex | LinkGraph]:
+        """Indexes built from note contents, which must be refetched when a note changes."""
+        return [index for index in (self.search_index, self.link_graph) if index is not None]
+
+    async def build_content_indexes(self, max_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> None:
+        """Load the contents of every markdown note into the full-text index and the link graph.
+
+        Both are built from one pass over the vault.
+        """
+        started = time.time()
+        if self.index is not None and self.index.ready:
+            paths = self.index.paths()
+        else:
+            paths = await self._list_all_files(max_concurrency)
+
+        markdown_paths = [path for path in paths if path.endswith('.md')]
+        if self.link_graph is not None:
+            # Attachments are link targets too
+            for path in paths:
+                if not path.endswith('.md'):
+                    self.link_graph.add_file(path)
+        await self._load_documents(markdown_paths, max_concurrency)
+        for content_index in self._content_indexes():
+            content_index.ready = True
+        logger.info(f"Indexed contents of {len(markdown_paths)} notes in {time.time() - started:.1f}s")
+
+    async def _load_documents(self, paths: list[str], max_concurrency: int) -> None:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def load(path: str):
+            async with semaphore:
+                try:
+                    content = await self._get_file_text(path)
+                except Exception as e:
+                    logger.warning(f"Removing {path} from content indexes: {str(e)}")
+                    for content_index in self._content_indexes():
+                        content_index.remove(path)
+                    return
+            for content_index in self._content_indexes():
+                content_index.update(path, content)
+
+        await asyncio.gather(*(load(path) for path in paths))
+
+    async def _sync_content_indexes(self) -> None:
+        """Refetch notes that changed since they were indexed."""
+        self._index_ready()
+        stale = set()
+        for content_index in self._content_indexes():
+            stale.update(content_index.stale_paths())
+        if stale:
+            await self._load_documents(sorted(stale), DEFAULT_BATCH_CONCURRENCY)
+
+    async def _ready_link_graph(self, filepath: str) -> LinkGraph:
+        await self.flush_appends()
+        if self.link_graph is None or not self.link_graph.ready:
+            raise Exception("The link graph is still being built, try again shortly")
+        await self._sync_content_indexes()
+        if filepath.strip('/') not in self.link_graph:
+            raise Exception(f"File not found in the vault: {filepath}")
+        return self.link_graph
+
+    async def get_links(self, filepath: str) -> dict[str, Any]:
+        """Outgoing links, backlinks and unresolved links of a note, from the link graph."""
+        return (await self._ready_link_graph(filepath)).links(filepath)
+
+    async def get_neighborhood(
+            self,
+            filepath: str,
+            depth: int = 1,
+            direction: str = 'both',
+            max_notes: int = DEFAULT_NEIGHBORHOOD_MAX_NOTES,
+        ) -> dict[str, Any]:
+        """Notes within ``depth`` links of a note, see :meth:`LinkGraph.neighborhood`."""
+        return (await self._ready_link_graph(filepath)).neighborhood(filepath, depth, direction, max_notes)
+
+    def handle_vault_change(self, path: str, removed: bool = False, is_dir: bool = False) -> None:
+        """Invalidate cached state for a path changed outside the server."""
+        self.single_flight.forget()
+        if self.query_cache is not None:
+            self.query_cache.clear()
+        if is_dir:
+            if removed:
+                prefix = path.strip('/') + '/'
+                if self.cache is not None:
+                    self.cache.invalidate_prefix(prefix)
+                if self.index is not None:
+                    self.index.remove_prefix(prefix)
+                for content_index in self._content_indexes():
+                    content_index.remove_prefix(prefix)
+            return
+
+        if not removed:
+            self._invalidate(path)
+            return
+
+        if self.cache is not None:
+            self.cache.invalidate(path)
+        if self.index is not None:
+            self.index.remove(path)
+        for content_index in self._content_indexes():
+            content_index.remove(path)
+
+    def handle_vault_resync(self) -> None:
+        """Drop cached contents and rebuild the indexes after change notifications were lost."""
+        self.single_flight.forget()
+        if self.cache is not None:
+            self.cache.clear()
+        if self.query_cache is not None:
+            self.query_cache.clear()
+        if self.index is not None and self.index.ready:
+            self._run_in_background(self._rebuild_indexes())
+
+    def _run_in_background(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(_log_task_failure)
+        return task
+
+    async def _rebuild_indexes(self) -> None:
+        await self.build_index()
+        content_indexes = [index for index in self._content_indexes() if index.ready]
+        if content_indexes:
+            known = set(self.index.paths())
+            for content_index in content_indexes:
+                for path in content_index.paths():
+                    if path not in known:
+                        content_index.remove(path)
+            await self.build_content_indexes()
+
+    def _invalidate(self, filepath: str) -> None:
+        """Drop cached state for a note after it was written through the server."""
+        self.single_flight.forget()
+        if self.cache is not None:
+            self.cache.invalidate(filepath)
+        if self.query_cache is not None:
+            self.query_cache.clear()
+        if self.index is not None:
+            self.index.mark_stale(filepath)
+        if filepath.endswith('.md'):
+            for content_index in self._content_indexes():
+                content_index.mark_stale(filepath)
+        elif self.link_graph is not None:
+            self.link_graph.add_file(filepath)
+
+    async def get_file_contents(self, filepath: str) -> Any:
+        url = f"{self.get_base_url()}/vault/{filepath}"
+        await self.flush_appends(filepath)
+
+        if self.cache is not None:
+            content = await self._get_cached_note(filepath)
+            if self.prefetcher is not None:
+                self.prefetcher.record_read(filepath, cached=content is not None)
+            if content is not None:
+                return content
+
+            token = self.cache.write_token()
+            note = await self._get_note_json(url)
+            self.cache.put(filepath, note['content'], note['stat'], token)
+            return note['content']
+
+        return await self._get_file_text(filepath)
+
+    def prefetch_links(self, filepath: str, content: str) -> None:
+        """Warm the cache with the notes linked from content that was just read, if prefetching is enabled."""
+        if self.prefetcher is not None:
+            self.prefetcher.schedule(filepath, content)
+
+    def _resolve_link(self, source: str, target: str) -> str | None:
+        if self.link_graph is not None and self.link_graph.ready:
+            return self.link_graph.resolve(source, target)
+        if self.index is not None and self.index.ready:
+            return resolve_link(source, target, self.index.named(posixpath.basename(target.strip('/'))))
+        return None
+
+    async def _prefetch_note(self, filepath: str) -> int | None:
+        """Fetch a note into the cache unless a fresh entry is cached already.
+
+        Returns:
+            The size of the fetched note, or None if it was cached
+        """
+        entry = self.cache.get(filepath)
+        if entry is not None and self.cache.is_fresh(entry, self._changes_tracked()):
+            return None
+        token = self.cache.write_token()
+        note = await self._get_note_json(f"{self.get_base_url()}/vault/{filepath}")
+        self.cache.put(filepath, note['content'], note['stat'], token)
+        return note['stat'].get('size', len(note['content'].encode('utf-8')))
+
+    async def _get_file_text(self, filepath: str) -> str:
+        url = f"{self.get_base_url()}/vault/{filepath}"
+    
+        async def call_fn():
+            response = await self._get_client().get(url, headers=self._get_headers())
+            response.raise_for_status()
+            
+            return response.text
+
+        return await self._safe_call(call_fn, ('GET', url))
+
+    async def get_file_range(self, filepath: str, start: int, end: int | None = None, unit: str = 'lines') -> str:
+        """Get part of a file by line range (1-based, inclusive) or byte range (0-based, exclusive).
+
+        The REST API always returns whole notes, so the range is cut from the
+        cached or freshly fetched content.
+        """
+        content = await self.get_file_contents(filepath)
+        if unit == 'bytes':
+            return slice_bytes(content, start, end)
+        return slice_lines(content, start, end)
+
+    async def get_file_section(self, filepath: str, target_type: str, target: str) -> Any:
+        """Get the heading section, block or frontmatter field of a note.
+
+        Targets are addressed the same way as in :meth:`patch_content`.
+        """
+        if target_type == 'frontmatter':
+            metadata = await self.get_note_metadata(filepath)
+            return frontmatter_field(metadata['frontmatter'], target)
+        return find_section(await self.get_file_contents(filepath), target_type, target)
+    
+    async def get_batch_file_contents(
+            self,
+            filepaths: list[str],
+            max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+            max_bytes: int | None = None,
+        ) -> str:
+        """Get contents of multiple files and concatenate them with headers.
+
+        Files are fetched concurrently, but sections are always returned in
+        the order of ``filepaths``.
+        
+        Args:
+            filepaths: List of file paths to read
+            max_concurrency: Maximum number of files fetched at the same time
+            max_bytes: Optional budget for the total size of file contents
+            
+        Returns:
+            String containing all file contents with headers
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        sizes: dict[int, int] = {}
+
+        async def fetch(index: int, filepath: str) -> str | Exception | None:
+            async with semaphore:
+                if _batch_budget_exhausted(sizes, index, max_bytes):
+                    return None
+                try:
+                    content = await self.get_file_contents(filepath)
+                except Exception as e:
+                    return e
+                sizes[index] = len(content.encode('utf-8'))
+                return content
+
+        results = await asyncio.gather(*(fetch(i, filepath) for i, filepath in enumerate(filepaths)))
+
+        return _format_batch_contents(filepaths, list(results), max_bytes)
+
+    async def search(self, query: str, context_length: int = 100) -> Any:
+        await self.flush_appends()
+        if self.search_index is not None and self.search_index.ready:
+            await self._sync_content_indexes()
+            return self.search_index.search(query, context_length)
+
+        url = f"{self.get_base_url()}/search/simple/"
+        params = {
+            'query': query,
+            'contextLength': context_length
+        }
+        
+        async def call_fn():
+            response = await self._get_client().post(url, headers=self._get_headers(), params=params)
+            response.raise_for_status()
+            return response
+
+        return await self._cached_query(query_key('simple', query, context_length), call_fn)
+    
+    async def search_page(
+            self,
+            query: str,
+            context_length: int = 100,
+            offset: int = 0,
+            limit: int | None = None,
+        ) -> tuple[list, int]:
+        """Get one page of simple search results and the total number of results.
+
+        The full-text index ranks every matching note and builds matches for
+        the page only. The REST API has no pagination, so its results are
+        fetched in full and sliced.
+        """
+        if self.search_index is not None and self.search_index.ready:
+            await self.flush_appends()
+            await self._sync_content_indexes()
+            return self.search_index.search_page(query, context_length, offset, limit)
+
+        results = await self.search(query, context_length)
+        return (results[offset:] if limit is None else results[offset:offset + limit]), len(results)
+
+    async def append_content(self, filepath: str, content: str) -> Any:
+        if self.append_buffer is not None:
+            return await self.append_buffer.append(filepath, content)
+        return await self._append_now(filepath, content)
+
+    async def _append_now(self, filepath: str, content: str) -> None:
+        url = f"{self.get_base_url()}/vault/{filepath}"
+        
+        async def call_fn():
+            response = await self._get_client().post(
+                url, 
+                headers=self._get_headers() | {'Content-Type': 'text/markdown'}, 
+                content=content.encode('utf-8')
+            )
+            response.raise_for_status()
+            return None
+
+        try:
+            return await self._safe_call(call_fn)
+        finally:
+            self._invalidate(filepath)
+    
+    async def patch_content(self, filepath: str, operation: str, target_type: str, target: str, content: str) -> Any:
+        url = f"{self.get_base_url()}/vault/{filepath}"
+        # The patch target may be in content that is still buffered
+        await self.flush_appends(filepath)
+        
+        headers = self._get_headers() | {
+            'Content-Type': 'text/markdown',
+            'Operation': operation,
+            'Target-Type': target_type,
+            'Target': urllib.parse.quote(target)
+        }
+        
+        async def call_fn():
+            response = await self._get_client().patch(url, headers=headers, content=content.encode('utf-8'))
+            response.raise_for_status()
+            return None
+
+        try:
+            return await self._safe_call(call_fn)
+        finally:
+            self._invalidate(filepath)
+    
+    async def batch_write(
+            self,
+            operations: list[dict],
+            max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+            fail_fast: bool = False,
+        ) -> list[dict]:
+        """Apply append and patch operations to multiple notes.
+
+        Operations on different files run concurrently, operations on the same
+        file one after another in the given order.
+
+        Args:
+            operations: Dicts with ``type`` ('append' or 'patch'), ``filepath``
+                and ``content``; patches also need ``operation``, ``target_type``
+                and ``target`` as in :meth:`patch_content`
+            max_concurrency: Maximum number of files written at the same time
+            fail_fast: Skip every operation not started yet once one failed
+
+        Returns:
+            One result per operation, in the order of ``operations``, with a
+            status of 'ok', 'error' or 'skipped'
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        results: list[dict | None] = [None] * len(operations)
+        failed = False
+
+        async def write_file(indexes: list[int]) -> None:
+            nonlocal failed
+            async with semaphore:
+                for i in indexes:
+                    if fail_fast and failed:
+                        results[i] = _write_result(operations[i], 'skipped')
+                        continue
+                    try:
+                        await self._apply_write(operations[i])
+                        results[i] = _write_result(operations[i], 'ok')
+                    except Exception as e:
+                        failed = True
+                        results[i] = _write_result(operations[i], 'error', e)
+
+        await asyncio.gather(*(write_file(indexes) for indexes in _group_writes_by_file(operations)))
+
+        return results
+
+    async def _apply_write(self, operation: dict) -> None:
+        if operation['type'] == 'append':
+            await self.append_content(operation['filepath'], operation['content'])
+        else:
+            await self.patch_content(
+                operation['filepath'],
+                operation['operation'],
+                operation['target_type'],
+                operation['target'],
+                operation['content']
+            )
+
+    async def search_json(self, query: dict) -> Any:
+        await self.flush_appends()
+        if self.local_jsonlogic and self._index_ready():
+            results = await self._search_json_locally(query)
+            if results is not None:
+                return results
+        return await self._cached_query(query_key('jsonlogic', query), lambda: self._post_search_json(query))
+
+    async def _search_json_locally(self, query: dict) -> list | None:
+        """Answer a JsonLogic query from the vault index, or None if the REST API must answer it."""
+        stale = self.index.stale_notes()
+        if stale:
+            for note in await self._fetch_metadata(stale, DEFAULT_BATCH_CONCURRENCY):
+                self.index.set(note)
+            if self.index.stale_notes():
+                return None
+
+        try:
+            return self.index.snapshot().search(query)
+        except UnsupportedQuery as e:
+            logger.debug(f"Sending JsonLogic query to the REST API: {str(e)}")
+            return None
+
+    async def _search_json(self, query: dict) -> Any:
+        """Run a JsonLogic query bypassing the query cache, e.g. to revalidate cached notes."""
+        return (await self._safe_call(lambda: self._post_search_json(query), query_key('jsonlogic', query))).json()
+
+    async def _post_search_json(self, query: dict) -> httpx.Response:
+        url = f"{self.get_base_url()}/search/"
+        
+        headers = self._get_headers() | {
+            'Content-Type': 'application/vnd.olrapi.jsonlogic+json'
+        }
+        
+        response = await self._get_client().post(url, headers=headers, json=query)
+        response.raise_for_status()
+        return response
+    
+    async def get_periodic_note(self, period: str) -> Any:
+        """Get current periodic note for the specified period.
+        
+        Args:
+            period: The period type (daily, weekly, monthly, quarterly, yearly)
+            
+        Returns:
+            Content of the periodic note
+        """
+        url = f"{self.get_base_url()}/periodic/{period}/"
+        await self.flush_appends()
+
+        if self.cache is not None:
+            path = self.cache.get_periodic_path(period)
+            content = await self._get_cached_note(path) if path is not None else None
+            if content is not None:
+                return content
+
+            token = self.cache.write_token()
+            note = await self._get_note_json(url)
+            self.cache.put(note['path'], note['content'], note['stat'], token)
+            self.cache.set_periodic_path(period, note['path'])
+            return note['content']
+        
+        async def call_fn():
+            response = await self._get_client().get(url, headers=self._get_headers())
+            response.raise_for_status()
+            
+            return response.text
+
+        return await self._safe_call(call_fn, ('GET', url))
+    
+    async def get_recent_periodic_notes(self, period: str, limit: int = 5, include_content: bool = False) -> Any:
+        """Get most recent periodic notes for the specified period type.
+        
+        Args:
+            period: The period type (daily, weekly, monthly, quarterly, yearly)
+            limit: Maximum number of notes to return (default: 5)
+            include_content: Whether to include note content (default: False)
+            
+        Returns:
+            List of recent periodic notes
+        """
+        url = f"{self.get_base_url()}/periodic/{period}/recent"
+        await self.flush_appends()
+        params = {
+            "limit": limit,
+            "includeContent": include_content
+        }
+        
+        async def call_fn():
+            response = await self._get_client().get(
+                url, 
+                headers=self._get_headers(), 
+                params=params
+            )
+            response.raise_for_status()
+            
+            return response.json()
+
+        return await self._safe_call(call_fn, ('GET', url, limit, include_content))
+    
+    async def get_recent_changes(self, limit: int = 10, days: int = 90) -> Any:
+        """Get recently modified files in the vault.
+        
+        Args:
+            limit: Maximum number of files to return (default: 10)
+            days: Only include files modified within this many days (default: 90)
+            
+        Returns:
+            List of recently modified files with metadata
+        """
+        await self.flush_appends()
+
+        # Build the DQL query
+        query_lines = [
+            "TABLE file.mtime",
+            f"WHERE file.mtime >= date(today) - dur({days} days)",
+            "SORT file.mtime DESC",
+            f"LIMIT {limit}"
+        ]
+        
+        # Join with proper DQL line breaks
+        dql_query = "\n".join(query_lines)
+        
+        # Make the request to search endpoint
+        url = f"{self.get_base_url()}/search/"
+        headers = self._get_headers() | {
+            'Content-Type': 'application/vnd.olrapi.dataview.dql+txt'
+        }
+        
+        async def call_fn():
+            response = await self._get_client().post(
+                url,
+                headers=headers,
+                content=dql_query.encode('utf-8')
+            )
+            response.raise_for_status()
+            return response
+
+        return await self._cached_query(query_key('dql', dql_query), call_fn)
+
+    async def get_changes(self, since: int | None = None) -> dict[str, Any]:
+        """Get the notes created, modified or deleted since a previous call.
+
+        Changes are found by comparing the mtime and size of every note,
+        fetched with one JsonLogic query, with those of the previous call.
+
+        Args:
+            since: Sequence number returned by a previous call, or None to list every note
+
+        Returns:
+            ``{"seq", "reset", "changes"}`` with ``changes`` sorted by path.
+            ``reset`` is true when the changes since ``since`` are unknown,
+            e.g. after a restart; every note is then listed as created.
+        """
+        await self.flush_appends()
+        stats = await self._get_all_stats()
+        seq = self.change_feed.update(stats)
+
+        changes = self.change_feed.changes_since(since) if since is not None else None
+        reset = changes is None
+        if reset:
+            changes = dict.fromkeys(self.change_feed.paths(), 'created')
+
+        results = []
+        for path, change in sorted(changes.items()):
+            result = {'path': path, 'change': change}
+            stat = stats.get(path)
+            if change != 'deleted' and isinstance(stat, dict):
+                result |= {'mtime': stat.get('mtime'), 'size': stat.get('size')}
+            results.append(result)
+        return {'seq': seq, 'reset': reset, 'changes': results}
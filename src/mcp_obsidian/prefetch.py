@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from .links import parse_links
+
+logger = logging.getLogger("mcp-obsidian")
+
+DEFAULT_PREFETCH_CONCURRENCY = 2
+DEFAULT_PREFETCH_MAX_BYTES = 512 * 1024
+# Prefetched notes remembered until read; older ones count as wasted
+MAX_TRACKED_PREFETCHES = 1024
+
+
+class Prefetcher():
+    """Warms the note cache with the notes linked from a note that was just read.
+
+    Links are resolved and fetched in the background, in the order they
+    appear in the note: at most ``max_notes`` per read, ``max_concurrency``
+    requests at a time across all reads, and no new request once
+    ``max_bytes`` were fetched for a read. Reads arriving while too many
+    prefetches are queued are not prefetched for.
+
+    ``hits`` counts prefetched notes that were read from the cache, and
+    ``misses`` prefetched notes that were read after being dropped from the
+    cache or never read.
+    """
+
+    def __init__(
+            self,
+            fetch: Callable[[str], Awaitable[int | None]],
+            resolve: Callable[[str, str], str | None],
+            max_notes: int,
+            max_concurrency: int = DEFAULT_PREFETCH_CONCURRENCY,
+            max_bytes: int = DEFAULT_PREFETCH_MAX_BYTES,
+        ):
+        self.fetch = fetch
+        self.resolve = resolve
+        self.max_notes = max_notes
+        self.max_concurrency = max_concurrency
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Notes and bytes fetched, for tuning the limits
+        self.prefetched = 0
+        self.bytes = 0
+        self._unread: OrderedDict[str, None] = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._tasks: set[asyncio.Task] = set()
+
+    def schedule(self, source: str, content: str) -> None:
+        """Prefetch the notes linked from ``content``, read from ``source``."""
+        if len(self._tasks) >= 4 * max(1, self.max_concurrency):
+            return
+        task = asyncio.get_running_loop().create_task(self._prefetch(source.strip('/'), content))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def record_read(self, path: str, cached: bool) -> None:
+        """Count a read of a prefetched note as a hit if the cache served it."""
+        path = path.strip('/')
+        if path in self._unread:
+            del self._unread[path]
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    async def _prefetch(self, source: str, content: str) -> None:
+        paths = []
+        for target in parse_links(content):
+            if len(paths) >= self.max_notes:
+                break
+            path = self.resolve(source, target)
+            if path is not None and path.endswith('.md') and path != source and path not in paths:
+                paths.append(path)
+
+        used = 0
+
+        async def prefetch(path: str):
+            nonlocal used
+            async with self._semaphore:
+                if used >= self.max_bytes:
+                    return
+                try:
+                    size = await self.fetch(path)
+                except Exception as e:
+                    logger.debug(f"Could not prefetch {path}: {str(e)}")
+                    return
+            if size is None:
+                # Cached already
+                return
+            used += size
+            self.prefetched += 1
+            self.bytes += size
+            self._unread[path] = None
+            self._unread.move_to_end(path)
+            if len(self._unread) > MAX_TRACKED_PREFETCHES:
+                self._unread.popitem(last=False)
+                self.misses += 1
+
+        await asyncio.gather(*(prefetch(path) for path in paths))
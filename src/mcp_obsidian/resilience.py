@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+import httpx
+
+from .metrics import registry
+
+logger = logging.getLogger("mcp-obsidian")
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 3.0
+DEFAULT_TIMEOUT_SECONDS = 6.0
+DEFAULT_SEARCH_TIMEOUT_SECONDS = 30.0
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.25
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 10.0
+# Errors of a proxy or of the plugin being overloaded; other status codes are answers
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+# A call, retries included, takes at most this many times the timeout of its first attempt
+CALL_TIMEOUT_MULTIPLIER = 2
+
+
+def operation_of(method: str, path: str) -> str:
+    """Classify a request to the REST API as a 'read', 'search' or 'write'."""
+    if path.startswith('/search/'):
+        return 'search'
+    if method in ('GET', 'HEAD'):
+        return 'read'
+    return 'write'
+
+
+class TimeoutPolicy():
+    """Read timeout for one kind of request, adapted to its observed latency.
+
+    Until ``min_samples`` requests have been observed the configured timeout
+    is used. Afterwards the timeout is ``multiplier`` times the p99 latency
+    of the last ``window`` requests, kept between a quarter of and four
+    times the configured timeout.
+    """
+
+    def __init__(
+            self,
+            timeout: float,
+            adaptive: bool = True,
+            multiplier: float = 4.0,
+            window: int = 200,
+            min_samples: int = 20,
+        ):
+        self.base = timeout
+        self.minimum = timeout / 4
+        self.maximum = timeout * 4
+        self.adaptive = adaptive
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """Latency quantile of recent requests, or None until enough were observed."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def timeout(self, attempt: int = 0) -> float:
+        """Read timeout for a request, doubled for every retry.
+
+        :class:`ResilientTransport` shortens it to what is left of the time
+        allowed for the whole call.
+        """
+        p99 = self.quantile(0.99) if self.adaptive else None
+        timeout = self.base if p99 is None else min(self.maximum, max(self.minimum, self.multiplier * p99))
+        return min(self.maximum, timeout * 2 ** attempt)
+
+
+class CircuitBreakerOpen(httpx.TransportError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker():
+    """Fails requests fast while the Local REST API keeps failing.
+
+    Opens after ``failures`` consecutive calls failed to connect, timed out
+    or got a gateway error, each call counting once after its retries. While
+    open, requests fail without being sent. Every ``reset_after`` seconds one
+    request is let through to probe the API; its success closes the breaker.
+    """
+
+    def __init__(self, failures: int = DEFAULT_BREAKER_FAILURES, reset_after: float = DEFAULT_BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._consecutive = 0
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        return 'open' if time.monotonic() - self._opened_at < self.reset_after else 'half-open'
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_after - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self.reset_after:
+            return False
+        # Let this request probe the API and hold back the others for another period
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Local REST API is responding again, closing the circuit breaker")
+        self._consecutive = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._consecutive += 1
+        if self.failures <= 0:
+            return
+        if self._opened_at is not None:
+            # The probe failed
+            self._opened_at = time.monotonic()
+        elif self._consecutive >= self.failures:
+            logger.warning(
+                f"Local REST API failed {self._consecutive} times in a row, "
+                f"failing requests for the next {self.reset_after}s"
+            )
+            self._opened_at = time.monotonic()
+
+
+class RequestPolicy():
+    """Timeouts, retries, hedging and circuit breaking for requests to the Local REST API.
+
+    Args:
+        timeout: Read timeout of reads and writes, in seconds
+        search_timeout: Read timeout of searches, in seconds
+        connect_timeout: Timeout for opening a connection, in seconds
+        adaptive_timeouts: Adapt read timeouts to the observed latency
+        retries: Number of retries of reads and searches that failed with a
+            connection error, a timeout or a gateway error; writes are never
+            retried as they may have been applied
+        retry_backoff: Base of the jittered exponential backoff between retries, in seconds
+        hedge_reads: Send a second request for reads slower than the usual
+            p95 latency and use whichever response arrives first
+        breaker_failures: Consecutive failures that open the circuit breaker, 0 to disable it
+        breaker_reset_seconds: How long the open circuit breaker fails requests
+    """
+
+    def __init__(
+            self,
+            timeout: float = DEFAULT_TIMEOUT_SECONDS,
+            search_timeout: float = DEFAULT_SEARCH_TIMEOUT_SECONDS,
+            connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+            adaptive_timeouts: bool = True,
+            retries: int = DEFAULT_RETRIES,
+            retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+            hedge_reads: bool = False,
+            breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+            breaker_reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+        ):
+        self.timeout = timeout
+        self.search_timeout = search_timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hedge_reads = hedge_reads
+        self.timeouts = {
+            'read': TimeoutPolicy(timeout, adaptive_timeouts),
+            'search': TimeoutPolicy(search_timeout, adaptive_timeouts),
+            'write': TimeoutPolicy(timeout, adaptive_timeouts),
+        }
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before a retry, with full jitter."""
+        return random.uniform(0, self.retry_backoff * 2 ** attempt)
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """httpx transport wrapper applying a :class:`RequestPolicy` to every request.
+
+    Retries end once a call took ``CALL_TIMEOUT_MULTIPLIER`` times the
+    timeout of its first attempt, and the last attempt only gets what is
+    left of that time.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, policy: RequestPolicy):
+        self.transport = transport
+        self.policy = policy
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        method, path = request.method, request.url.path
+        operation = operation_of(method, path)
+        attempts = 1 if operation == 'write' else 1 + max(0, self.policy.retries)
+        breaker = self.policy.breaker
+        deadline = time.monotonic() + CALL_TIMEOUT_MULTIPLIER * self.policy.timeouts[operation].timeout()
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitBreakerOpen(
+                    f"Local REST API is failing, not sending requests for {breaker.retry_after():.1f}s",
+                    request=request
+                )
+
+            response = error = None
+            try:
+                response = await self._send(request, operation, attempt, deadline)
+            except httpx.TransportError as e:
+                error = e
+                reason = f"{type(e).__name__}: {str(e) or 'no details'}"
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    breaker.record_success()
+                    return response
+                reason = f"status {response.status_code}"
+
+            delay = self.policy.backoff(attempt)
+            # Retries are pointless once the breaker opened, while this request probes it, or past the deadline
+            if attempt + 1 == attempts or breaker.state != 'closed' or time.monotonic() + delay >= deadline:
+                # A call counts as one failure, however often it was retried
+                breaker.record_failure()
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                await response.aclose()
+
+            logger.warning(f"{method} {path} failed ({reason}), retry {attempt + 1}/{attempts - 1} in {delay:.2f}s")
+            registry.record_retry(method, path)
+            await asyncio.sleep(delay)
+
+    async def _send(self, request: httpx.Request, operation: str, attempt: int, deadline: float) -> httpx.Response:
+        timeouts = self.policy.timeouts[operation]
+        timeout = max(0.0, min(timeouts.timeout(attempt), deadline - time.monotonic()))
+        request.extensions['timeout'] = request.extensions.get('timeout', {}) | {
+            'connect': min(self.policy.connect_timeout, timeout),
+            'read': timeout,
+            'write': timeout,
+        }
+
+        started = time.perf_counter()
+        try:
+            if self.policy.hedge_reads and operation == 'read':
+                response = await self._send_hedged(request, timeouts)
+            else:
+                response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            # Requests that timed out count as well, so that the timeout grows when they are common
+            timeouts.observe(time.perf_counter() - started)
+            raise
+        timeouts.observe(time.perf_counter() - started)
+        return response
+
+    async def _send_hedged(self, request: httpx.Request, timeouts: TimeoutPolicy) -> httpx.Response:
+        """Send a duplicate request if the first one is slower than the usual p95 latency."""
+        delay = timeouts.quantile(0.95)
+        if delay is None:
+            return await self.transport.handle_async_request(request)
+
+        first = asyncio.ensure_future(self.transport.handle_async_request(request))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                tasks.discard(first)
+                return first.result()
+
+            logger.info(f"Hedging {request.method} {request.url.path}, no response after {delay * 1000:.0f} ms")
+            registry.record_hedge(request.method, request.url.path)
+            tasks.add(asyncio.ensure_future(self.transport.handle_async_request(request)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        tasks.discard(task)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # The slower response, already read
+                    await task.result().aclose()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,140 @@
+import io
+import itertools
+import re
+from typing import Any
+
+# Nested headings are addressed like the REST API does, e.g. "Heading 1::Subheading"
+HEADING_DELIMITER = '::'
+
+_HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.*?)[ \t#]*$')
+_FENCE_RE = re.compile(r'^[ \t]*(```|~~~)')
+_LIST_ITEM_RE = re.compile(r'^[ \t]*([-*+]|\d+[.)])[ \t]')
+
+
+def slice_lines(content: str, start: int, end: int | None = None) -> str:
+    """Return lines ``start`` to ``end`` (1-based, inclusive) of ``content``."""
+    # Split lines exactly like reading the file from disk would
+    return "".join(itertools.islice(io.StringIO(content, newline=''), start - 1, end))
+
+
+def slice_bytes(content: str, start: int, end: int | None = None) -> str:
+    """Return bytes ``start`` to ``end`` (0-based, exclusive) of the UTF-8 encoded ``content``.
+
+    Characters cut in half by the range are dropped.
+    """
+    return content.encode('utf-8')[start:end].decode('utf-8', errors='ignore')
+
+
+def _headings(lines: list[str]) -> list[tuple[int, int, str]]:
+    """Find ``(line index, level, text)`` of every heading outside code blocks."""
+    headings = []
+    in_fence = False
+    for i, line in enumerate(lines):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        match = _HEADING_RE.match(line.rstrip('\r\n'))
+        if match:
+            headings.append((i, len(match.group(1)), match.group(2).strip()))
+    return headings
+
+
+def find_heading(content: str, target: str) -> str | None:
+    """Return the section below a heading, including the heading line itself.
+
+    ``target`` is the heading text, optionally with its leading ``#`` marks,
+    or a path of nested headings separated by ``::``. The section ends at
+    the next heading of the same or a higher level.
+    """
+    path = [part.strip().lstrip('#').strip() for part in target.split(HEADING_DELIMITER)]
+    lines = content.splitlines(keepends=True)
+    headings = _headings(lines)
+
+    # Headings enclosing the current one, as (level, text)
+    parents: list[tuple[int, str]] = []
+    for position, (index, level, text) in enumerate(headings):
+        while parents and parents[-1][0] >= level:
+            parents.pop()
+        parents.append((level, text))
+
+        texts = [text for _, text in parents]
+        if texts[-len(path):] != path:
+            continue
+
+        end = len(lines)
+        for next_index, next_level, _ in headings[position + 1:]:
+            if next_level <= level:
+                end = next_index
+                break
+        return "".join(lines[index:end])
+
+    return None
+
+
+def _starts_block(line: str) -> bool:
+    return bool(_HEADING_RE.match(line.rstrip('\r\n')) or _LIST_ITEM_RE.match(line) or _FENCE_RE.match(line))
+
+
+def _ends_block(line: str) -> bool:
+    return not line.strip() or line.strip() == '---' or _starts_block(line)
+
+
+def find_block(content: str, block_id: str) -> str | None:
+    """Return the block tagged with ``^block_id``.
+
+    A list item is returned on its own, any other block as the paragraph it
+    ends. A block ID on a line of its own refers to the block above it.
+    """
+    block_id = block_id.lstrip('^')
+    marker = re.compile(r'(^|\s)\^' + re.escape(block_id) + r'\s*$')
+    lines = content.splitlines(keepends=True)
+
+    for i, line in enumerate(lines):
+        if not marker.search(line.rstrip('\r\n')):
+            continue
+        if _LIST_ITEM_RE.match(line):
+            return line
+
+        end = i
+        if line.strip() == f'^{block_id}':
+            # Skip blank lines between the block and its ID
+            while end > 0 and not lines[end - 1].strip():
+                end -= 1
+            if end == 0:
+                return line
+            end -= 1
+        start = end
+        while start > 0 and not _starts_block(lines[start]) and not _ends_block(lines[start - 1]):
+            start -= 1
+        return "".join(lines[start:i + 1])
+
+    return None
+
+
+def find_section(content: str, target_type: str, target: str) -> str:
+    """Return the part of a note addressed like a ``patch_content`` target.
+
+    Frontmatter fields are not part of the text body and are looked up from
+    the note metadata by the caller instead.
+
+    Raises:
+        Exception: If the target does not exist in the note
+    """
+    if target_type == 'heading':
+        section = find_heading(content, target)
+    elif target_type == 'block':
+        section = find_block(content, target)
+    else:
+        raise Exception(f"Invalid target_type: {target_type}. Must be 'heading' or 'block'")
+
+    if section is None:
+        raise Exception(f"Target not found: {target_type} '{target}'")
+    return section
+
+
+def frontmatter_field(frontmatter: dict[str, Any], target: str) -> Any:
+    if target not in frontmatter:
+        raise Exception(f"Target not found: frontmatter '{target}'")
+    return frontmatter[target]
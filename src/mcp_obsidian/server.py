@@ -1,81 +1,200 @@
-import json
+import asyncio
+import contextlib
 import logging
+import os
+import signal
+import time
 from collections.abc import Sequence
 from functools import lru_cache
-from typing import Any
-import os
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Any
 from mcp.server import Server
 from mcp.types import (
     Tool,
     TextContent,
     ImageContent,
     EmbeddedResource,
+    InitializedNotification,
 )
 
-load_dotenv()
-
-from . import tools
-
-# Load environment variables
+if TYPE_CHECKING:
+    from . import tools
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mcp-obsidian")
-
-api_key = os.getenv("OBSIDIAN_API_KEY")
-if not api_key:
-    raise ValueError(f"OBSIDIAN_API_KEY environment variable required. Working directory: {os.getcwd()}")
+# httpx logs every request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 app = Server("mcp-obsidian")
 
 tool_handlers = {}
-def add_tool_handler(tool_class: tools.ToolHandler):
+def add_tool_handler(tool_class: "tools.ToolHandler"):
     global tool_handlers
 
     tool_handlers[tool_class.name] = tool_class
 
-def get_tool_handler(name: str) -> tools.ToolHandler | None:
+def get_tool_handler(name: str) -> "tools.ToolHandler | None":
     if name not in tool_handlers:
         return None
-    
+
     return tool_handlers[name]
 
-add_tool_handler(tools.ListFilesInDirToolHandler())
-add_tool_handler(tools.ListFilesInVaultToolHandler())
-add_tool_handler(tools.GetFileContentsToolHandler())
-add_tool_handler(tools.SearchToolHandler())
-add_tool_handler(tools.PatchContentToolHandler())
-add_tool_handler(tools.AppendContentToolHandler())
-add_tool_handler(tools.ComplexSearchToolHandler())
-add_tool_handler(tools.BatchGetFileContentsToolHandler())
-add_tool_handler(tools.PeriodicNotesToolHandler())
-add_tool_handler(tools.RecentPeriodicNotesToolHandler())
-add_tool_handler(tools.RecentChangesToolHandler())
+@lru_cache(maxsize=None)
+def load_tools():
+    """Read the configuration, create the client and register the tool handlers.
+
+    Runs once, after the client finished the initialize handshake, so that
+    starting the server only loads what is needed to answer that handshake.
+    """
+    from . import tools
+
+    add_tool_handler(tools.ListFilesInDirToolHandler())
+    add_tool_handler(tools.ListFilesInVaultToolHandler())
+    add_tool_handler(tools.ListFilesTreeToolHandler())
+    add_tool_handler(tools.GetFileContentsToolHandler())
+    add_tool_handler(tools.SearchToolHandler())
+    add_tool_handler(tools.PatchContentToolHandler())
+    add_tool_handler(tools.AppendContentToolHandler())
+    add_tool_handler(tools.ComplexSearchToolHandler())
+    add_tool_handler(tools.BatchGetFileContentsToolHandler())
+    add_tool_handler(tools.BatchWriteToolHandler())
+    add_tool_handler(tools.PeriodicNotesToolHandler())
+    add_tool_handler(tools.RecentPeriodicNotesToolHandler())
+    add_tool_handler(tools.RecentChangesToolHandler())
+    add_tool_handler(tools.ChangesToolHandler())
+    add_tool_handler(tools.NoteMetadataToolHandler())
+    add_tool_handler(tools.ServerMetricsToolHandler())
+    if tools.link_graph is not None:
+        add_tool_handler(tools.BacklinksToolHandler())
+        add_tool_handler(tools.NeighborhoodToolHandler())
+
+    return tools
+
+@lru_cache(maxsize=None)
+def get_tool_descriptions() -> list[Tool]:
+    load_tools()
+    return [th.get_tool_description() for th in tool_handlers.values()]
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available tools."""
 
-    return [th.get_tool_description() for th in tool_handlers.values()]
+    return get_tool_descriptions()
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
     """Handle tool calls for command line run."""
-    
+
     if not isinstance(arguments, dict):
         raise RuntimeError("arguments must be dictionary")
 
+    tools = load_tools()
 
     tool_handler = get_tool_handler(name)
     if not tool_handler:
         raise ValueError(f"Unknown tool: {name}")
 
+    started = time.perf_counter()
     try:
-        return tool_handler.run_tool(arguments)
+        result = await tool_handler.run_tool_async(arguments)
     except Exception as e:
+        tools.metrics.record_tool(name, time.perf_counter() - started, error=True)
         logger.error(str(e))
         raise RuntimeError(f"Caught Exception. Error: {str(e)}")
+    tools.metrics.record_tool(name, time.perf_counter() - started)
+    return result
+
+
+def _log_task_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task failed: {task.exception()}")
+
+
+_background_tasks: set[asyncio.Task] = set()
+_bootstrapped = False
+
+def _start_background_task(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_task_failure)
+
+
+async def _build_indexes() -> None:
+    tools = load_tools()
+    await tools.api.build_index()
+    if tools.search_index is not None or tools.link_graph is not None:
+        await tools.api.build_content_indexes()
+
+
+async def on_initialized(notification: InitializedNotification) -> None:
+    """Bootstrap the server once the client has completed the handshake."""
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    _bootstrapped = True
+
+    try:
+        tools = load_tools()
+    except Exception as e:
+        # Reported again on every tool call, but surface it in the log right away
+        logger.error(f"Failed to start: {str(e)}")
+        return
+
+    # Open the connection now rather than on the first tool call
+    _start_background_task(tools.api.prewarm())
+    get_tool_descriptions()
+
+    if tools.store is not None:
+        # Serve what the previous run cached once it is revalidated
+        _start_background_task(tools.api.warm_start())
+        _start_background_task(tools.api.persist_periodically())
+
+    if tools.vault_index is not None:
+        # Build the indexes in the background; tools fall back to the API until they are ready
+        _start_background_task(_build_indexes())
+
+    if tools.watcher is not None:
+        _start_background_task(tools.watcher.run())
+
+    if tools.config.metrics_file:
+        _start_background_task(tools.metrics.write_prometheus_file_periodically(tools.config.metrics_file))
+
+    if tools.config.metrics_port:
+        # Bound to localhost only, the metrics are not authenticated
+        _start_background_task(tools.metrics.serve("127.0.0.1", tools.config.metrics_port))
+
+app.notification_handlers[InitializedNotification] = on_initialized
+
+
+async def _flush_appends() -> None:
+    """Write appends still held back by the append buffer before exiting."""
+    if load_tools.cache_info().currsize == 0:
+        # The tools were never loaded, so nothing was appended
+        return
+    try:
+        await load_tools().api.flush_appends()
+    except Exception as e:
+        logger.error(f"Failed to write buffered appends: {str(e)}")
+
+
+async def _save_cache() -> None:
+    """Write what the persistent cache has not saved yet before exiting."""
+    if load_tools.cache_info().currsize == 0:
+        return
+    try:
+        await load_tools().api.persist()
+    except Exception as e:
+        logger.error(f"Failed to save the cache: {str(e)}")
+
+
+async def _terminate() -> None:
+    """Write buffered appends and the cache, then let SIGTERM end the process as it would by default."""
+    await _flush_appends()
+    await _save_cache()
+    loop = asyncio.get_running_loop()
+    loop.remove_signal_handler(signal.SIGTERM)
+    os.kill(os.getpid(), signal.SIGTERM)
 
 
 async def main():
@@ -83,9 +202,19 @@ async def main():
     # Import here to avoid issues with event loops
     from mcp.server.stdio import stdio_server
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
+    # The stdin reader cannot be interrupted, so SIGTERM is handled before shutting down the session
+    with contextlib.suppress(NotImplementedError):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, lambda: _start_background_task(_terminate())
         )
+
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        await _flush_appends()
+        await _save_cache()
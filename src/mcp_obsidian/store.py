@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any
+
+from .index import NoteMetadata
+
+logger = logging.getLogger("mcp-obsidian")
+
+DEFAULT_STORE_FLUSH_SECONDS = 5.0
+# Bumped when the tables change; older files are emptied rather than migrated
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, content BLOB);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, metadata BLOB);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _compress(value: Any) -> bytes:
+    if not isinstance(value, str):
+        value = json.dumps(value, separators=(',', ':'))
+    return zlib.compress(value.encode('utf-8'))
+
+
+def _decompress(data: bytes) -> str:
+    return zlib.decompress(data).decode('utf-8')
+
+
+class PersistentStore():
+    """SQLite file keeping note contents and the vault index across restarts.
+
+    Values are stored zlib-compressed. Changes are queued in memory and
+    written in a single transaction by :meth:`flush`, which the server runs
+    periodically and before exiting. Everything loaded from the store was
+    current when it was saved only, so it is revalidated by mtime against
+    the REST API before being served.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Queued changes: contents to save or None to delete, the index to replace
+        self._notes: dict[str, tuple[str, float, int] | None] = {}
+        self._clear_notes = False
+        self._index: list[NoteMetadata] | None = None
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                db.executescript("DROP TABLE IF EXISTS notes; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS state;")
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def load_notes(self) -> list[tuple[str, str, float, int]]:
+        """Saved note contents as ``(path, content, mtime, size)``."""
+        with self._db_lock:
+            try:
+                rows = self._connect().execute("SELECT path, content, mtime, size FROM notes").fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not load cached notes from {self.path}: {str(e)}")
+                return []
+        return [(path, _decompress(content), mtime, size) for path, content, mtime, size in rows]
+
+    def load_index(self) -> dict[str, NoteMetadata]:
+        """Saved vault index, keyed by path."""
+        with self._db_lock:
+            try:
+                rows = self._connect().execute("SELECT metadata FROM files").fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not load the vault index from {self.path}: {str(e)}")
+                return {}
+        notes = {}
+        for (metadata,) in rows:
+            note = json.loads(_decompress(metadata))
+            notes[note['path']] = NoteMetadata(note['path'], note['stat'], note['tags'], note['frontmatter'])
+        return notes
+
+    def save_note(self, path: str, content: str, mtime: float, size: int) -> None:
+        with self._lock:
+            self._notes[path] = (content, mtime, size)
+
+    def delete_note(self, path: str) -> None:
+        with self._lock:
+            self._notes[path] = None
+
+    def clear_notes(self) -> None:
+        with self._lock:
+            self._notes.clear()
+            self._clear_notes = True
+
+    def save_index(self, notes: list[NoteMetadata]) -> None:
+        """Replace the saved vault index on the next flush."""
+        with self._lock:
+            self._index = notes
+
+    def flush(self) -> None:
+        """Write the queued changes. Blocking, run it in a thread from the event loop."""
+        with self._lock:
+            notes, self._notes = self._notes, {}
+            clear_notes, self._clear_notes = self._clear_notes, False
+            index, self._index = self._index, None
+        if not notes and not clear_notes and index is None:
+            return
+
+        with self._db_lock:
+            try:
+                with self._connect() as db:
+                    if clear_notes:
+                        db.execute("DELETE FROM notes")
+                    db.executemany("DELETE FROM notes WHERE path = ?", [
+                        (path,) for path, note in notes.items() if note is None
+                    ])
+                    db.executemany("INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?)", [
+                        (path, note[1], note[2], _compress(note[0])) for path, note in notes.items() if note is not None
+                    ])
+                    if index is not None:
+                        db.execute("DELETE FROM files")
+                        db.executemany("INSERT INTO files VALUES (?, ?)", [
+                            (note.path, _compress(note.to_dict())) for note in index
+                        ])
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write the cache to {self.path}: {str(e)}")
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,17 +1,97 @@
 from collections.abc import Sequence
+from mcp.server.lowlevel.server import request_ctx
 from mcp.types import (
     Tool,
     TextContent,
     ImageContent,
     EmbeddedResource,
 )
-import json
+import asyncio
 import os
+from typing import Any
 from . import obsidian
+from .cache import NoteCache, QueryCache
+from .changes import DEFAULT_CHANGES_MAX_BYTES
+from .config import load_config
+from .filesystem import FilesystemObsidian
+from .encoding import decode_cursor, encode, encode_cursor, scope_of
+from .fulltext import SearchIndex
+from .index import VaultIndex
+from .links import DEFAULT_NEIGHBORHOOD_MAX_NOTES, LinkGraph
+from .metrics import registry as metrics
+from .resilience import RequestPolicy
+from .store import PersistentStore
+from .watcher import VaultWatcher
 
-api_key = os.getenv("OBSIDIAN_API_KEY", "")
-if api_key == "":
-    raise ValueError(f"OBSIDIAN_API_KEY environment variable required. Working directory: {os.getcwd()}")
+config = load_config()
+
+store = None
+if config.cache_dir:
+    # One file per vault; vaults differ by address or API key
+    store_name = f"vault-{scope_of(config.protocol, config.host, config.port, config.api_key)}.sqlite3"
+    store = PersistentStore(os.path.join(config.cache_dir, store_name))
+
+note_cache = None
+if config.cache_max_bytes > 0:
+    note_cache = NoteCache(config.cache_max_bytes, config.cache_revalidate_seconds, store)
+    metrics.register_cache("notes", note_cache)
+query_cache = None
+if config.query_cache_seconds > 0 and config.query_cache_max_bytes > 0:
+    query_cache = QueryCache(config.query_cache_seconds, config.query_cache_max_bytes)
+    metrics.register_cache("queries", query_cache)
+search_index = SearchIndex() if config.search_index else None
+link_graph = LinkGraph() if config.link_graph else None
+request_policy = RequestPolicy(
+    timeout=config.timeout,
+    search_timeout=config.search_timeout,
+    adaptive_timeouts=config.adaptive_timeouts,
+    retries=config.retries,
+    retry_backoff=config.retry_backoff,
+    hedge_reads=config.hedge_reads,
+    breaker_failures=config.breaker_failures,
+    breaker_reset_seconds=config.breaker_reset_seconds
+)
+vault_index = VaultIndex(config.index_refresh_seconds) if config.index else None
+
+# Default for the per-call "compact" argument
+compact_json = config.compact_json
+
+# One long-lived client per process so every tool call reuses pooled connections
+client_options = dict(
+    api_key=config.api_key,
+    protocol=config.protocol,
+    host=config.host,
+    port=config.port,
+    pool_size=config.pool_size,
+    cache=note_cache,
+    query_cache=query_cache,
+    index=vault_index,
+    search_index=search_index,
+    coalesce_seconds=config.coalesce_seconds,
+    coalesce_max_bytes=config.coalesce_max_bytes,
+    request_policy=request_policy,
+    local_jsonlogic=config.local_jsonlogic,
+    store=store,
+    link_graph=link_graph,
+    prefetch_links=config.prefetch_links,
+    prefetch_concurrency=config.prefetch_concurrency,
+    prefetch_max_bytes=config.prefetch_max_bytes
+)
+if config.vault_path:
+    # Serve reads from disk; writes still go through the REST API
+    api = FilesystemObsidian(config.vault_path, **client_options)
+else:
+    api = obsidian.AsyncObsidian(**client_options)
+# Reported like a cache: hits are reads that joined an identical one in flight
+metrics.register_cache("in_flight", api.single_flight)
+if api.prefetcher is not None:
+    # Hits are prefetched notes read from the cache, misses prefetched notes read after they were dropped
+    metrics.register_cache("prefetch", api.prefetcher)
+
+watcher = None
+if config.watch:
+    watcher = VaultWatcher(config.vault_path, api.handle_vault_change, api.handle_vault_resync, config.watch_poll_seconds)
+    api.watching = True
 
 TOOL_LIST_FILES_IN_VAULT = "obsidian_list_files_in_vault"
 TOOL_LIST_FILES_IN_DIR = "obsidian_list_files_in_dir"
@@ -24,6 +104,52 @@ TOOL_BATCH_GET_FILE_CONTENTS = "obsidian_batch_get_file_contents"
 TOOL_GET_PERIODIC_NOTE = "obsidian_get_periodic_note"
 TOOL_GET_RECENT_PERIODIC_NOTES = "obsidian_get_recent_periodic_notes"
 TOOL_GET_RECENT_CHANGES = "obsidian_get_recent_changes"
+TOOL_GET_NOTE_METADATA = "obsidian_get_note_metadata"
+TOOL_LIST_FILES_TREE = "obsidian_list_files_tree"
+TOOL_GET_SERVER_METRICS = "obsidian_get_server_metrics"
+TOOL_BATCH_WRITE = "obsidian_batch_write"
+TOOL_GET_BACKLINKS = "obsidian_get_backlinks"
+TOOL_GET_NEIGHBORHOOD = "obsidian_get_neighborhood"
+TOOL_GET_CHANGES = "obsidian_get_changes"
+
+# Input schema properties shared by tools that return JSON
+OUTPUT_PROPERTIES = {
+    "compact": {
+        "type": "boolean",
+        "description": "Return minified JSON instead of indented JSON to save tokens (default set by the server)."
+    },
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Only return these fields of each result, e.g. ['filename'] or ['filename', 'matches.context']. Nested fields are separated by dots."
+    },
+}
+
+PAGINATION_PROPERTIES = {
+    "limit": {
+        "type": "integer",
+        "description": "Return at most this many results. The response then is an object with the `results`, the `total` number of results and a `next_cursor` for the next page (null on the last page)."
+    },
+    "offset": {
+        "type": "integer",
+        "description": "Number of results to skip (default: 0)."
+    },
+    "cursor": {
+        "type": "string",
+        "description": "The `next_cursor` of a previous call with the same query, to continue with the next page."
+    },
+}
+
+async def report_progress(progress: float, total: float | None = None) -> None:
+    """Send a progress notification if the client asked for them in the current tool call."""
+    try:
+        ctx = request_ctx.get()
+    except LookupError:
+        # Not called from an MCP request, e.g. from the benchmarks
+        return
+    token = ctx.meta.progressToken if ctx.meta is not None else None
+    if token is not None:
+        await ctx.session.send_progress_notification(token, progress, total)
 
 class ToolHandler():
     def __init__(self, tool_name: str):
@@ -33,7 +159,72 @@ class ToolHandler():
         raise NotImplementedError()
 
     def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        """Blocking variant of run_tool_async for callers without an event loop."""
+        return asyncio.run(self.run_tool_async(args))
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         raise NotImplementedError()
+
+    def encode_result(self, value: Any, args: dict) -> str:
+        """Serialize a result as JSON, honouring the compact and fields arguments."""
+        compact = args.get("compact", compact_json)
+        if not isinstance(compact, bool):
+            raise RuntimeError(f"Invalid compact: {compact}. Must be a boolean")
+
+        fields = args.get("fields")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) for f in fields)):
+            raise RuntimeError(f"Invalid fields: {fields}. Must be a list of strings")
+
+        return encode(value, compact, fields)
+
+    def get_page(self, args: dict, scope: str) -> tuple[int, int | None] | None:
+        """Read the limit, offset and cursor arguments.
+
+        Args:
+            args: Tool arguments
+            scope: Identifies the query, see :func:`encoding.scope_of`
+
+        Returns:
+            The offset and limit of the requested page, or None if no
+            pagination argument was given
+        """
+        limit = args.get("limit")
+        offset = args.get("offset")
+        cursor = args.get("cursor")
+        if limit is None and offset is None and cursor is None:
+            return None
+
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+            raise RuntimeError(f"Invalid limit: {limit}. Must be a positive integer")
+        if offset is not None and (not isinstance(offset, int) or isinstance(offset, bool) or offset < 0):
+            raise RuntimeError(f"Invalid offset: {offset}. Must be a non-negative integer")
+
+        if cursor is not None:
+            if offset is not None:
+                raise RuntimeError("offset and cursor cannot be combined")
+            state = decode_cursor(cursor) if isinstance(cursor, str) else None
+            if state is None or state.get("scope") != scope or not isinstance(state.get("offset"), int):
+                raise RuntimeError(f"Invalid cursor: {cursor}. Must be the next_cursor of a previous call with the same query")
+            offset = state["offset"]
+            if limit is None:
+                limit = state.get("limit")
+
+        return offset or 0, limit
+
+    def encode_page(self, page: list, args: dict, offset: int, limit: int | None, total: int, scope: str) -> str:
+        """Serialize one page of results together with the cursor of the next page."""
+        end = offset + len(page)
+        next_cursor = encode_cursor({"scope": scope, "offset": end, "limit": limit}) if end < total else None
+
+        fields = args.get("fields")
+        if isinstance(fields, list) and all(isinstance(f, str) for f in fields):
+            # The fields select within each result, not within the page
+            args = args | {"fields": ["total", "offset", "next_cursor"] + [f"results.{f}" for f in fields]}
+
+        return self.encode_result(
+            {"total": total, "offset": offset, "results": page, "next_cursor": next_cursor},
+            args
+        )
     
 class ListFilesInVaultToolHandler(ToolHandler):
     def __init__(self):
@@ -45,21 +236,19 @@ class ListFilesInVaultToolHandler(ToolHandler):
             description="Lists all files and directories at the root level of your Obsidian vault. This provides an overview of your vault's top-level organization without requiring any parameters.",
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {**OUTPUT_PROPERTIES},
                 "required": []
             },
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
-
-        api = obsidian.Obsidian(api_key=api_key)
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
 
-        files = api.list_files_in_vault()
+        files = await api.list_files_in_vault()
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(files, indent=2)
+                text=self.encode_result(files, args)
             )
         ]
     
@@ -78,24 +267,23 @@ class ListFilesInDirToolHandler(ToolHandler):
                         "type": "string",
                         "description": "Path to the directory you want to explore (relative to your vault root, e.g., 'Projects' or 'Daily Notes'). Note that empty directories will not be returned."
                     },
+                    **OUTPUT_PROPERTIES,
                 },
                 "required": ["dirpath"]
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
 
         if "dirpath" not in args:
             raise RuntimeError("dirpath argument missing in arguments")
 
-        api = obsidian.Obsidian(api_key=api_key)
-
-        files = api.list_files_in_dir(args["dirpath"])
+        files = await api.list_files_in_dir(args["dirpath"])
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(files, indent=2)
+                text=self.encode_result(files, args)
             )
         ]
     
@@ -106,7 +294,7 @@ class GetFileContentsToolHandler(ToolHandler):
     def get_tool_description(self):
         return Tool(
             name=self.name,
-            description="Retrieves the complete content of a specific file from your Obsidian vault. Use this tool when you need to access or analyze the full text of a note.",
+            description="Retrieves the content of a specific file from your Obsidian vault. Use this tool when you need to access or analyze the text of a note. For large notes, read only the part you need by line or byte range (start/end) or by a heading, block reference or frontmatter field (target_type/target).",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -115,23 +303,87 @@ class GetFileContentsToolHandler(ToolHandler):
                         "description": "Path to the file you want to read (relative to your vault root, e.g., 'Projects/project-ideas.md' or 'Meeting Notes/2023-05-15.md').",
                         "format": "path"
                     },
+                    "start": {
+                        "type": "integer",
+                        "description": "First line (1-based) or byte offset (0-based) to return. Defaults to the start of the file.",
+                        "minimum": 0
+                    },
+                    "end": {
+                        "type": "integer",
+                        "description": "Last line to return (inclusive) or byte offset to stop at (exclusive). Defaults to the end of the file.",
+                        "minimum": 0
+                    },
+                    "unit": {
+                        "type": "string",
+                        "description": "Whether start and end count lines or bytes (default: lines)",
+                        "enum": ["lines", "bytes"],
+                        "default": "lines"
+                    },
+                    "target_type": {
+                        "type": "string",
+                        "description": "Read only one part of the note: 'heading' (the section below a heading), 'block' (a block reference), or 'frontmatter' (a YAML metadata field). Cannot be combined with start/end.",
+                        "enum": ["heading", "block", "frontmatter"]
+                    },
+                    "target": {
+                        "type": "string",
+                        "description": "The target identifier, as for patching: the heading text (nested headings separated by '::', e.g., 'Meetings::2024-05-01'), the block ID, or the frontmatter field name"
+                    },
+                    "format": {
+                        "type": "string",
+                        "description": "'json' returns the content as a JSON string, 'text' returns it as plain text without escaping (default: json)",
+                        "enum": ["json", "text"],
+                        "default": "json"
+                    },
                 },
                 "required": ["filepath"]
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         if "filepath" not in args:
             raise RuntimeError("filepath argument missing in arguments")
 
-        api = obsidian.Obsidian(api_key=api_key)
+        output_format = args.get("format", "json")
+        if output_format not in ("json", "text"):
+            raise RuntimeError(f"Invalid format: {output_format}. Must be one of: json, text")
+
+        unit = args.get("unit", "lines")
+        if unit not in ("lines", "bytes"):
+            raise RuntimeError(f"Invalid unit: {unit}. Must be one of: lines, bytes")
+
+        for key in ("start", "end"):
+            value = args.get(key)
+            if value is not None and (not isinstance(value, int) or value < 0):
+                raise RuntimeError(f"Invalid {key}: {value}. Must be a non-negative integer")
 
-        content = api.get_file_contents(args["filepath"])
+        has_range = args.get("start") is not None or args.get("end") is not None
+        if "target_type" in args:
+            if has_range:
+                raise RuntimeError("start/end cannot be combined with target_type")
+            if "target" not in args:
+                raise RuntimeError("target argument missing in arguments")
+            content = await api.get_file_section(args["filepath"], args["target_type"], args["target"])
+        elif has_range:
+            default_start = 1 if unit == "lines" else 0
+            start = max(args.get("start") or default_start, default_start)
+            content = await api.get_file_range(args["filepath"], start, args.get("end"), unit)
+        else:
+            content = await api.get_file_contents(args["filepath"])
+
+        if isinstance(content, str):
+            # The next read is often one of the notes linked from what was just read
+            api.prefetch_links(args["filepath"], content)
+
+        if output_format == "text":
+            # Frontmatter fields can be lists or numbers
+            text = content if isinstance(content, str) else self.encode_result(content, args)
+        else:
+            text = self.encode_result(content, args)
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(content, indent=2)
+                text=text
             )
         ]
     
@@ -155,25 +407,43 @@ class SearchToolHandler(ToolHandler):
                         "type": "integer",
                         "description": "How many characters of surrounding text to include around each match to provide context (default: 100).",
                         "default": 100
-                    }
+                    },
+                    "max_matches_per_file": {
+                        "type": "integer",
+                        "description": "Return at most this many matches per file. Each result then also has the `match_count` of the file."
+                    },
+                    **PAGINATION_PROPERTIES,
+                    **OUTPUT_PROPERTIES,
                 },
                 "required": ["query"]
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         if "query" not in args:
             raise RuntimeError("query argument missing in arguments")
 
         context_length = args.get("context_length", 100)
-        
-        api = obsidian.Obsidian(api_key=api_key)
-        results = api.search(args["query"], context_length)
+
+        max_matches = args.get("max_matches_per_file")
+        if max_matches is not None and (not isinstance(max_matches, int) or isinstance(max_matches, bool) or max_matches < 1):
+            raise RuntimeError(f"Invalid max_matches_per_file: {max_matches}. Must be a positive integer")
+
+        scope = scope_of(self.name, args["query"], context_length)
+        page = self.get_page(args, scope)
+
+        await report_progress(0)
+        if page is not None:
+            # Only the requested page is formatted
+            results, total = await api.search_page(args["query"], context_length, page[0], page[1])
+        else:
+            results = await api.search(args["query"], context_length)
         
         formatted_results = []
         for result in results:
+            matches = result.get('matches', [])
             formatted_matches = []
-            for match in result.get('matches', []):
+            for match in matches if max_matches is None else matches[:max_matches]:
                 context = match.get('context', '')
                 match_pos = match.get('match', {})
                 start = match_pos.get('start', 0)
@@ -184,16 +454,25 @@ class SearchToolHandler(ToolHandler):
                     'match_position': {'start': start, 'end': end}
                 })
                 
-            formatted_results.append({
+            formatted_result = {
                 'filename': result.get('filename', ''),
                 'score': result.get('score', 0),
                 'matches': formatted_matches
-            })
+            }
+            if max_matches is not None:
+                formatted_result['match_count'] = len(matches)
+            formatted_results.append(formatted_result)
+        await report_progress(len(formatted_results), len(formatted_results))
+
+        if page is not None:
+            text = self.encode_page(formatted_results, args, page[0], page[1], total, scope)
+        else:
+            text = self.encode_result(formatted_results, args)
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(formatted_results, indent=2)
+                text=text
             )
         ]
     
@@ -222,12 +501,11 @@ class AppendContentToolHandler(ToolHandler):
            }
        )
 
-   def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+   async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
        if "filepath" not in args or "content" not in args:
            raise RuntimeError("filepath and content arguments required")
 
-       api = obsidian.Obsidian(api_key=api_key)
-       api.append_content(args.get("filepath", ""), args["content"])
+       await api.append_content(args.get("filepath", ""), args["content"])
 
        return [
            TextContent(
@@ -275,13 +553,12 @@ class PatchContentToolHandler(ToolHandler):
            }
        )
 
-   def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+   async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
        required = ["filepath", "operation", "target_type", "target", "content"]
        if not all(key in args for key in required):
            raise RuntimeError(f"Missing required arguments: {', '.join(required)}")
 
-       api = obsidian.Obsidian(api_key=api_key)
-       api.patch_content(
+       await api.patch_content(
            args.get("filepath", ""),
            args.get("operation", ""),
            args.get("target_type", ""),
@@ -319,23 +596,38 @@ class ComplexSearchToolHandler(ToolHandler):
                    "query": {
                        "type": "object",
                        "description": "JsonLogic query object specifying search criteria. Examples: \n- Find all markdown files: {\"glob\": [\"*.md\", {\"var\": \"path\"}]}\n- Find files with specific tag: {\"in\": [\"productivity\", {\"var\": \"tags\"}]}\n- Find files modified recently: {\">\": [{\"var\": \"mtime\"}, 1672531200000]}"
-                   }
+                   },
+                   **PAGINATION_PROPERTIES,
+                   **OUTPUT_PROPERTIES,
                },
                "required": ["query"]
            }
        )
 
-   def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+   async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
        if "query" not in args:
            raise RuntimeError("query argument missing in arguments")
 
-       api = obsidian.Obsidian(api_key=api_key)
-       results = api.search_json(args.get("query", ""))
+       scope = scope_of(self.name, args["query"])
+       page = self.get_page(args, scope)
+
+       await report_progress(0)
+       results = await api.search_json(args.get("query", ""))
+       await report_progress(len(results), len(results))
+
+       if page is not None:
+           offset, limit = page
+           text = self.encode_page(
+               results[offset:] if limit is None else results[offset:offset + limit],
+               args, offset, limit, len(results), scope
+           )
+       else:
+           text = self.encode_result(results, args)
 
        return [
            TextContent(
                type="text",
-               text=json.dumps(results, indent=2)
+               text=text
            )
        ]
 
@@ -359,17 +651,35 @@ class BatchGetFileContentsToolHandler(ToolHandler):
                         },
                         "description": "List of file paths you want to retrieve (e.g., ['Projects/project1.md', 'Projects/project2.md'])"
                     },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": f"Maximum number of files fetched at the same time (default: {obsidian.DEFAULT_BATCH_CONCURRENCY})",
+                        "default": obsidian.DEFAULT_BATCH_CONCURRENCY,
+                        "minimum": 1
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "Optional budget for the total size of returned file contents in bytes. Files beyond the budget are truncated or skipped.",
+                        "minimum": 1
+                    },
                 },
                 "required": ["filepaths"]
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         if "filepaths" not in args:
             raise RuntimeError("filepaths argument missing in arguments")
 
-        api = obsidian.Obsidian(api_key=api_key)
-        content = api.get_batch_file_contents(args["filepaths"])
+        max_concurrency = args.get("max_concurrency", obsidian.DEFAULT_BATCH_CONCURRENCY)
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise RuntimeError(f"Invalid max_concurrency: {max_concurrency}. Must be a positive integer")
+
+        max_bytes = args.get("max_bytes")
+        if max_bytes is not None and (not isinstance(max_bytes, int) or max_bytes < 1):
+            raise RuntimeError(f"Invalid max_bytes: {max_bytes}. Must be a positive integer")
+
+        content = await api.get_batch_file_contents(args["filepaths"], max_concurrency, max_bytes)
 
         return [
             TextContent(
@@ -399,7 +709,7 @@ class PeriodicNotesToolHandler(ToolHandler):
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         if "period" not in args:
             raise RuntimeError("period argument missing in arguments")
 
@@ -408,8 +718,7 @@ class PeriodicNotesToolHandler(ToolHandler):
         if period not in valid_periods:
             raise RuntimeError(f"Invalid period: {period}. Must be one of: {', '.join(valid_periods)}")
 
-        api = obsidian.Obsidian(api_key=api_key)
-        content = api.get_periodic_note(period)
+        content = await api.get_periodic_note(period)
 
         return [
             TextContent(
@@ -451,7 +760,7 @@ class RecentPeriodicNotesToolHandler(ToolHandler):
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         if "period" not in args:
             raise RuntimeError("period argument missing in arguments")
 
@@ -468,13 +777,12 @@ class RecentPeriodicNotesToolHandler(ToolHandler):
         if not isinstance(include_content, bool):
             raise RuntimeError(f"Invalid include_content: {include_content}. Must be a boolean")
 
-        api = obsidian.Obsidian(api_key=api_key)
-        results = api.get_recent_periodic_notes(period, limit, include_content)
+        results = await api.get_recent_periodic_notes(period, limit, include_content)
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(results, indent=2)
+                text=self.encode_result(results, args)
             )
         ]
         
@@ -501,12 +809,13 @@ class RecentChangesToolHandler(ToolHandler):
                         "description": "Only include files modified within this many days in the past (default: 90 days)",
                         "minimum": 1,
                         "default": 90
-                    }
+                    },
+                    **OUTPUT_PROPERTIES,
                 }
             }
         )
 
-    def run_tool(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
         limit = args.get("limit", 10)
         if not isinstance(limit, int) or limit < 1:
             raise RuntimeError(f"Invalid limit: {limit}. Must be a positive integer")
@@ -515,12 +824,426 @@ class RecentChangesToolHandler(ToolHandler):
         if not isinstance(days, int) or days < 1:
             raise RuntimeError(f"Invalid days: {days}. Must be a positive integer")
 
-        api = obsidian.Obsidian(api_key=api_key)
-        results = api.get_recent_changes(limit, days)
+        results = await api.get_recent_changes(limit, days)
+
+        return [
+            TextContent(
+                type="text",
+                text=self.encode_result(results, args)
+            )
+        ]
+
+class NoteMetadataToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_GET_NOTE_METADATA)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Retrieves the metadata of a note without its content: tags, YAML frontmatter and file statistics (creation time, modification time and size). Use this when you need to check properties of a note without reading the whole text.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filepath": {
+                        "type": "string",
+                        "description": "Path to the note (relative to your vault root, e.g., 'Projects/project-ideas.md').",
+                        "format": "path"
+                    },
+                },
+                "required": ["filepath"]
+            }
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        if "filepath" not in args:
+            raise RuntimeError("filepath argument missing in arguments")
+
+        metadata = await api.get_note_metadata(args["filepath"])
+
+        return [
+            TextContent(
+                type="text",
+                text=self.encode_result(metadata, args)
+            )
+        ]
+
+class ListFilesTreeToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_LIST_FILES_TREE)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Lists all files and directories below a folder of your Obsidian vault recursively and returns them as one compact tree. Use this to map the structure of your vault in a single call instead of listing each folder separately.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "dirpath": {
+                        "type": "string",
+                        "description": "Path to the directory to start from (relative to your vault root, e.g., 'Projects'). Defaults to the vault root."
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "How many levels of directories to expand (default: unlimited). Directories below this depth are listed but not expanded.",
+                        "minimum": 1
+                    },
+                    "glob": {
+                        "type": "string",
+                        "description": "Only include files whose path relative to the vault root matches this glob pattern (e.g., '*.md' or 'Projects/*.canvas'). Directories without matching files are omitted."
+                    },
+                    **OUTPUT_PROPERTIES,
+                },
+                "required": []
+            }
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        max_depth = args.get("max_depth")
+        if max_depth is not None and (not isinstance(max_depth, int) or max_depth < 1):
+            raise RuntimeError(f"Invalid max_depth: {max_depth}. Must be a positive integer")
+
+        tree = await api.list_files_tree(args.get("dirpath", ""), max_depth, args.get("glob"))
 
         return [
             TextContent(
                 type="text",
-                text=json.dumps(results, indent=2)
+                text=self.encode_result(tree, args)
             )
         ]
+
+class ServerMetricsToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_GET_SERVER_METRICS)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Diagnostic tool that returns performance metrics of this MCP server since it started: latency percentiles and error counts per tool, latency, status codes and bytes transferred per Local REST API route, and cache hit rates. Only use this to diagnose slow or failing calls.",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+                "required": []
+            },
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        return [
+            TextContent(
+                type="text",
+                text=self.encode_result(metrics.snapshot(), args)
+            )
+        ]
+
+class BatchWriteToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_BATCH_WRITE)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Applies multiple append and patch operations to notes in your Obsidian vault in one call. Operations on different files run in parallel, operations on the same file are applied in the given order. Use this instead of many separate append or patch calls when updating several notes. Returns the status of every operation.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "operations": {
+                        "type": "array",
+                        "description": "The write operations to apply",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "type": {
+                                    "type": "string",
+                                    "description": "'append' adds content to the end of the file (creating it if needed), 'patch' modifies a section like obsidian_patch_content",
+                                    "enum": ["append", "patch"]
+                                },
+                                "filepath": {
+                                    "type": "string",
+                                    "description": "Path to the file (relative to vault root)",
+                                    "format": "path"
+                                },
+                                "content": {
+                                    "type": "string",
+                                    "description": "Content to append or insert"
+                                },
+                                "operation": {
+                                    "type": "string",
+                                    "description": "Patch only: 'append', 'prepend' or 'replace' relative to the target",
+                                    "enum": ["append", "prepend", "replace"]
+                                },
+                                "target_type": {
+                                    "type": "string",
+                                    "description": "Patch only: 'heading', 'block' or 'frontmatter'",
+                                    "enum": ["heading", "block", "frontmatter"]
+                                },
+                                "target": {
+                                    "type": "string",
+                                    "description": "Patch only: the heading text, block ID or frontmatter field name"
+                                }
+                            },
+                            "required": ["type", "filepath", "content"]
+                        }
+                    },
+                    "fail_fast": {
+                        "type": "boolean",
+                        "description": "Skip all operations that have not started yet once one fails (default: false, apply all operations)",
+                        "default": False
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "Maximum number of files written at the same time (default: 8)",
+                        "minimum": 1,
+                        "default": obsidian.DEFAULT_BATCH_CONCURRENCY
+                    }
+                },
+                "required": ["operations"]
+            }
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        if "operations" not in args:
+            raise RuntimeError("operations argument missing in arguments")
+
+        operations = args["operations"]
+        if not isinstance(operations, list) or not operations:
+            raise RuntimeError(f"Invalid operations: {operations}. Must be a non-empty list")
+
+        # Validate everything up front so a malformed batch writes nothing
+        for i, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                raise RuntimeError(f"Invalid operation {i}: must be an object")
+            if operation.get("type") not in ("append", "patch"):
+                raise RuntimeError(f"Invalid operation {i}: type must be one of: append, patch")
+            required = ["filepath", "content"]
+            if operation["type"] == "patch":
+                required += ["operation", "target_type", "target"]
+            missing = [key for key in required if not isinstance(operation.get(key), str)]
+            if missing:
+                raise RuntimeError(f"Invalid operation {i}: missing {', '.join(missing)}")
+            if operation["type"] == "patch":
+                if operation["operation"] not in ("append", "prepend", "replace"):
+                    raise RuntimeError(f"Invalid operation {i}: operation must be one of: append, prepend, replace")
+                if operation["target_type"] not in ("heading", "block", "frontmatter"):
+                    raise RuntimeError(f"Invalid operation {i}: target_type must be one of: heading, block, frontmatter")
+
+        fail_fast = args.get("fail_fast", False)
+        if not isinstance(fail_fast, bool):
+            raise RuntimeError(f"Invalid fail_fast: {fail_fast}. Must be a boolean")
+
+        max_concurrency = args.get("max_concurrency", obsidian.DEFAULT_BATCH_CONCURRENCY)
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise RuntimeError(f"Invalid max_concurrency: {max_concurrency}. Must be a positive integer")
+
+        results = await api.batch_write(operations, max_concurrency, fail_fast)
+
+        summary = {
+            status: sum(1 for result in results if result["status"] == status)
+            for status in ("ok", "error", "skipped")
+        }
+        return [
+            TextContent(
+                type="text",
+                text=self.encode_result({"summary": summary, "results": results}, args)
+            )
+        ]
+
+class BacklinksToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_GET_BACKLINKS)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Returns the notes linking to a note (backlinks), the notes it links to and its links to notes that do not exist, from an index of the wikilinks and embeds of your Obsidian vault. Use this instead of searching for [[note]] to find related notes.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filepath": {
+                        "type": "string",
+                        "description": "Path to the note (relative to your vault root, e.g., 'Projects/project-ideas.md').",
+                        "format": "path"
+                    },
+                    **OUTPUT_PROPERTIES,
+                },
+                "required": ["filepath"]
+            }
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        if "filepath" not in args:
+            raise RuntimeError("filepath argument missing in arguments")
+
+        links = await api.get_links(args["filepath"])
+
+        return [
+            TextContent(
+                type="text",
+                text=self.encode_result(links, args)
+            )
+        ]
+
+class NeighborhoodToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_GET_NEIGHBORHOOD)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Returns the notes within a number of links of a note in your Obsidian vault, following links, backlinks or both, with their distance and the links between them. Optionally includes the contents of these notes. Use this to gather the context around a note in one call.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filepath": {
+                        "type": "string",
+                        "description": "Path to the note to start from (relative to your vault root, e.g., 'Projects/project-ideas.md').",
+                        "format": "path"
+                    },
+                    "depth": {
+                        "type": "integer",
+                        "description": "Maximum number of links between the note and the returned notes (default: 1)",
+                        "default": 1,
+                        "minimum": 1
+                    },
+                    "direction": {
+                        "type": "string",
+                        "description": "'out' follows links of the notes, 'in' follows backlinks, 'both' follows either (default: both)",
+                        "enum": ["out", "in", "both"],
+                        "default": "both"
+                    },
+                    "max_notes": {
+                        "type": "integer",
+                        "description": f"Maximum number of notes returned, the start note included (default: {DEFAULT_NEIGHBORHOOD_MAX_NOTES}). Closer notes are returned first.",
+                        "default": DEFAULT_NEIGHBORHOOD_MAX_NOTES,
+                        "minimum": 1
+                    },
+                    "include_contents": {
+                        "type": "boolean",
+                        "description": "Also return the contents of the returned notes, like obsidian_batch_get_file_contents (default: false)",
+                        "default": False
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "Optional budget for the total size of returned note contents in bytes. Notes beyond the budget are truncated or skipped.",
+                        "minimum": 1
+                    },
+                    **OUTPUT_PROPERTIES,
+                },
+                "required": ["filepath"]
+            }
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        if "filepath" not in args:
+            raise RuntimeError("filepath argument missing in arguments")
+
+        depth = args.get("depth", 1)
+        if not isinstance(depth, int) or isinstance(depth, bool) or depth < 1:
+            raise RuntimeError(f"Invalid depth: {depth}. Must be a positive integer")
+
+        direction = args.get("direction", "both")
+        if direction not in ("out", "in", "both"):
+            raise RuntimeError(f"Invalid direction: {direction}. Must be one of: out, in, both")
+
+        max_notes = args.get("max_notes", DEFAULT_NEIGHBORHOOD_MAX_NOTES)
+        if not isinstance(max_notes, int) or isinstance(max_notes, bool) or max_notes < 1:
+            raise RuntimeError(f"Invalid max_notes: {max_notes}. Must be a positive integer")
+
+        max_bytes = args.get("max_bytes")
+        if max_bytes is not None and (not isinstance(max_bytes, int) or max_bytes < 1):
+            raise RuntimeError(f"Invalid max_bytes: {max_bytes}. Must be a positive integer")
+
+        neighborhood = await api.get_neighborhood(args["filepath"], depth, direction, max_notes)
+        result = [
+            TextContent(
+                type="text",
+                text=self.encode_result(neighborhood, args)
+            )
+        ]
+
+        if args.get("include_contents", False):
+            # Embedded attachments are part of the graph but have no text to return
+            paths = [note["path"] for note in neighborhood["notes"] if note["path"].endswith(".md")]
+            content = await api.get_batch_file_contents(paths, obsidian.DEFAULT_BATCH_CONCURRENCY, max_bytes)
+            result.append(
+                TextContent(
+                    type="text",
+                    text=content
+                )
+            )
+
+        return result
+
+class ChangesToolHandler(ToolHandler):
+    def __init__(self):
+        super().__init__(TOOL_GET_CHANGES)
+
+    def get_tool_description(self):
+        return Tool(
+            name=self.name,
+            description="Returns the notes created, modified or deleted in your Obsidian vault since a previous call, identified by the cursor that call returned. Without a cursor every note is listed as created. Use this to keep notes you already read up to date by reading only what changed.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "The `cursor` returned by the previous call. If `reset` is true in the response, the changes since that cursor are unknown (e.g. after a server restart) and every note is listed as created instead."
+                    },
+                    "include_contents": {
+                        "type": "boolean",
+                        "description": "Also return the contents of created and modified notes, like obsidian_batch_get_file_contents (default: false). Not returned when `reset` is true, read the notes you need instead.",
+                        "default": False
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": f"Budget for the total size of returned note contents in bytes. Notes beyond the budget are truncated or skipped (default: {DEFAULT_CHANGES_MAX_BYTES}).",
+                        "default": DEFAULT_CHANGES_MAX_BYTES,
+                        "minimum": 1
+                    },
+                    **OUTPUT_PROPERTIES,
+                },
+                "required": []
+            }
+        )
+
+    async def run_tool_async(self, args: dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+        since = None
+        cursor = args.get("cursor")
+        if cursor is not None:
+            state = decode_cursor(cursor) if isinstance(cursor, str) else None
+            if state is None or not isinstance(state.get("feed"), str) or not isinstance(state.get("seq"), int):
+                raise RuntimeError(f"Invalid cursor: {cursor}. Must be the cursor of a previous call")
+            # Cursors of a previous server run are answered with a reset
+            if state["feed"] == api.change_feed.id:
+                since = state["seq"]
+
+        max_bytes = args.get("max_bytes", DEFAULT_CHANGES_MAX_BYTES)
+        if not isinstance(max_bytes, int) or max_bytes < 1:
+            raise RuntimeError(f"Invalid max_bytes: {max_bytes}. Must be a positive integer")
+
+        feed = await api.get_changes(since)
+        result = [
+            TextContent(
+                type="text",
+                text=self.encode_result(
+                    {
+                        "cursor": encode_cursor({"feed": api.change_feed.id, "seq": feed["seq"]}),
+                        "reset": feed["reset"],
+                        "changes": feed["changes"],
+                    },
+                    args
+                )
+            )
+        ]
+
+        # A reset lists every note, whose contents would be the whole vault
+        if args.get("include_contents", False) and not feed["reset"]:
+            paths = [change["path"] for change in feed["changes"] if change["change"] != "deleted"]
+            if paths:
+                content = await api.get_batch_file_contents(paths, obsidian.DEFAULT_BATCH_CONCURRENCY, max_bytes)
+                result.append(
+                    TextContent(
+                        type="text",
+                        text=content
+                    )
+                )
+
+        return result
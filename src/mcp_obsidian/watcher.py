@@ -0,0 +1,181 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from collections.abc import Callable
+
+logger = logging.getLogger("mcp-obsidian")
+
+DEFAULT_WATCH_POLL_SECONDS = 5.0
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Called with the vault-relative path, whether it was removed and whether it is a directory
+ChangeCallback = Callable[[str, bool, bool], None]
+
+
+class VaultWatcher():
+    """Watches the vault directory and reports changed paths.
+
+    Uses inotify on Linux and falls back to polling the directory tree on
+    other platforms or when inotify is unavailable. Dot folders such as
+    ``.obsidian`` are ignored.
+    """
+
+    def __init__(
+            self,
+            vault_path: str,
+            on_change: ChangeCallback,
+            on_resync: Callable[[], None],
+            poll_interval: float = DEFAULT_WATCH_POLL_SECONDS,
+        ):
+        self.vault_path = os.path.realpath(vault_path)
+        self.on_change = on_change
+        self.on_resync = on_resync
+        self.poll_interval = poll_interval
+        self._watches: dict[int, str] = {}
+        self._stopped: asyncio.Event | None = None
+
+    async def run(self) -> None:
+        self._stopped = asyncio.Event()
+        libc = _load_libc()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                try:
+                    await self._run_inotify(libc, fd)
+                finally:
+                    os.close(fd)
+                return
+            logger.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling the vault instead")
+
+        await self._run_polling()
+
+    def stop(self) -> None:
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def _run_inotify(self, libc, fd: int) -> None:
+        self._add_watches(libc, fd, self.vault_path)
+        logger.info(f"Watching {len(self._watches)} vault directories with inotify")
+
+        loop = asyncio.get_running_loop()
+        loop.add_reader(fd, self._read_events, libc, fd)
+        try:
+            await self._stopped.wait()
+        finally:
+            loop.remove_reader(fd)
+
+    def _add_watches(self, libc, fd: int, root: str) -> None:
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            wd = libc.inotify_add_watch(fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = dirpath
+
+    def _read_events(self, libc, fd: int) -> None:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify event queue overflowed, resynchronizing")
+                self.on_resync()
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None or not name or name.startswith('.'):
+                continue
+
+            full_path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+            removed = bool(mask & (IN_DELETE | IN_MOVED_FROM))
+            if is_dir and not removed:
+                self._add_watches(libc, fd, full_path)
+                # Files moved in together with a directory produce no events of their own
+                for path in _walk_files(full_path):
+                    self._notify(path, False, False)
+            self._notify(full_path, removed, is_dir)
+
+    async def _run_polling(self) -> None:
+        logger.info(f"Polling the vault for changes every {self.poll_interval}s")
+        previous = await asyncio.to_thread(self._snapshot)
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            current = await asyncio.to_thread(self._snapshot)
+            for path in previous.keys() - current.keys():
+                self._notify(path, True, False)
+            for path, signature in current.items():
+                if previous.get(path) != signature:
+                    self._notify(path, False, False)
+            previous = current
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for path in _walk_files(self.vault_path):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _notify(self, path: str, removed: bool, is_dir: bool) -> None:
+        relative = os.path.relpath(path, self.vault_path).replace(os.sep, '/')
+        try:
+            self.on_change(relative, removed, is_dir)
+        except Exception as e:
+            logger.error(f"Failed to handle change of {relative}: {str(e)}")
+
+
+def _walk_files(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if not filename.startswith('.'):
+                yield os.path.join(dirpath, filename)
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
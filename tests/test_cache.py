@@ -0,0 +1,235 @@
+"""Note cache eviction, byte budget and revalidation.
+
+The client tests run AsyncObsidian against a fake REST API, which answers
+note+json reads and the JsonLogic query for the stat of every note.
+"""
+import asyncio
+import json
+import math
+
+import httpx
+
+from mcp_obsidian.cache import NoteCache
+from mcp_obsidian.index import NoteMetadata, VaultIndex
+from mcp_obsidian.obsidian import AsyncObsidian
+from mcp_obsidian.store import PersistentStore
+
+
+def stat(mtime, size):
+    return {'ctime': 0, 'mtime': mtime, 'size': size}
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = NoteCache(max_bytes=30)
+    cache.put('a.md', 'a' * 10, stat(1, 10))
+    cache.put('b.md', 'b' * 10, stat(1, 10))
+    cache.put('c.md', 'c' * 10, stat(1, 10))
+    cache.get('a.md')
+
+    cache.put('d.md', 'd' * 10, stat(1, 10))
+
+    assert sorted(cache.paths()) == ['a.md', 'c.md', 'd.md']
+
+
+def test_byte_budget_counts_the_size_from_the_stat():
+    cache = NoteCache(max_bytes=100)
+    cache.put('a.md', 'a', stat(1, 60))
+    cache.put('b.md', 'b', stat(1, 60))
+    assert cache.paths() == ['b.md']
+    assert cache.size == 60
+
+    cache.put('b.md', 'bb', stat(2, 30))
+    assert cache.size == 30
+
+    cache.invalidate('b.md')
+    assert cache.size == 0 and len(cache) == 0
+
+
+def test_notes_larger_than_the_budget_are_not_cached():
+    cache = NoteCache(max_bytes=100)
+    cache.put('a.md', 'a', stat(1, 50))
+    cache.put('big.md', 'x', stat(1, 101))
+    assert cache.paths() == ['a.md']
+
+
+def test_fetches_racing_a_write_are_not_cached():
+    cache = NoteCache()
+    token = cache.write_token()
+    cache.invalidate('a.md')
+    cache.put('a.md', 'old', stat(1, 3), token)
+    assert cache.get('a.md') is None
+
+
+def test_revalidate_keeps_unchanged_entries_and_drops_changed_ones():
+    cache = NoteCache(revalidate_after=0)
+    cache.put('same.md', 'x', stat(1, 1))
+    cache.put('modified.md', 'x', stat(1, 1))
+    cache.put('resized.md', 'x', stat(1, 1))
+    cache.put('deleted.md', 'x', stat(1, 1))
+    assert not cache.is_fresh(cache.get('same.md'))
+
+    stats = {'same.md': stat(1, 1), 'modified.md': stat(2, 1), 'resized.md': stat(1, 2)}
+    results = {path: cache.revalidate(path, stats.get(path)) for path in cache.paths()}
+
+    assert results == {'same.md': True, 'modified.md': False, 'resized.md': False, 'deleted.md': False}
+    assert cache.paths() == ['same.md']
+
+
+def test_tracked_entries_stay_fresh_until_invalidated():
+    cache = NoteCache(revalidate_after=0)
+    cache.put('a.md', 'x', stat(1, 1))
+    entry = cache.get('a.md')
+    assert not cache.is_fresh(entry)
+    assert cache.is_fresh(entry, tracked=True)
+
+
+def test_entries_loaded_from_the_store_are_only_served_once_revalidated(tmp_path):
+    store = PersistentStore(str(tmp_path / 'vault.sqlite3'))
+    cache = NoteCache(store=store)
+    cache.put('a.md', 'saved', stat(1, 5))
+    store.flush()
+
+    loaded = NoteCache(store=PersistentStore(str(tmp_path / 'vault.sqlite3')))
+    loaded.load()
+    entry = loaded.get('a.md')
+    assert entry.content == 'saved'
+    assert not loaded.is_fresh(entry) and not loaded.is_fresh(entry, tracked=True)
+
+    assert loaded.revalidate('a.md', stat(1, 5))
+    assert loaded.is_fresh(entry, tracked=True)
+
+
+class FakeVault():
+    def __init__(self, notes: dict[str, str]):
+        self.notes = {path: (content, 1) for path, content in notes.items()}
+        self.requests: list[str] = []
+
+    def edit(self, path: str, content: str) -> None:
+        self.notes[path] = (content, self.notes[path][1] + 1)
+
+    def stat(self, path: str) -> dict:
+        content, mtime = self.notes[path]
+        return stat(mtime, len(content.encode('utf-8')))
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(f"{request.method} {request.url.path}")
+        if request.method == 'POST' and request.url.path == '/search/':
+            assert json.loads(request.content) == {'var': 'stat'}
+            return httpx.Response(200, json=[
+                {'filename': path, 'result': self.stat(path)} for path in self.notes
+            ])
+        path = request.url.path.removeprefix('/vault/')
+        if path not in self.notes:
+            return httpx.Response(404, json={'errorCode': 40400, 'message': 'Not Found'})
+        return httpx.Response(200, json={
+            'path': path, 'content': self.notes[path][0], 'stat': self.stat(path), 'tags': [], 'frontmatter': {}
+        })
+
+
+def client(vault: FakeVault, store: PersistentStore | None = None, **kwargs) -> AsyncObsidian:
+    cache = NoteCache(revalidate_after=0, store=store)
+    api = AsyncObsidian('key', protocol='http', cache=cache, store=store, **kwargs)
+    api._create_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(vault.handle))
+    return api
+
+
+def ready_index(vault: FakeVault) -> VaultIndex:
+    index = VaultIndex(refresh_interval=3600)
+    index.replace({
+        path: NoteMetadata(path, vault.stat(path), [], {}) for path in vault.notes
+    })
+    return index
+
+
+def test_entries_expire_without_tracked_changes():
+    async def main():
+        vault = FakeVault({'a.md': 'one'})
+        api = client(vault)
+        await api.get_file_contents('a.md')
+        await api.get_file_contents('a.md')
+        return vault.requests
+
+    assert asyncio.run(main()) == ['GET /vault/a.md', 'GET /vault/a.md']
+
+
+def test_index_refresh_revalidates_cached_notes():
+    async def main():
+        vault = FakeVault({'a.md': 'one', 'b.md': 'two'})
+        api = client(vault, index=ready_index(vault))
+        assert await api.get_file_contents('a.md') == 'one'
+        assert await api.get_file_contents('b.md') == 'two'
+        assert await api.get_file_contents('a.md') == 'one'
+        assert vault.requests == ['GET /vault/a.md', 'GET /vault/b.md']
+
+        vault.edit('b.md', 'changed')
+        await api.refresh_index()
+        assert api.cache.paths() == ['a.md']
+
+        assert await api.get_file_contents('a.md') == 'one'
+        assert await api.get_file_contents('b.md') == 'changed'
+        return vault.requests[2:]
+
+    assert asyncio.run(main()) == ['POST /search/', 'GET /vault/b.md', 'GET /vault/b.md']
+
+
+def test_watched_vaults_serve_cached_notes_until_a_change_is_reported():
+    async def main():
+        vault = FakeVault({'a.md': 'one'})
+        api = client(vault)
+        api.watching = True
+        await api.get_file_contents('a.md')
+        await api.get_file_contents('a.md')
+        assert vault.requests == ['GET /vault/a.md']
+
+        vault.edit('a.md', 'changed')
+        api.handle_vault_change('a.md')
+        return await api.get_file_contents('a.md')
+
+    assert asyncio.run(main()) == 'changed'
+
+
+def test_prefetched_notes_are_served_after_the_revalidation_window():
+    async def main():
+        vault = FakeVault({'a.md': 'See [[b]]', 'b.md': 'linked'})
+        api = client(vault, index=ready_index(vault), prefetch_links=1)
+        content = await api.get_file_contents('a.md')
+        api.prefetch_links('a.md', content)
+        await asyncio.gather(*api.prefetcher._tasks)
+
+        assert await api.get_file_contents('b.md') == 'linked'
+        return vault.requests, api.prefetcher.hits
+
+    assert asyncio.run(main()) == (['GET /vault/a.md', 'GET /vault/b.md'], 1)
+
+
+def test_prefetch_refetches_entries_that_were_never_revalidated():
+    async def main():
+        vault = FakeVault({'b.md': 'linked'})
+        api = client(vault, index=ready_index(vault), prefetch_links=1)
+        api.cache.put('b.md', 'saved', vault.stat('b.md'))
+        api.cache.get('b.md').validated_at = -math.inf
+        await api._prefetch_note('b.md')
+        return api.cache.get('b.md').content
+
+    assert asyncio.run(main()) == 'linked'
+
+
+def test_warm_started_notes_stay_valid_until_their_stat_changes(tmp_path):
+    async def main():
+        vault = FakeVault({'a.md': 'one', 'b.md': 'two'})
+        store = PersistentStore(str(tmp_path / 'vault.sqlite3'))
+        previous = NoteCache(store=store)
+        previous.put('a.md', 'one', vault.stat('a.md'))
+        previous.put('b.md', 'two', vault.stat('b.md'))
+        store.flush()
+        vault.edit('b.md', 'changed')
+
+        api = client(vault, PersistentStore(store.path), index=ready_index(vault))
+        await api.warm_start()
+        assert api.cache.paths() == ['a.md']
+
+        assert await api.get_file_contents('a.md') == 'one'
+        assert await api.get_file_contents('b.md') == 'changed'
+        return vault.requests
+
+    assert asyncio.run(main()) == ['POST /search/', 'GET /vault/b.md']
@@ -0,0 +1,125 @@
+"""Merging, truncation and run identity of the change feed."""
+import asyncio
+
+import httpx
+
+from mcp_obsidian.changes import ChangeFeed
+from mcp_obsidian.obsidian import AsyncObsidian
+
+
+def stat(mtime, size=10):
+    return {'ctime': 0, 'mtime': mtime, 'size': size}
+
+
+def feed_with(stats: dict[str, dict], **options) -> ChangeFeed:
+    feed = ChangeFeed(**options)
+    feed.update(stats)
+    return feed
+
+
+def test_the_first_poll_records_no_changes():
+    feed = ChangeFeed()
+    assert feed.update({'a.md': stat(1)}) == 0
+    assert feed.paths() == ['a.md']
+    assert feed.changes_since(0) == {}
+
+
+def test_changes_between_polls():
+    feed = feed_with({'same.md': stat(1), 'modified.md': stat(1), 'resized.md': stat(1), 'deleted.md': stat(1)})
+    seq = feed.update({'same.md': stat(1), 'modified.md': stat(2), 'resized.md': stat(1, 20), 'created.md': stat(1)})
+    assert seq == 1
+    assert feed.changes_since(0) == {
+        'modified.md': 'modified', 'resized.md': 'modified', 'deleted.md': 'deleted', 'created.md': 'created'
+    }
+    assert feed.changes_since(1) == {}
+
+
+def test_polls_without_changes_keep_the_sequence_number():
+    feed = feed_with({'a.md': stat(1)})
+    assert feed.update({'a.md': stat(1)}) == 0
+    assert feed.update({'a.md': stat(2)}) == 1
+    assert feed.update({'a.md': stat(2)}) == 1
+
+
+def test_created_then_modified_is_created():
+    feed = feed_with({})
+    feed.update({'a.md': stat(1)})
+    feed.update({'a.md': stat(2)})
+    assert feed.changes_since(0) == {'a.md': 'created'}
+
+
+def test_created_then_deleted_is_dropped():
+    feed = feed_with({})
+    feed.update({'a.md': stat(1)})
+    feed.update({})
+    assert feed.changes_since(0) == {}
+
+
+def test_modified_then_deleted_is_deleted():
+    feed = feed_with({'a.md': stat(1)})
+    feed.update({'a.md': stat(2)})
+    feed.update({})
+    assert feed.changes_since(0) == {'a.md': 'deleted'}
+
+
+def test_deleted_then_recreated_is_modified():
+    feed = feed_with({'a.md': stat(1)})
+    feed.update({})
+    feed.update({'a.md': stat(2)})
+    assert feed.changes_since(0) == {'a.md': 'modified'}
+    # A client that saw the deletion sees the note created again
+    assert feed.changes_since(1) == {'a.md': 'created'}
+
+
+def test_notes_that_are_not_notes_are_ignored():
+    feed = feed_with({'a.md': stat(1)})
+    feed.update({'a.md': stat(1), 'b.md': None})
+    assert feed.changes_since(0) == {}
+
+
+def test_clients_behind_the_truncated_log_must_resynchronize():
+    feed = feed_with({'a.md': stat(0)}, max_entries=3)
+    for mtime in range(1, 6):
+        feed.update({'a.md': stat(mtime)})
+
+    assert feed.seq == 5
+    assert feed.changes_since(1) is None
+    assert feed.changes_since(2) == {'a.md': 'modified'}
+    assert feed.changes_since(5) == {}
+
+
+def test_sequence_numbers_ahead_of_the_feed_are_unknown():
+    feed = feed_with({'a.md': stat(1)})
+    feed.update({'a.md': stat(2)})
+    assert feed.changes_since(2) is None
+
+
+def test_every_run_has_its_own_id():
+    # Cursors carry the id, so that sequence numbers of an earlier run are not trusted
+    assert ChangeFeed().id != ChangeFeed().id
+
+
+def test_get_changes_lists_every_note_when_the_changes_are_unknown():
+    async def main():
+        stats = {'a.md': stat(1), 'b.md': stat(1)}
+        api = AsyncObsidian('key', protocol='http')
+        api._create_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json=[{'filename': p, 'result': s} for p, s in stats.items()])
+        ))
+        first = await api.get_changes()
+        stats['a.md'] = stat(2)
+        del stats['b.md']
+        second = await api.get_changes(first['seq'])
+        unknown = await api.get_changes(second['seq'] + 1)
+        return first, second, unknown
+
+    first, second, unknown = asyncio.run(main())
+    assert first == {'seq': 0, 'reset': True, 'changes': [
+        {'path': 'a.md', 'change': 'created', 'mtime': 1, 'size': 10},
+        {'path': 'b.md', 'change': 'created', 'mtime': 1, 'size': 10},
+    ]}
+    assert second == {'seq': 1, 'reset': False, 'changes': [
+        {'path': 'a.md', 'change': 'modified', 'mtime': 2, 'size': 10},
+        {'path': 'b.md', 'change': 'deleted'},
+    ]}
+    assert unknown['reset'] and [change['path'] for change in unknown['changes']] == ['a.md']
@@ -0,0 +1,341 @@
+"""Coalescing of appends, against a fake write function standing in for the REST API, and sharing of reads in flight."""
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mcp_obsidian.coalesce import AppendBuffer, AsyncSingleFlight
+from mcp_obsidian.metrics import registry
+from mcp_obsidian.obsidian import ObsidianError
+
+
+class FakeWrites():
+    """Records writes; fails the next ones with the queued errors."""
+
+    def __init__(self, errors: list[Exception] | None = None, delay: float = 0):
+        self.writes: list[tuple[str, str]] = []
+        self.errors = list(errors or [])
+        self.attempts = 0
+        self.delay = delay
+
+    async def __call__(self, path: str, content: str) -> None:
+        self.attempts += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.writes.append((path, content))
+
+
+async def wait_until(condition, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.005)
+
+
+def test_appends_within_the_window_are_written_once_in_order():
+    async def main():
+        write = FakeWrites()
+        buffer = AppendBuffer(write, window=0.05)
+        for line in ("a\n", "b\n", "c\n"):
+            await buffer.append("/log.md", line)
+        await buffer.append("other.md", "x")
+        assert write.writes == []
+
+        await wait_until(lambda: len(write.writes) == 2)
+        return write.writes, buffer.appends, buffer.writes
+
+    writes, appends, upstream = asyncio.run(main())
+    assert sorted(writes) == [("log.md", "a\nb\nc\n"), ("other.md", "x")]
+    assert (appends, upstream) == (4, 2)
+
+
+def test_appends_are_written_right_away_once_max_bytes_are_pending():
+    async def main():
+        write = FakeWrites()
+        buffer = AppendBuffer(write, window=60, max_bytes=4)
+        await buffer.append("log.md", "ab")
+        assert write.writes == []
+        await buffer.append("log.md", "cd")
+        return write.writes, buffer.pending_paths()
+
+    assert asyncio.run(main()) == ([("log.md", "abcd")], [])
+
+
+def test_appends_received_during_a_write_follow_it():
+    async def main():
+        write = FakeWrites(delay=0.05)
+        buffer = AppendBuffer(write, window=60)
+        await buffer.append("log.md", "1")
+        flush = asyncio.create_task(buffer.flush("log.md"))
+        await asyncio.sleep(0.01)
+        await buffer.append("log.md", "2")
+        await buffer.flush("log.md")
+        await flush
+        return write.writes
+
+    assert asyncio.run(main()) == [("log.md", "1"), ("log.md", "2")]
+
+
+def test_failed_writes_keep_the_appends_ahead_of_newer_ones():
+    async def main():
+        write = FakeWrites([ObsidianError("Request failed: timeout")])
+        buffer = AppendBuffer(write, window=60)
+        await buffer.append("log.md", "1")
+        with pytest.raises(ObsidianError):
+            await buffer.flush("log.md")
+        await buffer.append("log.md", "2")
+        await buffer.flush("log.md")
+        return write.writes, buffer.dropped
+
+    assert asyncio.run(main()) == ([("log.md", "12")], 0)
+
+
+def test_failed_writes_are_retried_with_backoff():
+    async def main():
+        write = FakeWrites([ObsidianError("Error 50000: busy", 503)] * 2)
+        buffer = AppendBuffer(write, window=0.01)
+        await buffer.append("log.md", "line")
+        await wait_until(lambda: write.writes)
+        return write.writes, write.attempts, buffer._attempts
+
+    assert asyncio.run(main()) == ([("log.md", "line")], 3, {})
+
+
+def test_appends_are_dropped_after_max_attempts():
+    async def main():
+        write = FakeWrites([ObsidianError("Error 50000: busy", 503)] * 10)
+        buffer = AppendBuffer(write, window=0.001, max_attempts=5)
+        await buffer.append("log.md", "a")
+        await buffer.append("log.md", "b")
+        await wait_until(lambda: buffer.dropped)
+        await asyncio.sleep(0.05)
+        return write.attempts, buffer.dropped, buffer.pending_paths()
+
+    before = registry.snapshot()["dropped_appends"]
+    assert asyncio.run(main()) == (5, 2, [])
+    assert registry.snapshot()["dropped_appends"] == before + 2
+
+
+def test_appends_rejected_by_the_api_are_dropped_right_away():
+    async def main():
+        write = FakeWrites([ObsidianError("Error 40400: Not Found", 404)])
+        buffer = AppendBuffer(write, window=60)
+        await buffer.append("log.md", "a")
+        with pytest.raises(ObsidianError):
+            await buffer.flush("log.md")
+        return write.attempts, buffer.dropped, buffer.pending_paths()
+
+    assert asyncio.run(main()) == (1, 1, [])
+
+
+def test_flush_all_logs_failures_and_keeps_writing_other_notes():
+    async def main():
+        write = FakeWrites([ObsidianError("Request failed: timeout")])
+        buffer = AppendBuffer(write, window=60)
+        await buffer.append("Projects/a.md", "a")
+        await buffer.append("Projects/b.md", "b")
+        await buffer.append("Inbox/c.md", "c")
+        await buffer.flush_all("Projects")
+        return write.writes, buffer.pending_paths()
+
+    writes, pending = asyncio.run(main())
+    assert writes == [("Projects/b.md", "b")]
+    assert sorted(pending) == ["Inbox/c.md", "Projects/a.md"]
+
+
+class RecordingApi(BaseHTTPRequestHandler):
+    appends: list[tuple[str, str]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._send({"status": "OK"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        self.appends.append((self.path, body))
+        self.send_response(204)
+        self.end_headers()
+
+    def _send(self, value):
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGTERM cannot be handled on Windows")
+def test_pending_appends_are_written_on_sigterm(tmp_path):
+    api = ThreadingHTTPServer(("127.0.0.1", 0), RecordingApi)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    env = os.environ | {
+        "OBSIDIAN_API_KEY": "key",
+        "OBSIDIAN_PROTOCOL": "http",
+        "OBSIDIAN_PORT": str(api.server_address[1]),
+        "OBSIDIAN_APPEND_COALESCE_SECONDS": "600",
+        "PYTHONPATH": os.pathsep.join([os.path.join(os.path.dirname(__file__), "..", "src"), os.environ.get("PYTHONPATH", "")]),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-c", "import mcp_obsidian; mcp_obsidian.main()"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, cwd=tmp_path
+    )
+
+    def send(message: dict) -> None:
+        server.stdin.write((json.dumps({"jsonrpc": "2.0"} | message) + "\n").encode("utf-8"))
+        server.stdin.flush()
+
+    def receive(id: int) -> dict:
+        while True:
+            message = json.loads(server.stdout.readline())
+            if message.get("id") == id:
+                return message
+
+    try:
+        send({"id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "test", "version": "0"}
+        }})
+        receive(1)
+        send({"method": "notifications/initialized"})
+        for i, line in enumerate(("first\n", "second\n")):
+            send({"id": 2 + i, "method": "tools/call", "params": {
+                "name": "obsidian_append_content", "arguments": {"filepath": "log.md", "content": line}
+            }})
+            assert not receive(2 + i)["result"]["isError"]
+        assert RecordingApi.appends == []
+
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=10)
+    finally:
+        server.kill()
+        api.shutdown()
+
+    assert RecordingApi.appends == [("/vault/log.md", "first\nsecond\n")]
+
+
+def test_writes_failing_when_flushed_for_a_read_are_retried():
+    async def main():
+        write = FakeWrites([ObsidianError("Request failed: timeout")])
+        buffer = AppendBuffer(write, window=0.01)
+        await buffer.append("log.md", "a")
+        await buffer.flush_all()
+        assert buffer.pending_paths() == ["log.md"]
+        await wait_until(lambda: write.writes)
+        return write.writes
+
+    assert asyncio.run(main()) == [("log.md", "a")]
+
+
+class FakeRead():
+    """Read that blocks until released, then returns its result or raises its error."""
+
+    def __init__(self, result=None, error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_call():
+    async def main():
+        flights = AsyncSingleFlight()
+        read = FakeRead("content")
+        callers = [asyncio.create_task(flights.run(("GET", "a.md"), read)) for _ in range(5)]
+        await asyncio.sleep(0)
+        read.release.set()
+        return await asyncio.gather(*callers), read.calls, flights.misses, flights.hits
+
+    assert asyncio.run(main()) == (["content"] * 5, 1, 1, 4)
+
+
+def test_calls_with_different_keys_are_not_shared():
+    async def main():
+        flights = AsyncSingleFlight()
+        read = FakeRead("content")
+        read.release.set()
+        await asyncio.gather(flights.run(("GET", "a.md"), read), flights.run(("GET", "b.md"), read))
+        # Finished calls are not reused either
+        await flights.run(("GET", "a.md"), read)
+        return read.calls
+
+    assert asyncio.run(main()) == 3
+
+
+def test_an_error_reaches_every_waiter():
+    async def main():
+        flights = AsyncSingleFlight()
+        read = FakeRead(error=ObsidianError("Error 40400: Not Found", 404))
+        callers = [asyncio.create_task(flights.run("key", read)) for _ in range(3)]
+        await asyncio.sleep(0)
+        read.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True), read.calls
+
+    results, calls = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(result, ObsidianError) and result.status_code == 404 for result in results)
+
+
+def test_a_cancelled_leader_does_not_cancel_the_call_for_the_others():
+    async def main():
+        flights = AsyncSingleFlight()
+        read = FakeRead("content")
+        leader = asyncio.create_task(flights.run("key", read))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.run("key", read))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        read.release.set()
+        async with asyncio.timeout(1):
+            result = await follower
+        return leader.cancelled(), result, read.calls
+
+    assert asyncio.run(main()) == (True, "content", 1)
+
+
+def test_a_call_whose_callers_were_all_cancelled_still_finishes(caplog):
+    async def main():
+        flights = AsyncSingleFlight()
+        read = FakeRead(error=ObsidianError("Request failed: timeout"))
+        caller = asyncio.create_task(flights.run("key", read))
+        await asyncio.sleep(0)
+        caller.cancel()
+        read.release.set()
+        await asyncio.sleep(0.01)
+        return flights._flights
+
+    assert asyncio.run(main()) == {}
+    assert "never retrieved" not in caplog.text
+
+
+def test_forget_makes_later_callers_start_a_new_call():
+    async def main():
+        flights = AsyncSingleFlight()
+        stale = FakeRead("before the write")
+        first = asyncio.create_task(flights.run("key", stale))
+        await asyncio.sleep(0)
+        flights.forget()
+        fresh = FakeRead("after the write")
+        fresh.release.set()
+        second = await flights.run("key", fresh)
+        stale.release.set()
+        return await first, second
+
+    assert asyncio.run(main()) == ("before the write", "after the write")
@@ -0,0 +1,33 @@
+"""JSON encoding of tool results, with and without orjson."""
+import pytest
+
+from mcp_obsidian import encoding
+
+RESULT = [{"filename": "Café/Notes ✓.md", "score": 1.5, "matches": [{"context": "naïve 日本語 😀", "start": 0}]}]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_output_does_not_depend_on_orjson(monkeypatch, compact):
+    if encoding.orjson is None:
+        pytest.skip("orjson is not installed")
+    with_orjson = encoding.encode(RESULT, compact)
+    monkeypatch.setattr(encoding, "orjson", None)
+    assert encoding.encode(RESULT, compact) == with_orjson
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_non_ascii_characters_are_not_escaped(monkeypatch, compact):
+    monkeypatch.setattr(encoding, "orjson", None)
+    assert "Café/Notes ✓.md" in encoding.encode(RESULT, compact)
+
+
+def test_fields_are_projected():
+    assert encoding.encode(RESULT, compact=True, fields=["filename", "matches.context"]) == (
+        '[{"filename":"Café/Notes ✓.md","matches":[{"context":"naïve 日本語 😀"}]}]'
+    )
+
+
+def test_cursors_round_trip():
+    cursor = encoding.encode_cursor({"scope": "abc", "offset": 20, "limit": 10})
+    assert encoding.decode_cursor(cursor) == {"limit": 10, "offset": 20, "scope": "abc"}
+    assert encoding.decode_cursor("not a cursor") is None
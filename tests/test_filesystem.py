@@ -0,0 +1,45 @@
+"""Reads served from the vault directory by the filesystem backend."""
+import asyncio
+
+import pytest
+
+from mcp_obsidian.filesystem import FilesystemObsidian
+from mcp_obsidian.obsidian import ObsidianError
+
+
+@pytest.fixture
+def api(tmp_path):
+    (tmp_path / "Projects" / "Archive").mkdir(parents=True)
+    (tmp_path / "Projects" / "Plan.md").write_text("# Plan\n")
+    (tmp_path / "Empty").mkdir()
+    (tmp_path / "Nested" / "Empty").mkdir(parents=True)
+    (tmp_path / "Hidden").mkdir()
+    (tmp_path / "Hidden" / ".DS_Store").write_bytes(b"")
+    (tmp_path / ".obsidian").mkdir()
+    (tmp_path / "Binary.md").write_bytes(b"caf\xe9\n")
+    return FilesystemObsidian(str(tmp_path), "key")
+
+
+def test_listings_hide_dot_entries_and_empty_directories(api):
+    # Only one level is scanned below each entry, so directories holding empty directories are listed
+    assert asyncio.run(api._list_remote("")) == ["Binary.md", "Nested/", "Projects/"]
+    assert asyncio.run(api._list_remote("Projects")) == ["Plan.md"]
+
+
+def test_listing_a_missing_or_empty_directory_is_not_found(api):
+    for dirpath in ("Missing", "Empty", "Hidden"):
+        with pytest.raises(ObsidianError) as e:
+            asyncio.run(api._list_remote(dirpath))
+        assert e.value.status_code == 404
+
+
+def test_reads_replace_invalid_utf8(api):
+    assert asyncio.run(api.get_file_contents("Projects/Plan.md")) == "# Plan\n"
+    assert asyncio.run(api.get_file_contents("Binary.md")) == "caf�\n"
+
+
+def test_reads_outside_the_vault_are_refused(api):
+    with pytest.raises(Exception, match="outside of vault"):
+        asyncio.run(api.get_file_contents("../secret.md"))
+    with pytest.raises(ObsidianError):
+        asyncio.run(api.get_file_contents("Missing.md"))
@@ -0,0 +1,40 @@
+"""Ranking and pagination of the local full-text index."""
+from mcp_obsidian.fulltext import DEFAULT_SEARCH_TOP_K, SearchIndex
+
+
+def make_index(count: int) -> SearchIndex:
+    index = SearchIndex()
+    for i in range(count):
+        # Notes mentioning the term more often rank higher
+        index.update(f"Note {i:03}.md", "alpha " * (i + 1) + "filler text")
+    index.update("Other.md", "beta")
+    return index
+
+
+def test_unpaginated_search_returns_the_best_notes():
+    results = make_index(150).search("alpha")
+    assert len(results) == DEFAULT_SEARCH_TOP_K
+    assert results[0]['filename'] == "Note 149.md"
+
+
+def test_pages_report_every_matching_note():
+    index = make_index(150)
+    page, total = index.search_page("alpha", offset=120, limit=20)
+    assert total == 150
+    assert [result['filename'] for result in page] == [f"Note {i:03}.md" for i in range(29, 9, -1)]
+
+    rest, total = index.search_page("alpha", offset=140)
+    assert total == 150 and len(rest) == 10
+
+
+def test_pages_match_the_full_ranking():
+    index = make_index(150)
+    ranking = [result['filename'] for result in index.search_page("alpha")[0]]
+    pages = [index.search_page("alpha", offset=offset, limit=40)[0] for offset in range(0, 150, 40)]
+    assert [result['filename'] for page in pages for result in page] == ranking
+
+
+def test_pages_beyond_the_results_are_empty():
+    page, total = make_index(5).search_page("alpha", offset=10, limit=5)
+    assert page == [] and total == 5
+    assert make_index(5).search_page("missing") == ([], 0)
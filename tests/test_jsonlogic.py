@@ -0,0 +1,202 @@
+"""Local JsonLogic evaluation against results of the Local REST API.
+
+The REST API evaluates queries with json-logic-js, so the expected values
+below are what JavaScript returns for the same query and note. Queries the
+evaluator cannot answer exactly must raise UnsupportedQuery, which sends
+them to the REST API instead.
+"""
+import pytest
+
+from mcp_obsidian.index import MetadataSnapshot, NoteMetadata
+from mcp_obsidian.jsonlogic import NoteData, UnsupportedQuery, apply, is_result
+
+NOTE = NoteData(
+    path="Projects/Plan.md",
+    tags=["work", "q3"],
+    frontmatter={"rating": 4, "status": "draft", "count": "12", "empty": "", "nothing": None, "list": [1, 2]},
+    stat={"ctime": 1700000000000, "mtime": 1700000500000, "size": 1234},
+)
+
+
+@pytest.mark.parametrize("query, expected", [
+    # The examples of the API documentation
+    ({"glob": ["*.foo", "bar.foo"]}, True),
+    ({"glob": ["*.bar", "bar.foo"]}, False),
+    ({"glob": ["*.md", {"var": "path"}]}, True),
+    ({"glob": ["Projects/*", {"var": "path"}]}, True),
+    # '*' also matches '/', and the whole value must match
+    ({"glob": ["*Plan*", {"var": "path"}]}, True),
+    ({"glob": ["Plan*", {"var": "path"}]}, False),
+    ({"glob": ["*.MD", {"var": "path"}]}, False),
+    # Regular expression characters are literal
+    ({"glob": ["Projects/Plan.md", "Projects/PlanXmd"]}, False),
+    # Anything but two strings is not a match
+    ({"glob": ["*", {"var": "frontmatter.rating"}]}, False),
+    ({"glob": [{"var": "frontmatter.missing"}, {"var": "path"}]}, False),
+])
+def test_glob(query, expected):
+    assert apply(query, NOTE) is expected
+
+
+@pytest.mark.parametrize("pattern", ["Projects/Pla?.md", "Projects/[PQ]lan.md", "*.{md,canvas}", "Projects\\*"])
+def test_glob_with_ambiguous_wildcards_is_sent_to_the_api(pattern):
+    with pytest.raises(UnsupportedQuery):
+        apply({"glob": [pattern, {"var": "path"}]}, NOTE)
+
+
+@pytest.mark.parametrize("pattern", [".*\\.md", "^Projects/", "\\d+", "(?i)plan"])
+def test_regexp_is_sent_to_the_api(pattern):
+    with pytest.raises(UnsupportedQuery):
+        apply({"regexp": [pattern, {"var": "path"}]}, NOTE)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"in": ["work", {"var": "tags"}]}, True),
+    ({"in": ["wor", {"var": "tags"}]}, False),
+    # Substrings of strings, with the needle converted to a string
+    ({"in": ["Plan", {"var": "path"}]}, True),
+    ({"in": [12, {"var": "frontmatter.count"}]}, True),
+    ({"in": [None, "nullable"]}, True),
+    # Arrays use strict equality
+    ({"in": ["1", {"var": "frontmatter.list"}]}, False),
+    ({"in": [1, {"var": "frontmatter.list"}]}, True),
+    # Falsy haystacks never contain anything, not even ''
+    ({"in": ["", {"var": "frontmatter.empty"}]}, False),
+    ({"in": ["x", {"var": "frontmatter.missing"}]}, False),
+    ({"in": ["4", {"var": "frontmatter.rating"}]}, False),
+])
+def test_in(query, expected):
+    assert apply(query, NOTE) is expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"var": "frontmatter.missing"}, None),
+    ({"var": ["frontmatter.missing", "default"]}, "default"),
+    # A null value is returned as is, not replaced by the default
+    ({"var": ["frontmatter.nothing", "default"]}, None),
+    # Looking up below a missing or null value gives the default
+    ({"var": ["frontmatter.missing.deeper", 0]}, 0),
+    ({"var": ["frontmatter.nothing.deeper", 0]}, 0),
+    ({"var": "tags.1"}, "q3"),
+    ({"var": "tags.2"}, None),
+    ({"var": "tags.length"}, 2),
+    ({"var": "stat.size"}, 1234),
+    ({"missing": ["frontmatter.status", "frontmatter.missing", "frontmatter.empty", "frontmatter.nothing"]},
+     ["frontmatter.missing", "frontmatter.empty", "frontmatter.nothing"]),
+    ({"missing_some": [1, ["frontmatter.status", "frontmatter.missing"]]}, []),
+    ({"missing_some": [2, ["frontmatter.status", "frontmatter.missing"]]}, ["frontmatter.missing"]),
+])
+def test_var_with_missing_keys(query, expected):
+    assert apply(query, NOTE) == expected
+
+
+@pytest.mark.parametrize("query", [{"var": "content"}, {"var": ""}, {"in": ["todo", {"var": "content"}]}])
+def test_note_content_is_sent_to_the_api(query):
+    with pytest.raises(UnsupportedQuery):
+        apply(query, NOTE)
+
+
+@pytest.mark.parametrize("query, expected", [
+    # Strings are converted to numbers with Number()
+    ({"==": [{"var": "frontmatter.count"}, 12]}, True),
+    ({"==": [" 12\n", 12]}, True),
+    ({"==": ["0x10", 16]}, True),
+    ({"==": ["1_000", 1000]}, False),
+    ({"==": ["", 0]}, True),
+    ({"==": ["1e3", 1000]}, True),
+    ({"==": ["Infinity", {"/": [1, 1]}]}, False),
+    ({"==": [True, 1]}, True),
+    ({"==": ["1", True]}, True),
+    ({"==": ["true", True]}, False),
+    # null only equals null, also when the key is missing
+    ({"==": [None, 0]}, False),
+    ({"==": [{"var": "frontmatter.missing"}, None]}, True),
+    ({"===": ["12", 12]}, False),
+    ({"!=": [{"var": "frontmatter.rating"}, "4"]}, False),
+    # Orderings convert both sides to numbers unless both are strings
+    ({"<": ["10", 9]}, False),
+    ({"<": ["10", "9"]}, True),
+    ({">": [{"var": "frontmatter.count"}, 9]}, True),
+    ({"<": ["abc", 1]}, False),
+    ({">=": ["abc", 1]}, False),
+    ({"<": [None, 1]}, True),
+    ({">": [{"var": "frontmatter.missing"}, -1]}, True),
+    ({"<=": [False, 0]}, True),
+    ({"<": [1, "2", 3]}, True),
+    ({"<": [1, "5", 3]}, False),
+    # JavaScript compares UTF-16 code units
+    ({"<": ["\uffff", "\U0001f600"]}, False),
+])
+def test_mixed_type_comparisons(query, expected):
+    assert apply(query, NOTE) is expected
+
+
+@pytest.mark.parametrize("query", [
+    {"==": [[1], "1"]},
+    {"<": [{"var": "tags"}, 1]},
+    {"max": ["x", 1]},
+])
+def test_comparisons_of_arrays_and_nan_are_sent_to_the_api(query):
+    with pytest.raises(UnsupportedQuery):
+        apply(query, NOTE)
+
+
+@pytest.mark.parametrize("query, expected", [
+    # '+' and '*' use parseFloat(), the other operators Number()
+    ({"+": ["12abc", 1]}, 13),
+    ({"+": [{"var": "frontmatter.count"}, 1]}, 13),
+    ({"*": [" 2", "3px"]}, 6),
+    # json-logic-js reduces '*' without an initial value, so a single value is returned unconverted
+    ({"*": ["3"]}, "3"),
+    ({"-": ["12", 2]}, 10),
+    ({"%": [-7, 3]}, -1),
+    ({"cat": ["a", None, 1, 2.5, [1, 2]]}, "a12.51,2"),
+    ({"substr": ["vault", -3]}, "ult"),
+    ({"substr": ["vault", 1, -5]}, ""),
+    ({"substr": ["vault", "x", 2]}, "va"),
+])
+def test_conversions(query, expected):
+    assert apply(query, NOTE) == expected
+
+
+@pytest.mark.parametrize("query", [{"+": [None, 1]}, {"-": ["12abc", 1]}, {"cat": [0.00001]}])
+def test_inexact_conversions_are_sent_to_the_api(query):
+    with pytest.raises(UnsupportedQuery):
+        apply(query, NOTE)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (False, False), (None, False), (0, False), ([], False), ({}, False),
+    (True, True), ("", True), ("0", True), ([0], True), (-1, True),
+])
+def test_results_returned_by_the_api(value, expected):
+    assert is_result(value) is expected
+
+
+def test_indexed_search_matches_evaluating_every_note():
+    notes = [
+        NoteMetadata(f"{folder}/Note {i}.md", {"ctime": i, "mtime": 1000 + i, "size": 10 * i}, tags, {"n": str(i)})
+        for folder, tags in (("Projects", ["work"]), ("Personal", ["home"]))
+        for i in range(20)
+    ]
+    snapshot = MetadataSnapshot(notes)
+
+    queries = [
+        {"glob": ["Projects/*", {"var": "path"}]},
+        {"and": [{"in": ["work", {"var": "tags"}]}, {">": [{"var": "stat.mtime"}, 1010]}]},
+        {"and": [{"glob": ["Personal/Note 1*", {"var": "path"}]}, {"<": [{"var": "frontmatter.n"}, 15]}]},
+        {"<": [1005, {"var": "stat.mtime"}, 1008]},
+    ]
+    for query in queries:
+        expected = [
+            {"filename": note.path, "result": result}
+            for note in sorted(notes, key=lambda note: note.path)
+            if is_result(result := apply(query, snapshot.note(snapshot.paths.index(note.path))))
+        ]
+        assert snapshot.search(query) == expected
+
+
+def test_indexed_search_sends_ambiguous_globs_to_the_api():
+    snapshot = MetadataSnapshot([NoteMetadata("Projects/Plan.md", {"mtime": 1, "size": 1})])
+    with pytest.raises(UnsupportedQuery):
+        snapshot.search({"glob": ["Projects/[P]lan.md", {"var": "path"}]})
@@ -0,0 +1,194 @@
+"""Retries, deadlines, hedging and the circuit breaker, against a mock transport."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from mcp_obsidian.resilience import CircuitBreakerOpen, RequestPolicy, ResilientTransport
+
+
+class FakeApi():
+    """Answers requests with the queued outcomes, then with 200.
+
+    An outcome is a status code, an exception to raise, or a number of
+    seconds to wait before answering, which times out like a real transport
+    when it exceeds the read timeout of the request.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = 0
+        self.timeouts: list[float] = []
+        self.cancelled = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        timeout = request.extensions['timeout']['read']
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, float):
+            try:
+                await asyncio.sleep(min(outcome, timeout))
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            if outcome > timeout:
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(200, text=f"after {outcome}")
+        return httpx.Response(outcome)
+
+
+def transport(api: FakeApi, **options) -> ResilientTransport:
+    policy = RequestPolicy(**({'retry_backoff': 0, 'adaptive_timeouts': False} | options))
+    return ResilientTransport(httpx.MockTransport(api.handle), policy)
+
+
+async def send(resilient: ResilientTransport, method: str = 'GET', path: str = '/vault/a.md') -> httpx.Response:
+    return await resilient.handle_async_request(httpx.Request(method, f"http://127.0.0.1:27124{path}"))
+
+
+def test_gateway_errors_and_connection_errors_are_retried():
+    api = FakeApi(503, httpx.ConnectError("refused"))
+    response = asyncio.run(send(transport(api)))
+    assert (response.status_code, api.requests) == (200, 3)
+
+
+def test_retries_are_limited():
+    api = FakeApi(503, 503, 503, 503)
+    response = asyncio.run(send(transport(api, retries=2)))
+    assert (response.status_code, api.requests) == (503, 3)
+
+
+@pytest.mark.parametrize("method, path, status", [('POST', '/vault/a.md', 503), ('GET', '/vault/a.md', 404)])
+def test_writes_and_answers_are_not_retried(method, path, status):
+    api = FakeApi(status)
+    response = asyncio.run(send(transport(api), method, path))
+    assert (response.status_code, api.requests) == (status, 1)
+
+
+def test_retry_timeouts_double_within_the_deadline_of_the_call():
+    api = FakeApi(1.0, 1.0, 1.0)
+    resilient = transport(api, timeout=0.1)
+    started = time.monotonic()
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(send(resilient))
+    elapsed = time.monotonic() - started
+
+    # 0.1 s for the first attempt, then only the 0.1 s left of the 0.2 s allowed
+    assert api.requests == 2
+    assert api.timeouts[0] == 0.1 and api.timeouts[1] <= 0.1
+    assert elapsed < 0.3
+
+
+def test_the_breaker_opens_after_consecutive_failed_calls():
+    async def main():
+        api = FakeApi(*[httpx.ConnectError("refused")] * 6)
+        resilient = transport(api, breaker_failures=2, breaker_reset_seconds=60)
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await send(resilient)
+        # Each call counted once, after its three attempts
+        assert api.requests == 6
+        assert resilient.policy.breaker.state == 'open'
+
+        with pytest.raises(CircuitBreakerOpen):
+            await send(resilient)
+        return api.requests
+
+    assert asyncio.run(main()) == 6
+
+
+def test_a_successful_call_resets_the_failure_count():
+    async def main():
+        api = FakeApi(*[httpx.ConnectError("refused")] * 3, 200, *[httpx.ConnectError("refused")] * 3)
+        resilient = transport(api, breaker_failures=2)
+        with pytest.raises(httpx.ConnectError):
+            await send(resilient)
+        await send(resilient)
+        with pytest.raises(httpx.ConnectError):
+            await send(resilient)
+        return resilient.policy.breaker.state
+
+    assert asyncio.run(main()) == 'closed'
+
+
+def test_a_successful_probe_closes_the_breaker():
+    async def main():
+        api = FakeApi(httpx.ConnectError("refused"))
+        resilient = transport(api, retries=0, breaker_failures=1, breaker_reset_seconds=0.05)
+        with pytest.raises(httpx.ConnectError):
+            await send(resilient)
+        assert resilient.policy.breaker.state == 'open'
+
+        await asyncio.sleep(0.06)
+        assert resilient.policy.breaker.state == 'half-open'
+        response = await send(resilient)
+        return response.status_code, resilient.policy.breaker.state
+
+    assert asyncio.run(main()) == (200, 'closed')
+
+
+def test_a_failed_probe_is_not_retried_and_reopens_the_breaker():
+    async def main():
+        api = FakeApi(*[httpx.ConnectError("refused")] * 10)
+        resilient = transport(api, retries=2, breaker_failures=1, breaker_reset_seconds=0.05)
+        with pytest.raises(httpx.ConnectError):
+            await send(resilient)
+        sent = api.requests
+
+        await asyncio.sleep(0.06)
+        with pytest.raises(httpx.ConnectError):
+            await send(resilient)
+        return api.requests - sent, resilient.policy.breaker.state
+
+    assert asyncio.run(main()) == (1, 'open')
+
+
+def test_only_one_request_probes_the_breaker():
+    async def main():
+        api = FakeApi(httpx.ConnectError("refused"), 0.05)
+        resilient = transport(api, retries=0, breaker_failures=1, breaker_reset_seconds=0.05)
+        with pytest.raises(httpx.ConnectError):
+            await send(resilient)
+        await asyncio.sleep(0.06)
+        return await asyncio.gather(send(resilient), send(resilient), return_exceptions=True)
+
+    probe, held_back = asyncio.run(main())
+    assert probe.status_code == 200
+    assert isinstance(held_back, CircuitBreakerOpen)
+
+
+def hedging_transport(api: FakeApi) -> ResilientTransport:
+    resilient = transport(api, hedge_reads=True)
+    for _ in range(20):
+        # Reads usually take 10 ms
+        resilient.policy.timeouts['read'].observe(0.01)
+    return resilient
+
+
+def test_slow_reads_are_hedged_and_the_slower_request_is_cancelled():
+    async def main():
+        api = FakeApi(0.5, 0.001)
+        response = await send(hedging_transport(api))
+        await asyncio.sleep(0)
+        return response.text, api.requests, api.cancelled
+
+    assert asyncio.run(main()) == ("after 0.001", 2, 1)
+
+
+def test_a_failed_hedge_waits_for_the_first_request():
+    async def main():
+        api = FakeApi(0.05, httpx.ConnectError("refused"))
+        response = await send(hedging_transport(api))
+        return response.text, api.requests
+
+    assert asyncio.run(main()) == ("after 0.05", 2)
+
+
+def test_fast_reads_are_not_hedged():
+    api = FakeApi(0.001)
+    response = asyncio.run(send(hedging_transport(api)))
+    assert (response.text, api.requests) == ("after 0.001", 1)